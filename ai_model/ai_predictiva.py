@@ -8,15 +8,17 @@ Objetivo:
 - Guardar memoria (global y por usuario) para autoaprendizaje futuro.
 
 Este módulo está hecho para funcionar incluso si todavía no hay dataset real:
-en ese caso usa un "modelo básico" que genera una distribución lógica.
+en ese caso usa el modelo de goles Poisson / Dixon-Coles (services/goles_service.py).
 """
 
 import os
 import json
-import random
 from datetime import datetime
 from typing import Dict, Any, Optional
 
+from services.almacen_json import escribir_json, bloqueo
+from services import goles_service
+
 # Rutas por defecto (puedes ajustarlas según tu repo)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MEMORIA_GLOBAL_PATH = os.path.join(BASE_DIR, "memoria_global.json")
@@ -43,8 +45,7 @@ def cargar_memoria_global() -> Dict[str, Any]:
 
 
 def guardar_memoria_global(memoria: Dict[str, Any]) -> None:
-    with open(MEMORIA_GLOBAL_PATH, "w", encoding="utf-8") as f:
-        json.dump(memoria, f, ensure_ascii=False, indent=2)
+    escribir_json(MEMORIA_GLOBAL_PATH, memoria)
 
 
 def cargar_memoria_usuario(user_id: str) -> Dict[str, Any]:
@@ -60,9 +61,7 @@ def cargar_memoria_usuario(user_id: str) -> Dict[str, Any]:
 
 
 def guardar_memoria_usuario(user_id: str, data: Dict[str, Any]) -> None:
-    ruta = os.path.join(MEMORIA_USUARIOS_DIR, f"{user_id}.json")
-    with open(ruta, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    escribir_json(os.path.join(MEMORIA_USUARIOS_DIR, f"{user_id}.json"), data)
 
 
 # =============================
@@ -70,22 +69,20 @@ def guardar_memoria_usuario(user_id: str, data: Dict[str, Any]) -> None:
 # =============================
 def _prediccion_basica(equipo_local: str, equipo_visitante: str) -> Dict[str, Any]:
     """
-    Genera una predicción lógica aunque no haya modelo real.
+    Genera una predicción aunque no haya modelo real: 1X2 del modelo de goles
+    (fuerzas ajustadas con los resultados del feature store; promedio de liga
+    si no conoce a los equipos).
     Regresa un dict con el mismo formato que usará el modelo entrenado.
     """
-    # Distribución aleatoria pero razonable
-    base_local = random.randint(45, 70)  # local suele tener ventaja
-    base_visitante = random.randint(10, 35)
-    restante = 100 - (base_local + base_visitante)
-    empate = max(5, restante)
+    p = goles_service.probabilidades_partido(equipo_local, equipo_visitante)
 
     return {
         "local": equipo_local,
         "visitante": equipo_visitante,
-        "prob_local": round(base_local, 2),
-        "prob_empate": round(empate, 2),
-        "prob_visitante": round(base_visitante, 2),
-        "fuente": "simulado",  # luego será "modelo_entrenado"
+        "prob_local": round(p["local"] * 100, 2),
+        "prob_empate": round(p["empate"] * 100, 2),
+        "prob_visitante": round(p["visitante"] * 100, 2),
+        "fuente": "dixon_coles" if p["conocidos"] else "promedio_liga",
     }
 
 
@@ -108,28 +105,30 @@ def predecir_partido(
     # 1. Por ahora usamos el modelo básico
     pred = _prediccion_basica(equipo_local, equipo_visitante)
 
-    # 2. Actualizar memoria global
-    memoria_global = cargar_memoria_global()
-    memoria_global["total_predicciones"] += 1
+    # 2. Actualizar memoria global (bajo lock: varios workers pueden escribirla)
+    with bloqueo(MEMORIA_GLOBAL_PATH):
+        memoria_global = cargar_memoria_global()
+        memoria_global["total_predicciones"] += 1
 
-    # contar equipos
-    for eq in (equipo_local, equipo_visitante):
-        memoria_global["equipos_consultados"].setdefault(eq, 0)
-        memoria_global["equipos_consultados"][eq] += 1
+        # contar equipos
+        for eq in (equipo_local, equipo_visitante):
+            memoria_global["equipos_consultados"].setdefault(eq, 0)
+            memoria_global["equipos_consultados"][eq] += 1
 
-    # marcar fecha de “uso” (sirve después para autoentrenar cada X días)
-    memoria_global["ultimo_uso"] = datetime.utcnow().isoformat()
-    guardar_memoria_global(memoria_global)
+        # marcar fecha de “uso” (sirve después para autoentrenar cada X días)
+        memoria_global["ultimo_uso"] = datetime.utcnow().isoformat()
+        guardar_memoria_global(memoria_global)
 
     # 3. Actualizar memoria del usuario (si viene de Telegram)
     if user_id:
-        mem_user = cargar_memoria_usuario(str(user_id))
-        mem_user["consultas"] += 1
-        mem_user["equipos_frecuentes"].setdefault(equipo_local, 0)
-        mem_user["equipos_frecuentes"][equipo_local] += 1
-        mem_user["equipos_frecuentes"].setdefault(equipo_visitante, 0)
-        mem_user["equipos_frecuentes"][equipo_visitante] += 1
-        guardar_memoria_usuario(str(user_id), mem_user)
+        with bloqueo(os.path.join(MEMORIA_USUARIOS_DIR, f"{user_id}.json")):
+            mem_user = cargar_memoria_usuario(str(user_id))
+            mem_user["consultas"] += 1
+            mem_user["equipos_frecuentes"].setdefault(equipo_local, 0)
+            mem_user["equipos_frecuentes"][equipo_local] += 1
+            mem_user["equipos_frecuentes"].setdefault(equipo_visitante, 0)
+            mem_user["equipos_frecuentes"][equipo_visitante] += 1
+            guardar_memoria_usuario(str(user_id), mem_user)
 
     # 4. Armar salida lista para el bot
     respuesta_texto = (
@@ -1,18 +1,17 @@
 # ai_model/predictor.py
-import joblib
-import os
 import numpy as np
 
-MODEL_PATH = os.path.join(os.path.dirname(__file__), "modelo_entrenado.pkl")
+from ai_model.train_model import NOMBRE_MODELO
+from services.registro_modelos import cargar_modelo_actual
 
 def predecir_resultado(goles_local, goles_visitante, corners, tarjetas):
     """
     Realiza una predicción basada en las estadísticas del partido.
     """
-    if not os.path.exists(MODEL_PATH):
+    modelo, _ = cargar_modelo_actual(NOMBRE_MODELO)
+    if modelo is None:
         return "⚠️ Modelo no entrenado aún. Usa /entrenar para crear el modelo."
 
-    modelo = joblib.load(MODEL_PATH)
     datos = np.array([[goles_local, goles_visitante, corners, tarjetas]])
     prediccion = modelo.predict(datos)[0]
     probas = modelo.predict_proba(datos)[0]
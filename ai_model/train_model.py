@@ -1,38 +1,214 @@
 # ai_model/train_model.py
+import os
+import json
+import hashlib
+import resource
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score
-import joblib
-import os
 
-# Ruta del modelo entrenado
-MODEL_PATH = os.path.join(os.path.dirname(__file__), "modelo_entrenado.pkl")
+from services.registro_modelos import publicar_modelo, hash_datos
+
+# Nombre del modelo en el registro versionado (data/modelos/partido_binario)
+NOMBRE_MODELO = "partido_binario"
+
+FEATURES = ["goles_local", "goles_visitante", "corners", "tarjetas"]
+
+# === INGESTA POR CHUNKS === #
+# Tipos compactos: estadísticas en float32 (admiten NaN). Solo se leen las
+# columnas que usa el modelo; los nombres de equipo del CSV se ignoran.
+DTYPES_CSV = {
+    "goles_local": "float32",
+    "goles_visitante": "float32",
+    "corners": "float32",
+    "tarjetas": "float32",
+    "resultado": "category",
+}
+CHUNK_FILAS = int(os.getenv("TRAIN_CHUNK_FILAS", 250_000))
+# Por encima de este número de filas no se entrena con todo en memoria
+MAX_FILAS_MEMORIA = int(os.getenv("TRAIN_MAX_FILAS_MEMORIA", 2_000_000))
+CACHE_DIR = os.path.join("data", "cache_entrenamiento")
 
-def entrenar_modelo(ruta_datos="data/partidos_historicos.csv"):
+
+def _pico_memoria_mb():
+    """Pico de memoria residente del proceso (ru_maxrss está en KB en Linux)."""
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def leer_csv_por_chunks(ruta_datos, chunk_filas=CHUNK_FILAS):
+    """
+    Lee el CSV histórico por bloques con tipos compactos y agrega la etiqueta
+    binaria vectorizada (1 = gana local). Nunca tiene el archivo entero en memoria.
+    """
+    lector = pd.read_csv(
+        ruta_datos,
+        usecols=lambda c: c in DTYPES_CSV,
+        dtype=DTYPES_CSV,
+        chunksize=chunk_filas,
+    )
+    for chunk in lector:
+        chunk["resultado_binario"] = (chunk["resultado"] == "local").astype(np.int8)
+        yield chunk
+
+
+# === CACHÉ BINARIA COLUMNAR === #
+def _dir_cache(ruta_datos):
+    st = os.stat(ruta_datos)
+    clave = f"{os.path.abspath(ruta_datos)}|{st.st_mtime_ns}|{st.st_size}"
+    return os.path.join(CACHE_DIR, hashlib.sha1(clave.encode()).hexdigest()[:16])
+
+
+def construir_cache(ruta_datos, chunk_filas=CHUNK_FILAS):
+    """
+    Convierte el CSV a una copia binaria columnar (un archivo por columna)
+    escribiendo chunk a chunk. Devuelve el directorio de la caché.
+    """
+    destino = _dir_cache(ruta_datos)
+    if os.path.exists(os.path.join(destino, "meta.json")):
+        return destino
+
+    tmp = destino + ".tmp"
+    os.makedirs(tmp, exist_ok=True)
+    columnas = FEATURES + ["resultado_binario"]
+    archivos = {c: open(os.path.join(tmp, f"{c}.bin"), "wb") for c in columnas}
+    filas = 0
+    try:
+        for chunk in leer_csv_por_chunks(ruta_datos, chunk_filas):
+            for c in columnas:
+                dtype = np.int8 if c == "resultado_binario" else np.float32
+                archivos[c].write(chunk[c].to_numpy(dtype=dtype).tobytes())
+            filas += len(chunk)
+    finally:
+        for f in archivos.values():
+            f.close()
+
+    meta = {
+        "origen": os.path.abspath(ruta_datos),
+        "filas": filas,
+        "columnas": {c: ("int8" if c == "resultado_binario" else "float32") for c in columnas},
+    }
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, destino)
+    print(f"📦 Caché columnar creada: {destino} ({filas} filas)")
+    return destino
+
+
+def abrir_cache(destino):
+    """Columnas de la caché como np.memmap (solo lectura, sin cargarlas en RAM)."""
+    with open(os.path.join(destino, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    cols = {
+        c: np.memmap(os.path.join(destino, f"{c}.bin"), dtype=dtype, mode="r", shape=(meta["filas"],))
+        for c, dtype in meta["columnas"].items()
+    }
+    return cols, meta["filas"]
+
+
+def cargar_dataset(ruta_datos="data/partidos_historicos.csv"):
+    """Dataset completo (features + etiqueta binaria) desde la caché columnar."""
+    cols, _ = abrir_cache(construir_cache(ruta_datos))
+    return pd.DataFrame({c: np.asarray(arr) for c, arr in cols.items()})
+
+
+def _muestra(cols, filas, max_filas, semilla=42):
+    """Muestra aleatoria de max_filas leída directamente de los memmaps."""
+    if max_filas >= filas:
+        return np.column_stack([cols[c] for c in FEATURES]), np.asarray(cols["resultado_binario"])
+    idx = np.sort(np.random.default_rng(semilla).choice(filas, size=min(max_filas, filas), replace=False))
+    X = np.column_stack([cols[c][idx] for c in FEATURES])
+    y = np.asarray(cols["resultado_binario"][idx])
+    return X, y
+
+
+def _mascara_test(semilla, bloque, n):
+    """Hold-out (20%) de un bloque: se recalcula igual desde (semilla, bloque) sin guardarlo."""
+    return np.random.default_rng((semilla, bloque)).random(n) < 0.2
+
+
+def _entrenar_incremental(cols, filas, chunk_filas=CHUNK_FILAS, semilla=42):
+    """
+    Entrena un SGDClassifier recorriendo la caché por bloques (partial_fit).
+    Las features se estandarizan con un StandardScaler también incremental
+    (goles, córners y tarjetas tienen escalas distintas); se publica el par
+    escalador + modelo como un Pipeline.
+    El 20% de cada bloque (máscara fija por semilla y bloque) se reserva para test.
+    """
+    escalador = StandardScaler()
+    modelo = SGDClassifier(loss="log_loss", random_state=semilla)
+    aciertos = total = 0
+    bloques = list(enumerate(range(0, filas, chunk_filas)))
+    for k, inicio in bloques:
+        fin = min(inicio + chunk_filas, filas)
+        X = np.column_stack([cols[c][inicio:fin] for c in FEATURES])
+        y = np.asarray(cols["resultado_binario"][inicio:fin])
+        test = _mascara_test(semilla, k, fin - inicio)
+        X_train = np.nan_to_num(X[~test])
+        escalador.partial_fit(X_train)
+        modelo.partial_fit(escalador.transform(X_train), y[~test], classes=np.array([0, 1]))
+    pipeline = make_pipeline(escalador, modelo)
+    for k, inicio in bloques:
+        fin = min(inicio + chunk_filas, filas)
+        test = _mascara_test(semilla, k, fin - inicio)
+        X = np.column_stack([cols[c][inicio:fin] for c in FEATURES])[test]
+        y = np.asarray(cols["resultado_binario"][inicio:fin])[test]
+        aciertos += int((pipeline.predict(np.nan_to_num(X)) == y).sum())
+        total += len(y)
+    return pipeline, (aciertos / total * 100 if total else 0.0)
+
+
+def entrenar_modelo(ruta_datos="data/partidos_historicos.csv", buscar=False, modo="auto"):
     """
     Entrena el modelo de predicción con datos históricos.
     Los datos deben incluir columnas como:
     equipo_local, equipo_visitante, goles_local, goles_visitante, corners, tarjetas, resultado.
+    El CSV se lee por chunks y se guarda una copia binaria columnar reutilizable.
+    modo: "completo" (todo en memoria), "muestra" (MAX_FILAS_MEMORIA filas al azar),
+    "incremental" (partial_fit por bloques) o "auto" (completo si cabe, si no muestra).
+    Con buscar=True elige los hiperparámetros por validación cruzada en paralelo
+    (ver services/busqueda_hiperparametros.py).
     """
     if not os.path.exists(ruta_datos):
         print("⚠️ No se encontró el archivo de datos históricos.")
         return
 
-    df = pd.read_csv(ruta_datos)
-
-    # Codificación simple (reemplazaremos luego con embeddings deportivos)
-    df["resultado_binario"] = df["resultado"].apply(lambda x: 1 if x == "local" else 0)
-    X = df[["goles_local", "goles_visitante", "corners", "tarjetas"]]
-    y = df["resultado_binario"]
+    cols, filas = abrir_cache(construir_cache(ruta_datos))
+    if modo == "auto":
+        modo = "completo" if filas <= MAX_FILAS_MEMORIA else "muestra"
 
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    modelo = RandomForestClassifier(n_estimators=200, random_state=42)
-    modelo.fit(X_train, y_train)
+    if modo == "incremental":
+        modelo, precision = _entrenar_incremental(cols, filas)
+        datos_hash = hash_datos(np.asarray(cols["resultado_binario"]))
+    else:
+        X, y = _muestra(cols, filas, filas if modo == "completo" else MAX_FILAS_MEMORIA)
+        X = np.nan_to_num(X)
+        datos_hash = hash_datos(X, y)
+        if buscar:
+            from services.busqueda_hiperparametros import buscar_hiperparametros
+            modelo, reporte = buscar_hiperparametros(X, y)
+            precision = reporte["mejor"]["accuracy_test"]
+        else:
+            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+            modelo = RandomForestClassifier(n_estimators=200, random_state=42, n_jobs=-1)
+            modelo.fit(X_train, y_train)
+            modelo.set_params(n_jobs=1)  # en producción se predice fila a fila: un hilo
 
-    y_pred = modelo.predict(X_test)
-    precision = accuracy_score(y_test, y_pred) * 100
+            y_pred = modelo.predict(X_test)
+            precision = accuracy_score(y_test, y_pred) * 100
 
-    joblib.dump(modelo, MODEL_PATH)
-    print(f"✅ Modelo entrenado y guardado con precisión: {precision:.2f}%")
+    pico_mb = _pico_memoria_mb()
+    version = publicar_modelo(
+        modelo,
+        NOMBRE_MODELO,
+        metricas={"accuracy_test": round(precision, 2), "filas": filas, "modo": modo, "pico_memoria_mb": pico_mb},
+        features=FEATURES,
+        datos_hash=datos_hash,
+    )
+    print(f"✅ Modelo entrenado ({modo}, {filas} filas) y publicado como {version} con precisión: {precision:.2f}%")
+    print(f"🧮 Pico de memoria: {pico_mb} MB")
     return precision
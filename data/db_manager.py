@@ -5,9 +5,32 @@ import os
 # Ruta de la base de datos
 DB_PATH = os.path.join(os.path.dirname(__file__), "bot_predicciones.db")
 
-def crear_tablas():
+# Columnas que la ingesta de api-sports agregó a `partidos` (se añaden a bases viejas)
+COLUMNAS_INGESTA = {
+    "fixture_id": "INTEGER",
+    "liga_id": "INTEGER",
+    "temporada": "INTEGER",
+    "estado": "TEXT",
+    "goles_local": "INTEGER",
+    "goles_visitante": "INTEGER",
+    "actualizado": "TEXT",
+}
+
+
+def conectar(db_path=None):
+    """
+    Conexión con WAL y espera ante bloqueos: varios hilos/procesos pueden
+    escribir por turnos sin 'database is locked'.
+    """
+    conn = sqlite3.connect(db_path or DB_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def crear_tablas(db_path=None):
     """Crea las tablas principales si no existen."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(db_path or DB_PATH)
     cursor = conn.cursor()
 
     cursor.execute('''
@@ -36,6 +59,28 @@ def crear_tablas():
     )
     ''')
 
+    # Migración: columnas de la ingesta y clave única por fixture para los upserts
+    existentes = {fila[1] for fila in cursor.execute("PRAGMA table_info(partidos)")}
+    for columna, tipo in COLUMNAS_INGESTA.items():
+        if columna not in existentes:
+            cursor.execute(f"ALTER TABLE partidos ADD COLUMN {columna} {tipo}")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_partidos_fixture ON partidos(fixture_id)")
+
+    # Checkpoint de la ingesta por liga y temporada
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS ingesta_progreso (
+        liga_id INTEGER,
+        temporada INTEGER,
+        pagina INTEGER DEFAULT 0,
+        total_paginas INTEGER,
+        filas INTEGER DEFAULT 0,
+        pendientes INTEGER DEFAULT 0,
+        completado INTEGER DEFAULT 0,
+        actualizado TEXT,
+        PRIMARY KEY (liga_id, temporada)
+    )
+    ''')
+
     conn.commit()
     conn.close()
 
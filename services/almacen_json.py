@@ -0,0 +1,181 @@
+"""
+Almacén JSON seguro entre procesos para Neurobet IA.
+
+Con varios workers de gunicorn, cada archivo de data/ puede ser leído y
+escrito a la vez por procesos distintos. Aquí se centraliza:
+
+  - bloqueo(path): lock exclusivo (flock) sobre un archivo en data/locks/,
+    reentrante dentro del mismo hilo; también excluye a otros hilos del proceso.
+  - escribir_json: escritura atómica (archivo temporal + os.replace), así
+    los lectores sin lock ven siempre la versión anterior o la nueva.
+  - transaccion_json: leer-modificar-escribir bajo el lock.
+  - ejecutar_como_lider: garantiza que un trabajo de fondo corre en un solo
+    proceso; si ese proceso muere, otro worker toma el relevo.
+"""
+
+import os
+import json
+import fcntl
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from services.metricas_service import ALMACEN_SEGUNDOS, ALMACEN_BYTES, etiqueta_archivo
+
+logger = logging.getLogger(__name__)
+
+LOCKS_DIR = os.path.join("data", "locks")
+INTERVALO_LIDER = int(os.getenv("LIDER_REINTENTO_SEGUNDOS", 30))
+
+_locales = threading.local()
+# nombre → descriptor abierto mientras este proceso sea el líder
+_liderazgos = {}
+_lock_liderazgos = threading.Lock()
+
+
+# === LOCKS === #
+def _ruta_lock(path) -> str:
+    """Archivo de lock en LOCKS_DIR para un path (mismo archivo → mismo lock)."""
+    absoluto = os.path.realpath(os.fspath(path))
+    sufijo = hashlib.sha1(absoluto.encode()).hexdigest()[:10]
+    return os.path.join(LOCKS_DIR, f"{os.path.basename(absoluto)}-{sufijo}.lock")
+
+
+@contextmanager
+def bloqueo(path):
+    """Lock exclusivo entre procesos (y entre hilos) asociado a un archivo."""
+    ruta_lock = _ruta_lock(path)
+    tenidos = getattr(_locales, "tenidos", None)
+    if tenidos is None:
+        tenidos = _locales.tenidos = {}
+    if ruta_lock in tenidos:
+        tenidos[ruta_lock] += 1
+        try:
+            yield
+        finally:
+            tenidos[ruta_lock] -= 1
+        return
+
+    os.makedirs(LOCKS_DIR, exist_ok=True)
+    fd = os.open(ruta_lock, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        tenidos[ruta_lock] = 1
+        try:
+            yield
+        finally:
+            del tenidos[ruta_lock]
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+# === LECTURA / ESCRITURA === #
+def leer_json(path, defecto=None):
+    """
+    Lee un JSON sin lock (las escrituras son atómicas).
+    Si no existe o está corrupto devuelve defecto() si es invocable, o defecto.
+    """
+    t0 = time.perf_counter()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            datos = json.load(f)
+            archivo = etiqueta_archivo(path)
+            ALMACEN_SEGUNDOS.observar(time.perf_counter() - t0, operacion="leer", archivo=archivo)
+            ALMACEN_BYTES.observar(os.fstat(f.fileno()).st_size, operacion="leer", archivo=archivo)
+            return datos
+    except FileNotFoundError:
+        pass
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        logger.error(f"❌ JSON ilegible en {path}: {e}")
+    return defecto() if callable(defecto) else defecto
+
+
+def escribir_json(path, datos, indent=2):
+    """Escribe el JSON de forma atómica (temporal en el mismo directorio + os.replace)."""
+    directorio = os.path.dirname(os.fspath(path)) or "."
+    os.makedirs(directorio, exist_ok=True)
+    with bloqueo(path):
+        t0 = time.perf_counter()
+        fd, tmp = tempfile.mkstemp(dir=directorio, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(datos, f, ensure_ascii=False, indent=indent, default=str)
+                f.flush()
+                tamano = os.fstat(f.fileno()).st_size
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+            archivo = etiqueta_archivo(path)
+            ALMACEN_SEGUNDOS.observar(time.perf_counter() - t0, operacion="escribir", archivo=archivo)
+            ALMACEN_BYTES.observar(tamano, operacion="escribir", archivo=archivo)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+
+@contextmanager
+def transaccion_json(path, defecto=dict, indent=2):
+    """
+    Leer-modificar-escribir bajo lock:
+
+        with transaccion_json(ruta, list) as historial:
+            historial.append(registro)
+
+    Los datos se modifican en sitio; se guardan al salir si no hubo excepción.
+    """
+    with bloqueo(path):
+        datos = leer_json(path, defecto)
+        yield datos
+        escribir_json(path, datos, indent=indent)
+
+
+# === LÍDER PARA TRABAJOS DE FONDO === #
+def adquirir_lider(nombre: str) -> bool:
+    """
+    Intenta ser el único proceso que ejecuta `nombre` (flock no bloqueante).
+    El lock se mantiene mientras viva el proceso; el SO lo libera si muere.
+    """
+    with _lock_liderazgos:
+        if nombre in _liderazgos:
+            return True
+        os.makedirs(LOCKS_DIR, exist_ok=True)
+        fd = os.open(os.path.join(LOCKS_DIR, f"lider_{nombre}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        _liderazgos[nombre] = fd
+        return True
+
+
+def es_lider(nombre: str) -> bool:
+    return nombre in _liderazgos
+
+
+def ejecutar_como_lider(nombre: str, funcion, intervalo=INTERVALO_LIDER):
+    """
+    Ejecuta funcion() una sola vez en el proceso que gane el liderazgo.
+    Los demás procesos reintentan cada `intervalo` segundos en un hilo
+    daemon, por si el líder actual cae.
+    """
+    if adquirir_lider(nombre):
+        logger.info(f"👑 Proceso {os.getpid()} es líder de '{nombre}'.")
+        funcion()
+        return True
+
+    def esperar_turno():
+        while not adquirir_lider(nombre):
+            time.sleep(intervalo)
+        logger.info(f"👑 Proceso {os.getpid()} toma el relevo de '{nombre}'.")
+        funcion()
+
+    threading.Thread(target=esperar_turno, name=f"lider-{nombre}", daemon=True).start()
+    logger.info(f"⏸️ Proceso {os.getpid()} en espera para '{nombre}' (otro worker es líder).")
+    return False
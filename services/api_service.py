@@ -1,17 +1,24 @@
 import os
 import logging
 import requests
+from datetime import date
+
+from services.feature_store_service import ingestar_partidos_api
+from services.metricas_service import llamar_api
+from services import trazas_service as trazas
 
 # === CONFIGURACIÓN DE LOGS === #
 logger = logging.getLogger(__name__)
 
 # === CLAVE DE API Y URL BASE === #
 API_KEY = os.getenv("API_KEY", "329f4fac732d45049158a52092727496")
-BASE_URL = "https://api.football-data.org/v4"  # Puedes cambiar a otra API si lo prefieres
+# Configurable para apuntar a otra API o a un servidor falso (tools/fake_football.py)
+BASE_URL = os.getenv("FOOTBALL_DATA_URL", "https://api.football-data.org/v4")
 HEADERS = {"X-Auth-Token": API_KEY}
 
 
 # === FUNCIÓN PRINCIPAL === #
+@trazas.trazado("api.estadisticas_equipo")
 def obtener_estadisticas_equipo(nombre_equipo: str):
     """
     Busca estadísticas recientes del equipo mediante la API.
@@ -19,10 +26,11 @@ def obtener_estadisticas_equipo(nombre_equipo: str):
     """
     try:
         logger.info(f"📡 Consultando datos del equipo: {nombre_equipo}")
+        trazas.atributo("equipo", nombre_equipo)
 
         # === 1️⃣ Buscar información general del equipo === #
         url_teams = f"{BASE_URL}/teams"
-        response = requests.get(url_teams, headers=HEADERS)
+        response = llamar_api("teams", requests.get, url_teams, headers=HEADERS)
         response.raise_for_status()
 
         data = response.json()
@@ -35,13 +43,14 @@ def obtener_estadisticas_equipo(nombre_equipo: str):
                 equipo_id = equipo["id"]
                 break
 
+        trazas.atributo("encontrado", bool(equipo_id))
         if not equipo_id:
             logger.warning(f"⚠️ No se encontró el equipo '{nombre_equipo}' en la API.")
             return None
 
         # === 2️⃣ Obtener últimos partidos del equipo === #
         url_matches = f"{BASE_URL}/teams/{equipo_id}/matches?status=FINISHED&limit=10"
-        response = requests.get(url_matches, headers=HEADERS)
+        response = llamar_api("teams/matches", requests.get, url_matches, headers=HEADERS)
         response.raise_for_status()
 
         matches = response.json().get("matches", [])
@@ -49,6 +58,12 @@ def obtener_estadisticas_equipo(nombre_equipo: str):
             logger.warning(f"⚠️ No hay partidos recientes disponibles para {nombre_equipo}.")
             return None
 
+        # Los partidos descargados alimentan el feature store (deduplicados por ID)
+        try:
+            ingestar_partidos_api(matches)
+        except Exception as e:
+            logger.error(f"❌ Error ingiriendo partidos en el feature store: {e}")
+
         # === 3️⃣ Procesar estadísticas === #
         goles_favor = 0
         goles_contra = 0
@@ -106,3 +121,37 @@ def obtener_estadisticas_equipo(nombre_equipo: str):
     except Exception as e:
         logger.error(f"❌ Error procesando estadísticas de {nombre_equipo}: {e}")
         return None
+
+
+# === PARTIDOS DEL DÍA === #
+@trazas.trazado("api.partidos_del_dia")
+def obtener_partidos_del_dia(fecha: str = None):
+    """
+    Partidos programados para `fecha` (por defecto hoy) en las competiciones
+    del plan. Devuelve [{"local", "visitante", "competicion", "hora"}], o []
+    si la API falla.
+    """
+    fecha = fecha or date.today().isoformat()
+    try:
+        url = f"{BASE_URL}/matches?dateFrom={fecha}&dateTo={fecha}&status=SCHEDULED,TIMED"
+        response = llamar_api("matches_dia", requests.get, url, headers=HEADERS, timeout=10)
+        response.raise_for_status()
+        partidos = [
+            {
+                "local": m["homeTeam"]["name"],
+                "visitante": m["awayTeam"]["name"],
+                "competicion": (m.get("competition") or {}).get("name"),
+                "hora": m.get("utcDate"),
+            }
+            for m in response.json().get("matches", [])
+            if m.get("status") in ("SCHEDULED", "TIMED")
+        ]
+        trazas.atributo("partidos", len(partidos))
+        logger.info(f"📅 {len(partidos)} partidos programados para {fecha}.")
+        return partidos
+    except requests.exceptions.RequestException as e:
+        logger.error(f"🌐 Error de conexión con la API: {e}")
+        return []
+    except Exception as e:
+        logger.error(f"❌ Error procesando los partidos del día: {e}")
+        return []
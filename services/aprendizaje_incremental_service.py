@@ -0,0 +1,205 @@
+import os
+import copy
+import time
+import logging
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from services.evaluacion_service import cargar_historial, guardar_historial, HISTORIAL_PATH
+from services.almacen_json import bloqueo
+from services.cambios_service import firma_archivo, marcar_escritura_propia
+
+logger = logging.getLogger(__name__)
+
+# === RUTAS Y PARÁMETROS === #
+MODELO_INCREMENTAL_PATH = "data/modelo_incremental.joblib"
+TAM_LOTE = int(os.getenv("INCREMENTAL_TAM_LOTE", 32))
+# Muestras mínimas antes de usar el modelo incremental en predicciones
+MIN_MUESTRAS_PREDICCION = int(os.getenv("INCREMENTAL_MIN_MUESTRAS", 50))
+# Lotes recientes usados para la precisión "actual" frente a la global (deriva)
+VENTANA_DERIVA = 10
+
+CLASES = np.array([-1, 0, 1])
+
+_lock = threading.Lock()
+_estado = None
+# Firma del artefacto al cargarlo: los workers que no entrenan recargan si cambió
+_firma_estado = None
+
+
+# === ESTADO DEL MODELO === #
+def _estado_inicial():
+    # sklearn tarda ~1.5 s en importarse: solo se carga al crear o leer el modelo
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.preprocessing import StandardScaler
+
+    return {
+        "modelo": SGDClassifier(loss="log_loss", alpha=1e-4, learning_rate="optimal", random_state=42),
+        "escalador": StandardScaler(),
+        "n_vistos": 0,
+        "aciertos_prequenciales": 0,
+        "evaluados_prequenciales": 0,
+        "lotes": [],  # métricas por lote (acotado a los últimos 200)
+    }
+
+
+def _cargar_estado():
+    global _estado, _firma_estado
+    firma = firma_archivo(MODELO_INCREMENTAL_PATH)
+    if _estado is None or firma != _firma_estado:
+        _firma_estado = firma
+        if firma is not None:
+            try:
+                from joblib import load
+
+                _estado = load(MODELO_INCREMENTAL_PATH)
+            except Exception as e:
+                logger.error(f"❌ Modelo incremental ilegible, se reinicia: {e}")
+                _estado = _estado_inicial()
+        else:
+            _estado = _estado_inicial()
+    return _estado
+
+
+def _guardar_estado(estado):
+    """Escritura atómica: otros workers pueden estar leyendo el artefacto."""
+    global _firma_estado
+    from joblib import dump
+
+    tmp = f"{MODELO_INCREMENTAL_PATH}.tmp"
+    dump(estado, tmp)
+    os.replace(tmp, MODELO_INCREMENTAL_PATH)
+    _firma_estado = firma_archivo(MODELO_INCREMENTAL_PATH)
+
+
+def _etiqueta(item):
+    """Convierte resultado_real ('X gana' / 'Empate') en 1, 0 o -1 desde la óptica del local."""
+    real = item.get("resultado_real")
+    if not real:
+        return None
+    if real == "Empate":
+        return 0
+    local, _, visitante = item["partido"].partition("vs")
+    if real == f"{local.strip()} gana":
+        return 1
+    if real == f"{visitante.strip()} gana":
+        return -1
+    return None
+
+
+# === ACTUALIZACIÓN INCREMENTAL === #
+def actualizar_modelo_incremental(tam_lote: int = TAM_LOTE):
+    """
+    Consume las predicciones ya evaluadas (resultado_real + features) que aún
+    no se usaron para aprender y actualiza el modelo con partial_fit en lotes.
+    Cada lote se evalúa antes de entrenarse (precisión prequencial).
+    Devuelve las métricas de esta pasada.
+    """
+    global _estado
+    with _lock, bloqueo(HISTORIAL_PATH):
+        historial = cargar_historial()
+
+        pendientes = [
+            (item, _etiqueta(item)) for item in historial
+            if item.get("resultado_real") and item.get("features") and not item.get("aprendido")
+        ]
+        pendientes = [(item, y) for item, y in pendientes if y is not None]
+        if not pendientes:
+            return {"lotes": 0, "filas": 0}
+
+        # Se entrena sobre una copia: predecir_proba_incremental sigue leyendo el
+        # modelo publicado sin lock y nunca ve coef_/mean_ a medio actualizar
+        estado = copy.deepcopy(_cargar_estado())
+        modelo = estado["modelo"]
+        escalador = estado["escalador"]
+        inicio_total = time.perf_counter()
+        lotes = []
+
+        for i in range(0, len(pendientes), tam_lote):
+            lote = pendientes[i:i + tam_lote]
+            X = np.array([item["features"] for item, _ in lote], dtype=np.float64)
+            y = np.array([y for _, y in lote])
+
+            inicio = time.perf_counter()
+            aciertos = None
+            deriva = None
+            if estado["n_vistos"] > 0:
+                # Evaluar primero con el modelo actual (test-then-train)
+                aciertos = int((modelo.predict(escalador.transform(X)) == y).sum())
+                estado["aciertos_prequenciales"] += aciertos
+                estado["evaluados_prequenciales"] += len(y)
+                # Deriva de features: desplazamiento medio en desviaciones típicas
+                std = np.sqrt(escalador.var_) + 1e-9
+                deriva = round(float(np.mean(np.abs(X.mean(axis=0) - escalador.mean_) / std)), 4)
+
+            escalador.partial_fit(X)
+            modelo.partial_fit(escalador.transform(X), y, classes=CLASES)
+            estado["n_vistos"] += len(y)
+
+            metrica = {
+                "fecha": datetime.utcnow().isoformat(),
+                "filas": len(y),
+                "ms": round((time.perf_counter() - inicio) * 1000, 3),
+                "precision_lote": round(aciertos / len(y) * 100, 2) if aciertos is not None else None,
+                "deriva_features": deriva,
+            }
+            lotes.append(metrica)
+            for item, _ in lote:
+                item["aprendido"] = True
+
+        estado["lotes"] = (estado["lotes"] + lotes)[-200:]
+        _guardar_estado(estado)
+        _estado = estado
+        # Escritura propia del ciclo: no debe disparar el siguiente
+        firma_antes = firma_archivo(HISTORIAL_PATH)
+        guardar_historial(historial)
+        marcar_escritura_propia(HISTORIAL_PATH, firma_antes, ("historial",))
+
+        resumen = obtener_metricas_incrementales()
+        resumen.update({
+            "lotes": len(lotes),
+            "filas": len(pendientes),
+            "ms_total": round((time.perf_counter() - inicio_total) * 1000, 3),
+        })
+    logger.info(f"🧬 Modelo incremental actualizado: {resumen}")
+    return resumen
+
+
+def obtener_metricas_incrementales():
+    """Costo de actualización y métricas de deriva del modelo incremental."""
+    estado = _cargar_estado()
+    evaluados = estado["evaluados_prequenciales"]
+    recientes = [l for l in estado["lotes"][-VENTANA_DERIVA:] if l["precision_lote"] is not None]
+    precision_global = round(estado["aciertos_prequenciales"] / evaluados * 100, 2) if evaluados else None
+    precision_reciente = (
+        round(sum(l["precision_lote"] * l["filas"] for l in recientes) / sum(l["filas"] for l in recientes), 2)
+        if recientes else None
+    )
+    return {
+        "n_vistos": estado["n_vistos"],
+        "precision_prequencial": precision_global,
+        "precision_reciente": precision_reciente,
+        # Negativo = el modelo acierta menos en los últimos lotes que en promedio
+        "deriva_precision": (
+            round(precision_reciente - precision_global, 2)
+            if precision_global is not None and precision_reciente is not None else None
+        ),
+        "deriva_features": next((l["deriva_features"] for l in reversed(estado["lotes"]) if l["deriva_features"] is not None), None),
+        "ms_ultimo_lote": estado["lotes"][-1]["ms"] if estado["lotes"] else None,
+    }
+
+
+def predecir_proba_incremental(features):
+    """
+    Probabilidades [-1, 0, 1] del modelo incremental, o None si todavía
+    no ha visto suficientes partidos reales. Sin lock: el estado publicado
+    no se modifica nunca (se entrena sobre una copia y se reemplaza).
+    """
+    estado = _cargar_estado()
+    if estado["n_vistos"] < MIN_MUESTRAS_PREDICCION:
+        return None
+    X = np.asarray(features, dtype=np.float64).reshape(1, -1)
+    proba = estado["modelo"].predict_proba(estado["escalador"].transform(X))[0]
+    return dict(zip(estado["modelo"].classes_.tolist(), proba.tolist()))
@@ -1,9 +1,13 @@
-import os
-import json
+import logging
 from datetime import datetime
+from functools import wraps
 from pathlib import Path
 from typing import List, Dict, Optional, Literal
 
+from services.almacen_json import leer_json, escribir_json, bloqueo
+
+logger = logging.getLogger(__name__)
+
 # Carpeta donde se guardan las apuestas
 DATA_DIR = Path("data")
 DATA_DIR.mkdir(exist_ok=True)
@@ -19,18 +23,21 @@ def _get_user_file(user_id: int) -> Path:
 
 def _load_user_bets(user_id: int) -> List[dict]:
     """Carga las apuestas del usuario, si no existe regresa lista vacía."""
-    fpath = _get_user_file(user_id)
-    if fpath.exists():
-        with open(fpath, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
+    return leer_json(_get_user_file(user_id), list)
 
 
 def _save_user_bets(user_id: int, apuestas: List[dict]) -> None:
     """Guarda la lista de apuestas del usuario."""
-    fpath = _get_user_file(user_id)
-    with open(fpath, "w", encoding="utf-8") as f:
-        json.dump(apuestas, f, indent=2, ensure_ascii=False)
+    escribir_json(_get_user_file(user_id), apuestas)
+
+
+def _con_bloqueo_usuario(func):
+    """Serializa leer-modificar-escribir del archivo del usuario entre workers."""
+    @wraps(func)
+    def envoltura(user_id, *args, **kwargs):
+        with bloqueo(_get_user_file(user_id)):
+            return func(user_id, *args, **kwargs)
+    return envoltura
 
 
 # ==========================
@@ -68,6 +75,7 @@ def decimal_a_americano(odd_decimal: float) -> int:
 #  CONFIGURACIÓN DE USUARIO
 # ==========================
 
+@_con_bloqueo_usuario
 def configurar_usuario_apuestas(
     user_id: int,
     casa: str = "Generica",
@@ -124,6 +132,16 @@ def obtener_config_usuario(user_id: int) -> dict:
 #  REGISTRO DE APUESTAS
 # ==========================
 
+def _convertir_odd(odd_input: str) -> tuple:
+    """Devuelve (odd_guardado, odd_decimal, formato) según lo que ingresó el usuario."""
+    odd_input = str(odd_input).strip()
+    if odd_input.startswith("+") or odd_input.startswith("-"):
+        # es formato americano; guardamos el original del usuario
+        return odd_input, americano_a_decimal(float(odd_input)), "americano"
+    # asumimos decimal
+    return odd_input, float(odd_input), "decimal"
+
+
 def registrar_apuesta(
     user_id: int,
     partido: str,
@@ -139,22 +157,33 @@ def registrar_apuesta(
     - odd_input: puede venir como "1.8" o "-120"
     - convierte internamente a decimal para cálculos
     """
+    # La simulación del parley no toca el archivo: se hace antes de tomar el bloqueo
+    evaluacion = None
+    if es_parley and selecciones:
+        evaluacion = _evaluar_parley(selecciones, monto, _convertir_odd(odd_input)[1])
+    return _guardar_apuesta(user_id, partido, tipo_apuesta, odd_input, monto, resultado,
+                            es_parley, selecciones, evaluacion)
+
+
+@_con_bloqueo_usuario
+def _guardar_apuesta(
+    user_id: int,
+    partido: str,
+    tipo_apuesta: str,
+    odd_input: str,
+    monto: float,
+    resultado: ResultadoTipo,
+    es_parley: bool,
+    selecciones: Optional[List[dict]],
+    evaluacion: Optional[dict],
+) -> dict:
+    """Añade la apuesta al archivo del usuario y actualiza su bank (bajo bloqueo)."""
     apuestas = _load_user_bets(user_id)
     config = obtener_config_usuario(user_id)
     bank_actual = float(config.get("bank_actual", 0.0))
 
     # convertir odd según lo que ingresó
-    odd_input = str(odd_input).strip()
-    if odd_input.startswith("+") or odd_input.startswith("-"):
-        # es formato americano
-        odd_decimal = americano_a_decimal(float(odd_input))
-        odd_guardado = odd_input  # guardamos el original del usuario
-        formato = "americano"
-    else:
-        # asumimos decimal
-        odd_decimal = float(odd_input)
-        odd_guardado = odd_input
-        formato = "decimal"
+    odd_guardado, odd_decimal, formato = _convertir_odd(odd_input)
 
     # calcular bank final según resultado
     bank_final = bank_actual  # por defecto si pendiente
@@ -190,9 +219,11 @@ def registrar_apuesta(
         "timestamp": datetime.utcnow().isoformat(),
     }
 
-    # si es parley, guardamos también las selecciones
+    # si es parley, guardamos también las selecciones y su simulación
     if es_parley and selecciones:
         apuesta["selecciones"] = selecciones
+        if evaluacion:
+            apuesta["evaluacion"] = evaluacion
 
     # guardamos la apuesta
     apuestas.append(apuesta)
@@ -207,10 +238,30 @@ def registrar_apuesta(
     return apuesta
 
 
+def _evaluar_parley(selecciones: List[dict], monto: float, odd_decimal: float) -> Optional[dict]:
+    """
+    Probabilidad de acierto y valor esperado del parley contra la cuota
+    combinada (Monte Carlo, services/parley_service.py). None si faltan datos.
+    """
+    # Import diferido: parley_service importa este módulo (conversión de cuotas)
+    from services.parley_service import evaluar_selecciones, ENSAYOS_REGISTRO
+
+    try:
+        r = evaluar_selecciones(selecciones, monto, cuota_total=odd_decimal, ensayos=ENSAYOS_REGISTRO)
+    except Exception as e:
+        logger.error(f"❌ No se pudo simular el parley: {e}")
+        return None
+    if r is None:
+        return None
+    return {k: r[k] for k in ("prob_acierto", "prob_independientes", "cuota_justa", "valor_esperado",
+                              "roi_esperado", "distribucion_pagos", "ensayos")}
+
+
 # ==========================
 #  ACTUALIZAR RESULTADO
 # ==========================
 
+@_con_bloqueo_usuario
 def actualizar_resultado_apuesta(
     user_id: int,
     index: int,
@@ -1,50 +1,57 @@
 import os
-import json
 import logging
 from datetime import datetime
-from joblib import dump
+
+from services.aprendizaje_incremental_service import actualizar_modelo_incremental
+from services.almacen_json import leer_json, escribir_json, transaccion_json, bloqueo
 
 logger = logging.getLogger(__name__)
 
 MODEL_STATE_PATH = "data/modelo_ia.json"
-MODEL_TRAINED_PATH = "data/modelo_entrenado.joblib"
 
 
 def inicializar_modelo():
     """Crea un modelo base si no existe"""
-    if not os.path.exists(MODEL_STATE_PATH):
+    if os.path.exists(MODEL_STATE_PATH):
+        return
+    with bloqueo(MODEL_STATE_PATH):
+        if os.path.exists(MODEL_STATE_PATH):
+            return
         estado_inicial = {
             "sesgo_local": 0.0,
             "sesgo_visitante": 0.0,
             "factor_confianza": 1.0,
             "historial_precision": []
         }
-        os.makedirs("data", exist_ok=True)
-        with open(MODEL_STATE_PATH, "w", encoding="utf-8") as f:
-            json.dump(estado_inicial, f, indent=2)
+        escribir_json(MODEL_STATE_PATH, estado_inicial)
         logger.info("🧩 Modelo base inicializado correctamente (modo simulado).")
 
 
 def evaluar_predicciones():
-    """Evalúa precisión simulada hasta tener datos reales"""
+    """
+    Actualiza el modelo incremental con las predicciones ya evaluadas y registra
+    su precisión. Mientras no haya datos reales, usa una precisión simulada.
+    """
     inicializar_modelo()
     try:
-        with open(MODEL_STATE_PATH, "r", encoding="utf-8") as f:
-            modelo = json.load(f)
-
-        precision_simulada = round(50 + os.urandom(1)[0] % 30, 2)  # 50–80%
-        modelo["historial_precision"].append({
-            "fecha": datetime.utcnow().isoformat(),
-            "precision": precision_simulada
-        })
-        modelo["factor_confianza"] = round(precision_simulada / 100, 3)
-
-        with open(MODEL_STATE_PATH, "w", encoding="utf-8") as f:
-            json.dump(modelo, f, indent=2)
-
-        dump(modelo, MODEL_TRAINED_PATH)  # genera joblib simulado
-        logger.info(f"🧠 Modelo actualizado automáticamente. Precisión simulada: {precision_simulada}%")
-        return {"precision": precision_simulada}
+        incremental = actualizar_modelo_incremental()
+        if incremental["lotes"] and incremental.get("precision_prequencial") is not None:
+            precision = incremental["precision_prequencial"]
+            fuente = "incremental"
+        else:
+            precision = round(50 + os.urandom(1)[0] % 30, 2)  # 50–80%
+            fuente = "simulada"
+
+        with transaccion_json(MODEL_STATE_PATH) as modelo:
+            modelo.setdefault("historial_precision", []).append({
+                "fecha": datetime.utcnow().isoformat(),
+                "precision": precision,
+                "fuente": fuente,
+            })
+            modelo["factor_confianza"] = round(precision / 100, 3)
+
+        logger.info(f"🧠 Modelo actualizado automáticamente. Precisión {fuente}: {precision}%")
+        return {"precision": precision, "fuente": fuente, "incremental": incremental}
 
     except Exception as e:
         logger.error(f"❌ Error evaluando modelo: {e}")
@@ -53,7 +60,4 @@ def evaluar_predicciones():
 
 def obtener_estado_modelo():
     """Devuelve el estado actual del modelo IA"""
-    if not os.path.exists(MODEL_STATE_PATH):
-        return None
-    with open(MODEL_STATE_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return leer_json(MODEL_STATE_PATH)
@@ -0,0 +1,213 @@
+"""
+Búsqueda de hiperparámetros para el RandomForest de Neurobet IA.
+
+Uso:
+    python -m services.busqueda_hiperparametros                 # dataset simulado
+    python -m services.busqueda_hiperparametros --csv data/partidos_historicos.csv
+    python -m services.busqueda_hiperparametros --jobs 4 --guardar
+
+Cada configuración se valida con k-fold estratificado. Las evaluaciones
+se reparten entre procesos (un candidato por núcleo) y tras cada fold se
+descarta la mitad peor de los candidatos (successive halving), así las
+configuraciones malas no consumen los k folds completos.
+"""
+
+import os
+import json
+import time
+import pickle
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import ParameterGrid, StratifiedKFold, train_test_split
+from sklearn.metrics import accuracy_score
+
+logger = logging.getLogger(__name__)
+
+# === RUTAS === #
+DATA_DIR = Path("data")
+REPORTE_PATH = DATA_DIR / "reporte_hiperparametros.json"
+
+# === ESPACIO DE BÚSQUEDA POR DEFECTO === #
+ESPACIO_DEFECTO = {
+    "n_estimators": [100, 150, 300],
+    "max_depth": [6, 8, 12, None],
+    "min_samples_leaf": [1, 5],
+    "max_features": ["sqrt", 0.5],
+}
+
+# Datos compartidos por los procesos del pool (se envían una sola vez por proceso)
+_X = None
+_y = None
+
+
+def _inicializar_worker(X, y):
+    global _X, _y
+    _X, _y = X, y
+
+
+def _evaluar_fold(params, train_idx, test_idx, semilla):
+    """Entrena un candidato en un fold y devuelve (accuracy, segundos de ajuste)."""
+    modelo = RandomForestClassifier(random_state=semilla, n_jobs=1, **params)
+    inicio = time.perf_counter()
+    modelo.fit(_X[train_idx], _y[train_idx])
+    fit_s = time.perf_counter() - inicio
+    score = accuracy_score(_y[test_idx], modelo.predict(_X[test_idx]))
+    return score, fit_s
+
+
+def _medir_latencia_ms(modelo, X, repeticiones=50):
+    """Mediana de la latencia de predecir una sola fila (caso típico del bot)."""
+    fila = X[:1]
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        modelo.predict_proba(fila)
+        tiempos.append(time.perf_counter() - inicio)
+    return round(float(np.median(tiempos)) * 1000, 3)
+
+
+def buscar_hiperparametros(
+    X,
+    y,
+    espacio=None,
+    n_folds=5,
+    semilla=42,
+    n_jobs=-1,
+    fraccion_supervivientes=0.5,
+    ruta_reporte=REPORTE_PATH,
+):
+    """
+    Ejecuta la búsqueda y escribe un reporte JSON con accuracy CV y tiempo de
+    ajuste por candidato. El mejor se elige por accuracy CV; solo de él se
+    reportan accuracy en test, latencia de inferencia y tamaño.
+    Devuelve (mejor_modelo, reporte).
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    y = np.asarray(y)
+    candidatos = [dict(p) for p in ParameterGrid(espacio or ESPACIO_DEFECTO)]
+    workers = os.cpu_count() if n_jobs in (None, -1) else max(1, n_jobs)
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=semilla, stratify=y
+    )
+    folds = list(StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=semilla).split(X_train, y_train))
+
+    estado = [
+        {"params": p, "scores": [], "fit_s": [], "estado": "completo"}
+        for p in candidatos
+    ]
+    vivos = list(range(len(candidatos)))
+    logger.info(f"🔎 Búsqueda: {len(candidatos)} candidatos, {n_folds} folds, {workers} procesos")
+
+    inicio_total = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_inicializar_worker, initargs=(X_train, y_train)
+    ) as pool:
+        for k, (train_idx, test_idx) in enumerate(folds):
+            futuros = {
+                i: pool.submit(_evaluar_fold, candidatos[i], train_idx, test_idx, semilla)
+                for i in vivos
+            }
+            for i, fut in futuros.items():
+                score, fit_s = fut.result()
+                estado[i]["scores"].append(score)
+                estado[i]["fit_s"].append(fit_s)
+
+            # Corte temprano: solo sigue la mejor fracción (orden estable → reproducible)
+            if k < n_folds - 1 and len(vivos) > 1:
+                vivos.sort(key=lambda i: (-np.mean(estado[i]["scores"]), i))
+                n_siguen = max(1, int(np.ceil(len(vivos) * fraccion_supervivientes)))
+                for i in vivos[n_siguen:]:
+                    estado[i]["estado"] = f"descartado_fold_{k + 1}"
+                vivos = vivos[:n_siguen]
+            logger.info(f"📐 Fold {k + 1}/{n_folds}: {len(vivos)} candidatos siguen")
+
+    # === Ganador por accuracy CV; el test solo se usa para reportarlo === #
+    mejor_idx = max(vivos, key=lambda i: np.mean(estado[i]["scores"]))
+    mejor_modelo = RandomForestClassifier(random_state=semilla, n_jobs=-1, **candidatos[mejor_idx])
+    mejor_modelo.fit(X_train, y_train)
+    mejor_modelo.set_params(n_jobs=1)  # latencia medida como en producción: una fila, un hilo
+    e = estado[mejor_idx]
+    e["accuracy_test"] = round(accuracy_score(y_test, mejor_modelo.predict(X_test)) * 100, 2)
+    e["latencia_ms"] = _medir_latencia_ms(mejor_modelo, X_test)
+    e["tamano_bytes"] = len(pickle.dumps(mejor_modelo, protocol=pickle.HIGHEST_PROTOCOL))
+
+    filas = []
+    for i, e in enumerate(estado):
+        fila = {
+            "params": e["params"],
+            "estado": e["estado"],
+            "folds_evaluados": len(e["scores"]),
+            "accuracy_cv": round(float(np.mean(e["scores"])) * 100, 2),
+            "fit_s_medio": round(float(np.mean(e["fit_s"])), 4),
+        }
+        for clave in ("accuracy_test", "latencia_ms", "tamano_bytes"):
+            if clave in e:
+                fila[clave] = e[clave]
+        filas.append(fila)
+    mejor = filas[mejor_idx]
+    filas.sort(key=lambda f: (-f["folds_evaluados"], -f["accuracy_cv"]))
+
+    reporte = {
+        "semilla": semilla,
+        "n_folds": n_folds,
+        "procesos": workers,
+        "n_filas": int(len(y)),
+        "duracion_s": round(time.perf_counter() - inicio_total, 2),
+        "mejor": mejor,
+        "candidatos": filas,
+    }
+
+    ruta_reporte = Path(ruta_reporte)
+    ruta_reporte.parent.mkdir(parents=True, exist_ok=True)
+    with open(ruta_reporte, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, indent=2, ensure_ascii=False, default=str)
+    logger.info(f"🏁 Búsqueda completada en {reporte['duracion_s']}s. Mejor: {reporte['mejor']}")
+    return mejor_modelo, reporte
+
+
+# === CLI === #
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Búsqueda de hiperparámetros Neurobet IA")
+    parser.add_argument("--csv", help="CSV histórico (columnas de ai_model/train_model)")
+    parser.add_argument("--n-partidos", type=int, default=10000, help="Tamaño del dataset simulado")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=-1, help="Procesos (-1 = todos los núcleos)")
+    parser.add_argument("--reporte", default=str(REPORTE_PATH))
+    parser.add_argument("--guardar", action="store_true", help="Publica el mejor modelo en el registro como versión activa")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+    if args.csv:
+        from ai_model.train_model import FEATURES, NOMBRE_MODELO, cargar_dataset
+        df = cargar_dataset(args.csv)
+        X, y = df[FEATURES].to_numpy(), df["resultado_binario"].to_numpy()
+    else:
+        from services.training_bootstrap import FEATURES, NOMBRE_MODELO, cargar_dataset_simulado
+        df = cargar_dataset_simulado(args.n_partidos, semilla=args.semilla)
+        X, y = df[FEATURES].to_numpy(), df["resultado"].to_numpy()
+
+    modelo, reporte = buscar_hiperparametros(
+        X, y, n_folds=args.folds, semilla=args.semilla, n_jobs=args.jobs, ruta_reporte=args.reporte
+    )
+
+    if args.guardar:
+        from services.registro_modelos import publicar_modelo, hash_datos
+        publicar_modelo(
+            modelo,
+            NOMBRE_MODELO,
+            metricas=reporte["mejor"],
+            features=FEATURES,
+            datos_hash=hash_datos(X, y),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import os
+import threading
+
+# === CONTADORES DE VERSIÓN POR FUENTE DE DATOS === #
+# Cada escritura relevante (historial, resultados) incrementa su contador.
+# Los ciclos automáticos comparan la firma actual con la última procesada
+# y se saltan el trabajo si nada cambió.
+_versiones = {}
+_lock = threading.Lock()
+
+# === ESCRITURAS PROPIAS DE LOS CICLOS === #
+# Un ciclo que reescribe sus propias entradas (marcar filas como aprendidas)
+# las anota aquí para que firma_entradas no las cuente como cambio.
+# Cualquier escritura ajena, antes o después, sí cambia la firma.
+_propias = {}          # clave → cambios hechos por los propios ciclos
+_firmas_propias = {}   # archivo → (firma antes, firma después) de la última escritura propia
+
+
+def marcar_cambio(clave: str) -> int:
+    """Incrementa la versión de una fuente de datos y devuelve la nueva."""
+    with _lock:
+        _versiones[clave] = _versiones.get(clave, 0) + 1
+        return _versiones[clave]
+
+
+def obtener_version(clave: str) -> int:
+    """Devuelve la versión actual (0 si nunca cambió en este proceso)."""
+    return _versiones.get(clave, 0)
+
+
+def marcar_escritura_propia(path, firma_antes, claves=()):
+    """
+    Anota una escritura de un ciclo sobre sus propias entradas.
+    Debe llamarse justo después de escribir, con el lock del archivo tomado,
+    y con la firma que tenía el archivo antes de escribirlo.
+    """
+    with _lock:
+        _firmas_propias[path] = (firma_antes, firma_archivo(path))
+        for clave in claves:
+            _propias[clave] = _propias.get(clave, 0) + 1
+
+
+def firma_archivo(path):
+    """
+    Firma barata de un archivo (mtime_ns, tamaño).
+    Detecta escrituras hechas por otros procesos, donde el contador
+    en memoria no se entera.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def firma_entradas(claves, archivos=()):
+    """
+    Combina versiones en memoria y firmas de archivo en una tupla comparable,
+    descontando las escrituras propias de los ciclos.
+    """
+    with _lock:
+        versiones = tuple(_versiones.get(c, 0) - _propias.get(c, 0) for c in claves)
+        propias = {a: _firmas_propias.get(a) for a in archivos}
+    firmas = []
+    for archivo in archivos:
+        firma = firma_archivo(archivo)
+        # Si el archivo sigue tal cual lo dejó la escritura propia, cuenta como el de antes
+        if propias[archivo] and firma == propias[archivo][1]:
+            firma = propias[archivo][0]
+        firmas.append(firma)
+    return versiones, tuple(firmas)
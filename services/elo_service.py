@@ -0,0 +1,275 @@
+"""
+Ratings de fuerza de equipos (Elo con incertidumbre al estilo Glicko).
+
+Cada equipo tiene un ID entero y su fila en tres arrays compactos del
+módulo array: rating, desviación (RD) y partidos jugados. Los nombres se
+resuelven con el feature store (nombre_canonico: "Barcelona" → "fc
+barcelona"), así las dos tablas usan las mismas claves. Actualizar un partido terminado es
+O(1): se leen y escriben dos filas.
+
+Actualización (Glicko-1 para una sola partida, con ventaja de local):
+  - antes de jugar, la RD de cada equipo crece con INFLACION_RD (la
+    incertidumbre vuelve a subir si el equipo lleva tiempo sin datos)
+  - esperado E = 1 / (1 + 10^(−g(RD_rival)·(r + VENTAJA_LOCAL − r_rival)/400))
+  - el cambio de rating se multiplica por el margen de goles (como el
+    World Football Elo): 1 con 0–1 goles, 1.5 con 2, (11+N)/8 con N ≥ 3
+  - la RD baja con cada partido hasta RD_MINIMA, así los equipos nuevos se
+    mueven rápido y los consolidados despacio
+
+Lo alimentan los resultados que resuelve evaluacion_service y se puede
+reconstruir en bloque desde un histórico (reproducir), p. ej. el registro
+de resultados del feature store. Todo se persiste en un único .npz.
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from array import array
+from contextlib import contextmanager
+
+import numpy as np
+
+from services.almacen_json import bloqueo
+from services.cambios_service import firma_archivo
+from services import feature_store_service
+from services.feature_store_service import normalizar_nombre
+from services.metricas_service import ALMACEN_SEGUNDOS, ALMACEN_BYTES
+
+logger = logging.getLogger(__name__)
+
+# === RUTAS Y PARÁMETROS === #
+ELO_PATH = "data/elo.npz"
+RATING_INICIAL = 1500.0
+RD_INICIAL = 350.0
+RD_MINIMA = float(os.getenv("ELO_RD_MINIMA", 50))
+INFLACION_RD = float(os.getenv("ELO_INFLACION_RD", 10))
+VENTAJA_LOCAL = float(os.getenv("ELO_VENTAJA_LOCAL", 60))
+# Con menos partidos el rating todavía no se usa en predicciones
+MIN_PARTIDOS = int(os.getenv("ELO_MIN_PARTIDOS", 5))
+# Probabilidad de empate entre equipos parejos (se reduce con la diferencia)
+EMPATE_BASE = float(os.getenv("ELO_EMPATE_BASE", 0.28))
+
+_Q = math.log(10) / 400
+_G_FACTOR = 3 * _Q * _Q / (math.pi * math.pi)
+
+_lock = threading.RLock()
+_tabla = None
+_firma_cargada = None
+
+
+# === TABLA EN MEMORIA === #
+class _TablaElo:
+    def __init__(self):
+        self.ids = {}               # nombre normalizado → ID
+        self.nombres = []
+        self.rating = array("d")
+        self.rd = array("d")
+        self.partidos = array("i")
+        self.ingestados = set()     # IDs de partido ya contados
+
+    def id_equipo(self, nombre, crear=False):
+        clave = normalizar_nombre(nombre)
+        equipo_id = self.ids.get(clave)
+        if equipo_id is None and crear:
+            equipo_id = len(self.nombres)
+            self.ids[clave] = equipo_id
+            self.nombres.append(clave)
+            self.rating.append(RATING_INICIAL)
+            self.rd.append(RD_INICIAL)
+            self.partidos.append(0)
+        return equipo_id
+
+    def actualizar(self, id_local, id_visitante, goles_local, goles_visitante):
+        """Actualiza las dos filas con un resultado (O(1))."""
+        r_l, r_v = self.rating[id_local], self.rating[id_visitante]
+        rd_l = min(math.sqrt(self.rd[id_local] ** 2 + INFLACION_RD ** 2), RD_INICIAL)
+        rd_v = min(math.sqrt(self.rd[id_visitante] ** 2 + INFLACION_RD ** 2), RD_INICIAL)
+        s = 1.0 if goles_local > goles_visitante else (0.5 if goles_local == goles_visitante else 0.0)
+        margen = abs(goles_local - goles_visitante)
+        multiplicador = 1.0 if margen <= 1 else (1.5 if margen == 2 else (11 + margen) / 8)
+
+        for equipo, r, rd, r_rival, rd_rival, resultado, ventaja in (
+            (id_local, r_l, rd_l, r_v, rd_v, s, VENTAJA_LOCAL),
+            (id_visitante, r_v, rd_v, r_l, rd_l, 1 - s, -VENTAJA_LOCAL),
+        ):
+            g = 1 / math.sqrt(1 + _G_FACTOR * rd_rival * rd_rival)
+            esperado = 1 / (1 + 10 ** (-g * (r + ventaja - r_rival) / 400))
+            d2_inv = _Q * _Q * g * g * esperado * (1 - esperado)
+            precision = 1 / (rd * rd) + d2_inv
+            self.rating[equipo] = r + multiplicador * _Q / precision * g * (resultado - esperado)
+            self.rd[equipo] = max(math.sqrt(1 / precision), RD_MINIMA)
+            self.partidos[equipo] += 1
+
+
+# === PERSISTENCIA === #
+def _cargar():
+    global _tabla, _firma_cargada
+    if _tabla is not None and firma_archivo(ELO_PATH) == _firma_cargada:
+        return _tabla
+    with _lock:
+        firma = firma_archivo(ELO_PATH)
+        if _tabla is not None and firma == _firma_cargada:
+            return _tabla
+        tabla = _TablaElo()
+        if os.path.exists(ELO_PATH):
+            try:
+                t0 = time.perf_counter()
+                with np.load(ELO_PATH, allow_pickle=False) as npz:
+                    tabla.nombres = [str(n) for n in npz["nombres"]]
+                    tabla.ids = {n: i for i, n in enumerate(tabla.nombres)}
+                    tabla.rating = array("d", npz["rating"].astype(np.float64).tobytes())
+                    tabla.rd = array("d", npz["rd"].astype(np.float64).tobytes())
+                    tabla.partidos = array("i", npz["partidos"].astype(np.int32).tobytes())
+                    tabla.ingestados = set(npz["ingestados"].tolist())
+                ALMACEN_SEGUNDOS.observar(time.perf_counter() - t0, operacion="leer", archivo="elo.npz")
+                ALMACEN_BYTES.observar(os.path.getsize(ELO_PATH), operacion="leer", archivo="elo.npz")
+                logger.info(f"📦 Ratings Elo cargados: {len(tabla.nombres)} equipos")
+            except Exception as e:
+                logger.error(f"❌ Ratings Elo ilegibles, se empieza de cero: {e}")
+                tabla = _TablaElo()
+        _tabla = tabla
+        _firma_cargada = firma
+    return _tabla
+
+
+def guardar():
+    """Persiste la tabla de forma atómica."""
+    tabla = _cargar()
+    with _lock, bloqueo(ELO_PATH):
+        _escribir(tabla)
+
+
+def _escribir(tabla):
+    global _firma_cargada
+    t0 = time.perf_counter()
+    os.makedirs(os.path.dirname(ELO_PATH), exist_ok=True)
+    tmp = ELO_PATH.replace(".npz", ".tmp.npz")
+    np.savez(
+        tmp,
+        nombres=np.array(tabla.nombres, dtype=str),
+        rating=np.frombuffer(tabla.rating, dtype=np.float64),
+        rd=np.frombuffer(tabla.rd, dtype=np.float64),
+        partidos=np.frombuffer(tabla.partidos, dtype=np.int32),
+        ingestados=np.array(sorted(tabla.ingestados), dtype=np.int64),
+    )
+    os.replace(tmp, ELO_PATH)
+    _firma_cargada = firma_archivo(ELO_PATH)
+    ALMACEN_SEGUNDOS.observar(time.perf_counter() - t0, operacion="escribir", archivo="elo.npz")
+    ALMACEN_BYTES.observar(_firma_cargada[1], operacion="escribir", archivo="elo.npz")
+
+
+@contextmanager
+def transaccion():
+    """Lock entre workers, recarga si otro proceso guardó, y guarda al salir sin excepción."""
+    with _lock, bloqueo(ELO_PATH):
+        _cargar()
+        yield
+        _escribir(_tabla)
+
+
+# === ACTUALIZACIÓN === #
+def registrar_resultado(equipo_local: str, equipo_visitante: str,
+                        goles_local: int, goles_visitante: int, partido_id=None) -> bool:
+    """
+    Actualiza los ratings con un partido terminado. False si ese partido_id
+    ya se había contado. No persiste: usar dentro de transaccion().
+    """
+    local = feature_store_service.nombre_canonico(equipo_local)
+    visitante = feature_store_service.nombre_canonico(equipo_visitante)
+    tabla = _cargar()
+    with _lock:
+        return _registrar_en(tabla, local, visitante, goles_local, goles_visitante, partido_id)
+
+
+def _registrar_en(tabla, equipo_local, equipo_visitante, goles_local, goles_visitante, partido_id=None):
+    if partido_id is not None:
+        if int(partido_id) in tabla.ingestados:
+            return False
+        tabla.ingestados.add(int(partido_id))
+    tabla.actualizar(
+        tabla.id_equipo(equipo_local, crear=True),
+        tabla.id_equipo(equipo_visitante, crear=True),
+        int(goles_local), int(goles_visitante),
+    )
+    return True
+
+
+def reproducir(partidos, reiniciar=True) -> int:
+    """
+    Reconstruye los ratings en bloque desde un histórico en orden cronológico.
+    partidos: iterable de (local, visitante, goles_local, goles_visitante[, partido_id]).
+    Con reiniciar=True parte de cero. Persiste al final y devuelve cuántos contó.
+    """
+    global _tabla
+    t0 = time.perf_counter()
+    with _lock, bloqueo(ELO_PATH):
+        tabla = _TablaElo() if reiniciar else _cargar()
+        nuevos = 0
+        for partido in partidos:
+            nuevos += _registrar_en(tabla, *partido)
+        _tabla = tabla
+        _escribir(tabla)
+    logger.info(f"♻️ Ratings Elo reconstruidos: {nuevos} partidos, {len(tabla.nombres)} equipos "
+                f"({(time.perf_counter() - t0) * 1000:.0f} ms)")
+    return nuevos
+
+
+def asegurar_ratings() -> int:
+    """
+    Si todavía no hay ratings pero el feature store tiene resultados, los
+    reconstruye desde su registro. Devuelve cuántos equipos tienen rating.
+    """
+    if not os.path.exists(ELO_PATH):
+        with _lock, bloqueo(ELO_PATH):
+            if not os.path.exists(ELO_PATH):
+                nombres, partidos, _, ids = feature_store_service.resultados_historicos(con_ids=True)
+                if len(partidos):
+                    # Con su ID, un partido que luego llegue por evaluación no se cuenta dos veces
+                    reproducir((nombres[l], nombres[v], gl, gv, None if pid < 0 else pid)
+                               for (l, v, gl, gv), pid in zip(partidos.tolist(), ids.tolist()))
+    return len(_cargar().nombres)
+
+
+# === CONSULTA === #
+def rating_equipo(nombre: str):
+    """{"rating", "rd", "partidos"} de un equipo, o None si no tiene rating."""
+    tabla = _cargar()
+    equipo_id = tabla.id_equipo(feature_store_service.nombre_canonico(nombre))
+    if equipo_id is None:
+        return None
+    return {"rating": tabla.rating[equipo_id], "rd": tabla.rd[equipo_id], "partidos": tabla.partidos[equipo_id]}
+
+
+def diferencia(equipo_local: str, equipo_visitante: str):
+    """
+    Diferencia de rating local − visitante (con ventaja de local), o None si
+    alguno tiene menos de MIN_PARTIDOS.
+    """
+    local, visitante = rating_equipo(equipo_local), rating_equipo(equipo_visitante)
+    if not local or not visitante or min(local["partidos"], visitante["partidos"]) < MIN_PARTIDOS:
+        return None
+    return local["rating"] + VENTAJA_LOCAL - visitante["rating"]
+
+
+def probabilidades_1x2(diferencia_rating: float) -> dict:
+    """
+    1X2 a partir de la diferencia de rating: el esperado Elo reparte
+    victoria/derrota y el empate es máximo entre equipos parejos.
+    """
+    esperado = 1 / (1 + 10 ** (-diferencia_rating / 400))
+    empate = EMPATE_BASE * (1 - abs(2 * esperado - 1))
+    return {
+        1: max(esperado - empate / 2, 0.0),
+        0: empate,
+        -1: max(1 - esperado - empate / 2, 0.0),
+    }
+
+
+def ranking(limite=20):
+    """Los `limite` equipos con mejor rating (con al menos MIN_PARTIDOS)."""
+    tabla = _cargar()
+    filas = [(tabla.rating[i], n, tabla.partidos[i]) for i, n in enumerate(tabla.nombres)
+             if tabla.partidos[i] >= MIN_PARTIDOS]
+    return [{"equipo": n, "rating": round(r, 1), "partidos": p} for r, n, p in sorted(filas, reverse=True)[:limite]]
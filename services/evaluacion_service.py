@@ -1,16 +1,24 @@
 import os
-import json
 import logging
 import requests
 from datetime import datetime, timedelta
 from threading import Thread, Event
 import time
 
+from contextlib import contextmanager
+
+from services.cambios_service import marcar_cambio
+from services.almacen_json import leer_json, escribir_json, transaccion_json
+from services import feature_store_service
+from services import elo_service
+from services.metricas_service import llamar_api, medir_job
+from services import trazas_service as trazas
+
 logger = logging.getLogger(__name__)
 
 # === CONFIGURACIÓN API === #
 API_KEY = os.getenv("API_KEY", "329f4fac732d45049158a52092727496")
-BASE_URL = "https://api.football-data.org/v4"
+BASE_URL = os.getenv("FOOTBALL_DATA_URL", "https://api.football-data.org/v4")
 HEADERS = {"X-Auth-Token": API_KEY}
 
 # === RUTA DE HISTORIAL === #
@@ -19,27 +27,28 @@ HISTORIAL_PATH = "data/historial_predicciones.json"
 
 # === UTILIDADES === #
 def cargar_historial():
-    if not os.path.exists(HISTORIAL_PATH):
-        return []
-    try:
-        with open(HISTORIAL_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"❌ Error cargando historial: {e}")
-        return []
+    return leer_json(HISTORIAL_PATH, list)
 
 
 def guardar_historial(data):
     try:
-        with open(HISTORIAL_PATH, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        escribir_json(HISTORIAL_PATH, data)
+        marcar_cambio("historial")
     except Exception as e:
         logger.error(f"❌ Error guardando historial: {e}")
 
 
+@contextmanager
+def transaccion_historial():
+    """Leer-modificar-escribir el historial bajo lock (seguro entre workers)."""
+    with transaccion_json(HISTORIAL_PATH, list) as historial:
+        yield historial
+    marcar_cambio("historial")
+
+
 # === REGISTRAR NUEVA PREDICCIÓN === #
-def registrar_prediccion(equipo_local, equipo_visitante, prediccion, probabilidad):
-    historial = cargar_historial()
+@trazas.trazado("evaluacion.registrar_prediccion")
+def registrar_prediccion(equipo_local, equipo_visitante, prediccion, probabilidad, features=None):
     registro = {
         "partido": f"{equipo_local} vs {equipo_visitante}",
         "prediccion": prediccion,
@@ -48,8 +57,11 @@ def registrar_prediccion(equipo_local, equipo_visitante, prediccion, probabilida
         "resultado_real": None,
         "acierto": None
     }
-    historial.append(registro)
-    guardar_historial(historial)
+    # Features con las que se predijo: permiten el aprendizaje incremental
+    if features is not None:
+        registro["features"] = [float(v) for v in features]
+    with transaccion_historial() as historial:
+        historial.append(registro)
     logger.info(f"💾 Predicción registrada: {registro}")
 
 
@@ -57,7 +69,7 @@ def registrar_prediccion(equipo_local, equipo_visitante, prediccion, probabilida
 def obtener_resultado_real(equipo_local, equipo_visitante):
     try:
         url = f"{BASE_URL}/matches?status=FINISHED&limit=50"
-        res = requests.get(url, headers=HEADERS)
+        res = llamar_api("matches", requests.get, url, headers=HEADERS)
         res.raise_for_status()
         data = res.json().get("matches", [])
 
@@ -67,6 +79,7 @@ def obtener_resultado_real(equipo_local, equipo_visitante):
             if equipo_local.lower() in home and equipo_visitante.lower() in away:
                 score = partido["score"]["fullTime"]
                 return {
+                    "id": partido.get("id"),
                     "local": score.get("home", 0),
                     "visitante": score.get("away", 0)
                 }
@@ -84,9 +97,10 @@ def evaluar_predicciones_recientes():
         logger.warning("⚠️ No hay predicciones registradas para evaluar.")
         return None
 
-    aciertos = 0
-    total = 0
-
+    # Las consultas a la API se hacen sin lock; luego se aplican los
+    # resultados sobre el historial fresco, para no pisar predicciones
+    # registradas mientras tanto por otros workers.
+    resueltos = {}
     for item in historial:
         if item["resultado_real"] is None:
             nombres = item["partido"].split("vs")
@@ -95,29 +109,54 @@ def evaluar_predicciones_recientes():
             resultado_real = obtener_resultado_real(equipo_local, equipo_visitante)
 
             if resultado_real:
-                total += 1
                 if resultado_real["local"] > resultado_real["visitante"]:
                     ganador_real = f"{equipo_local} gana"
                 elif resultado_real["local"] < resultado_real["visitante"]:
                     ganador_real = f"{equipo_visitante} gana"
                 else:
                     ganador_real = "Empate"
+                resueltos[(item["partido"], item.get("fecha"))] = (equipo_local, equipo_visitante, resultado_real, ganador_real)
 
+    aciertos = 0
+    total = 0
+    if resueltos:
+        with elo_service.transaccion(), feature_store_service.transaccion(), transaccion_historial() as historial:
+            for item in historial:
+                clave = (item["partido"], item.get("fecha"))
+                if item["resultado_real"] is not None or clave not in resueltos:
+                    continue
+                equipo_local, equipo_visitante, resultado_real, ganador_real = resueltos[clave]
+                # Nombres tal como los conoce el store ("Barcelona" → "fc barcelona"): sin filas duplicadas
+                equipo_local = feature_store_service.nombre_canonico(equipo_local)
+                equipo_visitante = feature_store_service.nombre_canonico(equipo_visitante)
+                total += 1
                 item["resultado_real"] = ganador_real
                 item["acierto"] = ganador_real in item["prediccion"]
+                feature_store_service.ingestar_resultado(
+                    equipo_local, equipo_visitante,
+                    resultado_real["local"], resultado_real["visitante"],
+                    partido_id=resultado_real.get("id"),
+                )
+                elo_service.registrar_resultado(
+                    equipo_local, equipo_visitante,
+                    resultado_real["local"], resultado_real["visitante"],
+                    partido_id=resultado_real.get("id"),
+                )
 
                 if item["acierto"]:
                     aciertos += 1
                     logger.info(f"✅ ACIERTO: {item['partido']} ({item['prediccion']})")
                 else:
                     logger.info(f"❌ FALLÓ: {item['partido']} → Real: {ganador_real}")
+        # Si otro worker ya aplicó todos estos resultados, no hay nada nuevo que señalar
+        if total > 0:
+            marcar_cambio("resultados")
 
     if total > 0:
         precision = round((aciertos / total) * 100, 2)
     else:
         precision = 0.0
 
-    guardar_historial(historial)
     logger.info(f"📊 Evaluación completada: {total} partidos, {aciertos} aciertos, {precision}% precisión")
 
     return {"evaluados": total, "aciertos": aciertos, "precision": precision}
@@ -131,7 +170,8 @@ def iniciar_autoevaluacion_automatica():
     def ciclo_evaluacion():
         while True:
             logger.info("🧠 [AUTO] Iniciando ciclo automático de evaluación de precisión...")
-            resultado = evaluar_predicciones_recientes()
+            with medir_job("autoevaluacion"):
+                resultado = evaluar_predicciones_recientes()
             if resultado:
                 logger.info(f"📈 [AUTO] Precisión actual: {resultado['precision']}%")
             else:
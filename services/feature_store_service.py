@@ -0,0 +1,438 @@
+"""
+Feature store de equipos para Neurobet IA.
+
+Cada equipo tiene un ID entero (su fila en la tabla). Por equipo se guarda
+una ventana circular con sus últimos VENTANA partidos (goles a favor/en
+contra, puntos, si jugó de local, tiros y posesión cuando se conocen) y una
+fila de features ya agregadas que se recalcula al ingerir cada resultado.
+Además se conserva el registro completo de resultados (IDs de local y
+visitante y goles), que es de donde ajusta sus fuerzas el motor de goles
+(services/goles_service.py).
+
+Así la inferencia es leer dos filas, y la misma tabla se puede materializar
+en bloque para entrenar. Todo se persiste en un único .npz.
+"""
+
+import os
+import time
+import logging
+import threading
+import unicodedata
+from contextlib import contextmanager
+
+import numpy as np
+
+from services.almacen_json import bloqueo
+from services.cambios_service import firma_archivo
+from services.metricas_service import ALMACEN_SEGUNDOS, ALMACEN_BYTES
+
+logger = logging.getLogger(__name__)
+
+# === RUTAS Y PARÁMETROS === #
+FEATURE_STORE_PATH = "data/feature_store.npz"
+VENTANA = int(os.getenv("FEATURE_STORE_VENTANA", 10))
+MIN_PARTIDOS = int(os.getenv("FEATURE_STORE_MIN_PARTIDOS", 3))
+CAPACIDAD_INICIAL = 256
+
+# Valores por defecto cuando la fuente no trae tiros/posesión
+TIROS_LOCAL_DEFECTO = 12.0
+TIROS_VISITANTE_DEFECTO = 10.0
+
+# Columnas de la fila agregada por equipo
+COLUMNAS = [
+    "partidos",
+    "goles_favor",
+    "goles_contra",
+    "forma",            # puntos por partido (0–3)
+    "win_rate",         # % de victorias
+    "goles_favor_local",
+    "goles_contra_local",
+    "goles_favor_visita",
+    "goles_contra_visita",
+    "tiros",            # NaN si no hay datos de tiros
+    "posesion",         # NaN si no hay datos de posesión
+]
+_COL = {c: i for i, c in enumerate(COLUMNAS)}
+
+# Features que espera el modelo 1X2 (mismo orden que training_bootstrap.FEATURES)
+FEATURES_MODELO = ["goles_local", "goles_visitante", "tiros_local", "tiros_visitante", "posesion_local", "posesion_visitante"]
+
+_lock = threading.RLock()
+_tabla = None
+# Firma del .npz cuando se cargó/guardó: si otro worker lo reescribe, se recarga
+_firma_cargada = None
+
+
+def normalizar_nombre(nombre: str) -> str:
+    """Minúsculas, sin acentos ni espacios repetidos."""
+    texto = unicodedata.normalize("NFKD", str(nombre)).encode("ascii", "ignore").decode()
+    return " ".join(texto.lower().split())
+
+
+def _contiene_palabras(nombre: str, buscado: str) -> bool:
+    """True si `buscado` aparece en `nombre` como palabras completas y seguidas."""
+    return bool(buscado) and f" {buscado} " in f" {nombre} "
+
+
+# === TABLA EN MEMORIA === #
+class _Tabla:
+    def __init__(self, capacidad=CAPACIDAD_INICIAL):
+        self.ids = {}           # nombre normalizado → ID
+        self.alias = {}         # texto buscado → ID (resuelto por coincidencia parcial)
+        self.nombres = []
+        self.ingestados = set()  # IDs de partido ya ingeridos (evita duplicados)
+        self.partidos = np.zeros((CAPACIDAD_INICIAL, 4), dtype=np.int32)  # local, visitante, gl, gv
+        self.ids_partido = np.full(CAPACIDAD_INICIAL, -1, dtype=np.int64)  # -1 si no tenía ID
+        self.n_partidos = 0
+        self._reservar(capacidad)
+
+    def _reservar(self, capacidad):
+        forma = (capacidad, VENTANA)
+        self.gf = np.zeros(forma, dtype=np.float32)
+        self.ga = np.zeros(forma, dtype=np.float32)
+        self.puntos = np.zeros(forma, dtype=np.int8)
+        self.es_local = np.zeros(forma, dtype=np.bool_)
+        self.tiros = np.full(forma, np.nan, dtype=np.float32)
+        self.posesion = np.full(forma, np.nan, dtype=np.float32)
+        self.n = np.zeros(capacidad, dtype=np.int32)       # partidos en ventana (≤ VENTANA)
+        self.pos = np.zeros(capacidad, dtype=np.int32)     # siguiente hueco de la ventana
+        self.features = np.full((capacidad, len(COLUMNAS)), np.nan, dtype=np.float32)
+        self.features[:, _COL["partidos"]] = 0
+
+    def _crecer(self):
+        viejo = {k: getattr(self, k) for k in ("gf", "ga", "puntos", "es_local", "tiros", "posesion", "n", "pos", "features")}
+        cap = len(self.n)
+        self._reservar(cap * 2)
+        for k, arr in viejo.items():
+            getattr(self, k)[:cap] = arr
+
+    def id_equipo(self, nombre, crear=False):
+        clave = normalizar_nombre(nombre)
+        equipo_id = self.ids.get(clave)
+        if equipo_id is None:
+            equipo_id = self.alias.get(clave)
+        if equipo_id is None and not crear:
+            # Coincidencia parcial por palabras ("barcelona" → "fc barcelona"). Solo vale
+            # si es única: "madrid" con "real madrid" y "atletico madrid" no resuelve
+            candidatos = [i for k, i in list(self.ids.items()) if _contiene_palabras(k, clave)]
+            if len(candidatos) == 1:
+                equipo_id = candidatos[0]
+                with _lock:
+                    self.alias[clave] = equipo_id
+        if equipo_id is None and crear:
+            equipo_id = len(self.nombres)
+            if equipo_id >= len(self.n):
+                self._crecer()
+            self.ids[clave] = equipo_id
+            self.nombres.append(clave)
+            # Un equipo nuevo puede volver ambiguo un alias ya resuelto
+            self.alias.clear()
+        return equipo_id
+
+    def anotar_partido(self, id_local, id_visitante, goles_local, goles_visitante, partido_id=None):
+        """Agrega un resultado al registro histórico (crece duplicando)."""
+        if self.n_partidos >= len(self.partidos):
+            self.partidos = np.concatenate([self.partidos, np.zeros_like(self.partidos)])
+            self.ids_partido = np.concatenate([self.ids_partido, np.full_like(self.ids_partido, -1)])
+        self.partidos[self.n_partidos] = (id_local, id_visitante, goles_local, goles_visitante)
+        self.ids_partido[self.n_partidos] = -1 if partido_id is None else int(partido_id)
+        self.n_partidos += 1
+
+    def registrar(self, equipo_id, gf, ga, es_local, tiros, posesion):
+        p = self.pos[equipo_id]
+        self.gf[equipo_id, p] = gf
+        self.ga[equipo_id, p] = ga
+        self.puntos[equipo_id, p] = 3 if gf > ga else (1 if gf == ga else 0)
+        self.es_local[equipo_id, p] = es_local
+        self.tiros[equipo_id, p] = np.nan if tiros is None else tiros
+        self.posesion[equipo_id, p] = np.nan if posesion is None else posesion
+        self.pos[equipo_id] = (p + 1) % VENTANA
+        self.n[equipo_id] = min(self.n[equipo_id] + 1, VENTANA)
+        self._recalcular(equipo_id)
+
+    def _recalcular(self, equipo_id):
+        """Recalcula la fila agregada de un equipo (coste O(VENTANA))."""
+        n = self.n[equipo_id]
+        validos = slice(0, n)  # la ventana se llena en orden; con n < VENTANA solo hay n huecos usados
+        gf = self.gf[equipo_id, validos]
+        ga = self.ga[equipo_id, validos]
+        pts = self.puntos[equipo_id, validos]
+        local = self.es_local[equipo_id, validos]
+        fila = self.features[equipo_id]
+        fila[_COL["partidos"]] = n
+        fila[_COL["goles_favor"]] = gf.mean()
+        fila[_COL["goles_contra"]] = ga.mean()
+        fila[_COL["forma"]] = pts.mean()
+        fila[_COL["win_rate"]] = (pts == 3).mean() * 100
+        fila[_COL["goles_favor_local"]] = gf[local].mean() if local.any() else np.nan
+        fila[_COL["goles_contra_local"]] = ga[local].mean() if local.any() else np.nan
+        fila[_COL["goles_favor_visita"]] = gf[~local].mean() if (~local).any() else np.nan
+        fila[_COL["goles_contra_visita"]] = ga[~local].mean() if (~local).any() else np.nan
+        tiros = self.tiros[equipo_id, validos]
+        posesion = self.posesion[equipo_id, validos]
+        fila[_COL["tiros"]] = np.nanmean(tiros) if np.isfinite(tiros).any() else np.nan
+        fila[_COL["posesion"]] = np.nanmean(posesion) if np.isfinite(posesion).any() else np.nan
+
+
+# === PERSISTENCIA === #
+def _cargar():
+    global _tabla, _firma_cargada
+    if _tabla is not None and firma_archivo(FEATURE_STORE_PATH) == _firma_cargada:
+        return _tabla
+    with _lock:
+        firma = firma_archivo(FEATURE_STORE_PATH)
+        if _tabla is not None and firma == _firma_cargada:
+            return _tabla
+        tabla = _Tabla()
+        if os.path.exists(FEATURE_STORE_PATH):
+            try:
+                t0 = time.perf_counter()
+                with np.load(FEATURE_STORE_PATH, allow_pickle=False) as npz:
+                    nombres = [str(n) for n in npz["nombres"]]
+                    if npz["gf"].shape[1] != VENTANA:
+                        raise ValueError("tamaño de ventana distinto")
+                    while len(tabla.n) < len(nombres):
+                        tabla._crecer()
+                    k = len(nombres)
+                    for campo in ("gf", "ga", "puntos", "es_local", "tiros", "posesion", "n", "pos", "features"):
+                        getattr(tabla, campo)[:k] = npz[campo]
+                    tabla.nombres = nombres
+                    tabla.ids = {n: i for i, n in enumerate(nombres)}
+                    tabla.ingestados = set(npz["ingestados"].tolist())
+                    # Archivos de antes del registro de resultados no lo traen
+                    if "partidos" in npz.files:
+                        partidos = npz["partidos"]
+                        tabla.partidos = np.zeros((max(CAPACIDAD_INICIAL, 2 * len(partidos)), 4), dtype=np.int32)
+                        tabla.partidos[:len(partidos)] = partidos
+                        tabla.ids_partido = np.full(len(tabla.partidos), -1, dtype=np.int64)
+                        if "ids_partido" in npz.files:
+                            tabla.ids_partido[:len(partidos)] = npz["ids_partido"]
+                        tabla.n_partidos = len(partidos)
+                ALMACEN_SEGUNDOS.observar(time.perf_counter() - t0, operacion="leer", archivo="feature_store.npz")
+                ALMACEN_BYTES.observar(os.path.getsize(FEATURE_STORE_PATH), operacion="leer", archivo="feature_store.npz")
+                logger.info(f"📦 Feature store cargado: {len(nombres)} equipos")
+            except Exception as e:
+                logger.error(f"❌ Feature store ilegible, se empieza vacío: {e}")
+                tabla = _Tabla()
+        _tabla = tabla
+        _firma_cargada = firma
+    return _tabla
+
+
+def precargar() -> int:
+    """Carga la tabla (e índice de equipos) en memoria; devuelve cuántos equipos tiene."""
+    return len(_cargar().nombres)
+
+
+def guardar():
+    """Persiste la tabla completa (solo las filas usadas) de forma atómica."""
+    global _firma_cargada
+    tabla = _cargar()
+    with _lock, bloqueo(FEATURE_STORE_PATH):
+        t0 = time.perf_counter()
+        k = len(tabla.nombres)
+        os.makedirs(os.path.dirname(FEATURE_STORE_PATH), exist_ok=True)
+        tmp = FEATURE_STORE_PATH.replace(".npz", ".tmp.npz")
+        np.savez(
+            tmp,
+            nombres=np.array(tabla.nombres, dtype=str),
+            ingestados=np.array(sorted(tabla.ingestados), dtype=np.int64),
+            partidos=tabla.partidos[:tabla.n_partidos],
+            ids_partido=tabla.ids_partido[:tabla.n_partidos],
+            **{campo: getattr(tabla, campo)[:k] for campo in
+               ("gf", "ga", "puntos", "es_local", "tiros", "posesion", "n", "pos", "features")},
+        )
+        os.replace(tmp, FEATURE_STORE_PATH)
+        _firma_cargada = firma_archivo(FEATURE_STORE_PATH)
+        ALMACEN_SEGUNDOS.observar(time.perf_counter() - t0, operacion="escribir", archivo="feature_store.npz")
+        ALMACEN_BYTES.observar(_firma_cargada[1], operacion="escribir", archivo="feature_store.npz")
+
+
+@contextmanager
+def transaccion():
+    """
+    Ingesta segura entre workers: toma el lock del store, recarga si otro
+    proceso lo cambió, y guarda al salir si no hubo excepción.
+    """
+    with _lock, bloqueo(FEATURE_STORE_PATH):
+        _cargar()
+        yield
+        guardar()
+
+
+# === INGESTA === #
+def ingestar_resultado(
+    equipo_local: str,
+    equipo_visitante: str,
+    goles_local: int,
+    goles_visitante: int,
+    partido_id=None,
+    tiros_local=None,
+    tiros_visitante=None,
+    posesion_local=None,
+    posesion_visitante=None,
+) -> bool:
+    """
+    Agrega un resultado terminado a la ventana de ambos equipos.
+    Devuelve False si el partido ya se había ingerido (mismo partido_id).
+    No persiste: usar dentro de transaccion() o llamar a guardar() al final del lote.
+    """
+    tabla = _cargar()
+    with _lock:
+        return _ingestar_en(
+            tabla, equipo_local, equipo_visitante, goles_local, goles_visitante, partido_id,
+            tiros_local, tiros_visitante, posesion_local, posesion_visitante,
+        )
+
+
+def _ingestar_en(tabla, equipo_local, equipo_visitante, goles_local, goles_visitante,
+                 partido_id=None, tiros_local=None, tiros_visitante=None,
+                 posesion_local=None, posesion_visitante=None):
+    if partido_id is not None:
+        if int(partido_id) in tabla.ingestados:
+            return False
+        tabla.ingestados.add(int(partido_id))
+    id_local = tabla.id_equipo(equipo_local, crear=True)
+    id_visitante = tabla.id_equipo(equipo_visitante, crear=True)
+    tabla.registrar(id_local, goles_local, goles_visitante, True, tiros_local, posesion_local)
+    tabla.registrar(id_visitante, goles_visitante, goles_local, False, tiros_visitante, posesion_visitante)
+    tabla.anotar_partido(id_local, id_visitante, goles_local, goles_visitante, partido_id)
+    return True
+
+
+def ingestar_partidos_api(matches) -> int:
+    """
+    Ingesta en bloque partidos con el formato de football-data.org
+    (homeTeam/awayTeam/score.fullTime). Devuelve cuántos eran nuevos.
+    """
+    terminados = [
+        m for m in matches
+        if ((m.get("score") or {}).get("fullTime") or {}).get("home") is not None
+        and m["score"]["fullTime"].get("away") is not None
+    ]
+    tabla = _cargar()
+    if all(m.get("id") is not None and int(m["id"]) in tabla.ingestados for m in terminados):
+        return 0
+
+    nuevos = 0
+    with transaccion():
+        for match in terminados:
+            score = match["score"]["fullTime"]
+            if ingestar_resultado(
+                match["homeTeam"]["name"],
+                match["awayTeam"]["name"],
+                score["home"],
+                score["away"],
+                partido_id=match.get("id"),
+            ):
+                nuevos += 1
+    return nuevos
+
+
+# === CONSULTA === #
+def obtener_features_equipo(nombre: str):
+    """Fila agregada de un equipo como dict, o None si no está en el store."""
+    tabla = _cargar()
+    equipo_id = tabla.id_equipo(nombre)
+    if equipo_id is None:
+        return None
+    fila = tabla.features[equipo_id]
+    return {c: (None if np.isnan(v) else float(v)) for c, v in zip(COLUMNAS, fila)}
+
+
+def _vectores(filas_local, filas_visitante):
+    """Construye las features del modelo a partir de filas agregadas (vectorizado)."""
+    c = _COL
+    # Goles: split local/visita si existe, si no el promedio general
+    gl = np.where(np.isnan(filas_local[:, c["goles_favor_local"]]),
+                  filas_local[:, c["goles_favor"]], filas_local[:, c["goles_favor_local"]])
+    gv = np.where(np.isnan(filas_visitante[:, c["goles_favor_visita"]]),
+                  filas_visitante[:, c["goles_favor"]], filas_visitante[:, c["goles_favor_visita"]])
+    tl = np.where(np.isnan(filas_local[:, c["tiros"]]), TIROS_LOCAL_DEFECTO, filas_local[:, c["tiros"]])
+    tv = np.where(np.isnan(filas_visitante[:, c["tiros"]]), TIROS_VISITANTE_DEFECTO, filas_visitante[:, c["tiros"]])
+    # Posesión real si se conoce; si no, la heurística anterior basada en win rate
+    heuristica = 50 + (filas_local[:, c["win_rate"]] - filas_visitante[:, c["win_rate"]]) / 4
+    pl = np.where(np.isnan(filas_local[:, c["posesion"]]), heuristica, filas_local[:, c["posesion"]])
+    return np.column_stack([gl, gv, tl, tv, pl, 100 - pl]).astype(np.float64)
+
+
+def vector_modelo(equipo_local: str, equipo_visitante: str):
+    """
+    Features del modelo para un partido: lectura de dos filas.
+    Devuelve None si algún equipo no existe o tiene menos de MIN_PARTIDOS.
+    """
+    return _vector_en(_cargar(), equipo_local, equipo_visitante)
+
+
+def _vector_en(tabla, equipo_local, equipo_visitante):
+    id_local = tabla.id_equipo(equipo_local)
+    id_visitante = tabla.id_equipo(equipo_visitante)
+    if id_local is None or id_visitante is None:
+        return None
+    if min(tabla.n[id_local], tabla.n[id_visitante]) < MIN_PARTIDOS:
+        return None
+    filas = tabla.features[[id_local, id_visitante]]
+    return _vectores(filas[:1], filas[1:])[0].tolist()
+
+
+def resultados_historicos(con_ids=False):
+    """
+    (nombres, partidos, firma): nombres normalizados por ID de equipo, matriz
+    int32 (n, 4) con local, visitante, goles local y goles visitante en orden
+    de ingesta, y la firma del .npz de la que salen (para cachear ajustes).
+    Con con_ids=True agrega al final los IDs de partido (int64, -1 si no tenía).
+    """
+    tabla = _cargar()
+    with _lock:
+        resultado = (list(tabla.nombres), tabla.partidos[:tabla.n_partidos].copy(), _firma_cargada)
+        if con_ids:
+            resultado += (tabla.ids_partido[:tabla.n_partidos].copy(),)
+        return resultado
+
+
+def id_equipo(nombre: str):
+    """ID de un equipo en la tabla (con coincidencia parcial), o None."""
+    return _cargar().id_equipo(nombre)
+
+
+def nombre_canonico(nombre: str) -> str:
+    """
+    Nombre con el que el store conoce al equipo ("Barcelona" → "fc barcelona"
+    por coincidencia parcial), o el normalizado si no lo conoce. Sirve para
+    que otras tablas (ratings Elo) usen las mismas claves.
+    """
+    tabla = _cargar()
+    with _lock:
+        equipo_id = tabla.id_equipo(nombre)
+        return normalizar_nombre(nombre) if equipo_id is None else tabla.nombres[equipo_id]
+
+
+def materializar(pares):
+    """
+    Features del modelo para muchos partidos a la vez con el estado actual.
+    pares: lista de (local, visitante). Filas con equipos desconocidos quedan en NaN.
+    """
+    tabla = _cargar()
+
+    def _id(nombre):
+        equipo_id = tabla.id_equipo(nombre)
+        return -1 if equipo_id is None else equipo_id
+
+    ids = np.array([(_id(l), _id(v)) for l, v in pares], dtype=np.int64).reshape(-1, 2)
+    vacia = np.full((1, len(COLUMNAS)), np.nan, dtype=np.float32)
+    features = np.vstack([tabla.features[:len(tabla.nombres)], vacia])
+    return _vectores(features[ids[:, 0]], features[ids[:, 1]])
+
+
+def reconstruir_historico(partidos):
+    """
+    Reproduce resultados en orden cronológico sobre un store vacío y devuelve,
+    para cada partido, las features *previas* al partido (sin fuga de datos),
+    listas para entrenar. partidos: iterable de (local, visitante, gl, gv).
+    """
+    tabla = _Tabla()
+    filas = []
+    for local, visitante, gl, gv in partidos:
+        filas.append(_vector_en(tabla, local, visitante) or [np.nan] * len(FEATURES_MODELO))
+        _ingestar_en(tabla, local, visitante, gl, gv)
+    return np.array(filas, dtype=np.float64)
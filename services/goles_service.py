@@ -0,0 +1,254 @@
+"""
+Motor de goles Poisson / Dixon-Coles de Neurobet IA.
+
+Cada equipo tiene una fuerza de ataque a y de defensa d (alrededor de 1);
+los goles esperados de un partido son
+
+    local:      base · ventaja_local · a[local] · d[visitante]
+    visitante:  base · a[visitante] · d[local]
+
+Las fuerzas se ajustan por máxima verosimilitud Poisson sobre el registro
+de resultados del feature store, con actualizaciones multiplicativas
+vectorizadas (np.bincount) y PSEUDO_PARTIDOS partidos ficticios "promedio"
+por equipo, que llevan a 1 a los equipos con pocos datos. Los resultados
+viejos pesan menos: el peso se reduce a la mitad cada VIDA_MEDIA_PARTIDOS
+partidos ingeridos después. Luego se elige el ρ de Dixon-Coles (corrección
+de los marcadores 0-0, 1-0, 0-1 y 1-1) en una rejilla.
+
+Con los goles esperados se arma la matriz completa de marcadores
+(n partidos × MAX_GOLES+1 × MAX_GOLES+1) con broadcasting, y de ella salen
+1X2, más/menos de cada línea, ambos anotan y marcadores exactos. Toda una
+jornada se valora en una sola llamada.
+
+Un equipo sin datos juega con fuerzas 1 (promedio de la liga). El ajuste se
+cachea en memoria y se rehace cuando cambia el feature store.
+"""
+
+import os
+import time
+import logging
+import threading
+
+import numpy as np
+
+from services import feature_store_service
+
+logger = logging.getLogger(__name__)
+
+# === PARÁMETROS === #
+MAX_GOLES = int(os.getenv("GOLES_MAX", 10))
+PSEUDO_PARTIDOS = float(os.getenv("GOLES_PSEUDO_PARTIDOS", 3))
+VIDA_MEDIA_PARTIDOS = float(os.getenv("GOLES_VIDA_MEDIA_PARTIDOS", 2000))
+ITERACIONES = 100
+TOLERANCIA = 1e-6
+RHO_REJILLA = np.linspace(-0.25, 0.25, 101)
+LINEAS_GOLES = (0.5, 1.5, 2.5, 3.5, 4.5)
+
+# Sin historial: promedios típicos de liga europea
+BASE_DEFECTO = 1.15
+VENTAJA_LOCAL_DEFECTO = 1.25
+
+_GOLES = np.arange(MAX_GOLES + 1)
+_LOG_FACTORIAL = np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, MAX_GOLES + 1)))])
+_TOTAL = _GOLES[:, None] + _GOLES[None, :]
+_GANA_LOCAL = _GOLES[:, None] > _GOLES[None, :]
+_EMPATE = _GOLES[:, None] == _GOLES[None, :]
+
+_lock = threading.Lock()
+_cache = {"clave": None, "modelo": None}
+
+
+class ModeloGoles:
+    """Parámetros ajustados; los arrays se indexan con el ID de equipo del feature store."""
+
+    def __init__(self, ataque, defensa, base, ventaja_local, rho, partidos=0, ms=0.0):
+        self.ataque = ataque
+        self.defensa = defensa
+        self.base = base
+        self.ventaja_local = ventaja_local
+        self.rho = rho
+        self.partidos = partidos
+        self.ms = ms
+
+    def fuerzas(self, ids):
+        """(ataque, defensa) para IDs; -1 o IDs fuera de rango → 1.0 (promedio)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        conocido = (ids >= 0) & (ids < len(self.ataque))
+        ataque, defensa = np.ones(ids.shape), np.ones(ids.shape)
+        ataque[conocido] = self.ataque[ids[conocido]]
+        defensa[conocido] = self.defensa[ids[conocido]]
+        return ataque, defensa
+
+    def goles_esperados(self, ids_local, ids_visitante):
+        ataque_l, defensa_l = self.fuerzas(ids_local)
+        ataque_v, defensa_v = self.fuerzas(ids_visitante)
+        return (self.base * self.ventaja_local * ataque_l * defensa_v,
+                self.base * ataque_v * defensa_l)
+
+
+# === AJUSTE === #
+def _tau(gl, gv, lam, mu, rho):
+    """Corrección de Dixon-Coles; rho puede ser un vector (rejilla) → shape (len(rho), n)."""
+    rho = np.asarray(rho, dtype=np.float64)[..., None]
+    tau = np.ones(np.broadcast_shapes(rho.shape, np.shape(lam)))
+    tau = np.where((gl == 0) & (gv == 0), 1 - lam * mu * rho, tau)
+    tau = np.where((gl == 0) & (gv == 1), 1 + lam * rho, tau)
+    tau = np.where((gl == 1) & (gv == 0), 1 + mu * rho, tau)
+    tau = np.where((gl == 1) & (gv == 1), 1 - rho, tau)
+    return tau
+
+
+def ajustar(partidos, n_equipos, iteraciones=ITERACIONES) -> ModeloGoles:
+    """
+    Ajusta ataque/defensa/base/ventaja local (Poisson) y después ρ.
+    partidos: array (n, 4) con local, visitante, goles local, goles visitante.
+    """
+    t0 = time.perf_counter()
+    partidos = np.asarray(partidos, dtype=np.int64).reshape(-1, 4)
+    n = len(partidos)
+    if n == 0 or n_equipos == 0:
+        return ModeloGoles(np.ones(n_equipos), np.ones(n_equipos), BASE_DEFECTO, VENTAJA_LOCAL_DEFECTO, 0.0)
+
+    local, visitante = partidos[:, 0], partidos[:, 1]
+    gl, gv = partidos[:, 2].astype(np.float64), partidos[:, 3].astype(np.float64)
+    # Decaimiento por antigüedad (en partidos ingeridos después)
+    peso = 0.5 ** (np.arange(n - 1, -1, -1) / VIDA_MEDIA_PARTIDOS) if VIDA_MEDIA_PARTIDOS > 0 else np.ones(n)
+
+    def suma(ids, valores):
+        return np.bincount(ids, weights=valores, minlength=n_equipos)
+
+    total_l, total_v, total_peso = (peso * gl).sum(), (peso * gv).sum(), peso.sum()
+    base = max(total_v / total_peso, 0.05)
+    ventaja = max(total_l, 0.05) / max(total_v, 0.05)
+    ataque, defensa = np.ones(n_equipos), np.ones(n_equipos)
+    # Goles marcados / recibidos por equipo (no cambian entre iteraciones)
+    marcados = suma(local, peso * gl) + suma(visitante, peso * gv)
+    recibidos = suma(visitante, peso * gl) + suma(local, peso * gv)
+    prior = PSEUDO_PARTIDOS * base * (1 + ventaja) / 2
+
+    for _ in range(iteraciones):
+        previo = ataque
+        # Goles esperados sin el factor del propio equipo
+        exp_l = peso * base * ventaja * defensa[visitante]
+        exp_v = peso * base * defensa[local]
+        ataque = (marcados + prior) / (suma(local, exp_l) + suma(visitante, exp_v) + prior)
+        exp_l = peso * base * ventaja * ataque[local]
+        exp_v = peso * base * ataque[visitante]
+        defensa = (recibidos + prior) / (suma(visitante, exp_l) + suma(local, exp_v) + prior)
+        # Identificabilidad: media geométrica 1 en ataque y defensa (la escala va a la base)
+        escala_a = np.exp(np.log(ataque).mean())
+        escala_d = np.exp(np.log(defensa).mean())
+        ataque, defensa = ataque / escala_a, defensa / escala_d
+        fuerza = ataque[local] * defensa[visitante]
+        ventaja = total_l / max((peso * base * fuerza).sum(), 1e-9)
+        base = total_v / max((peso * ataque[visitante] * defensa[local]).sum(), 1e-9)
+        if np.abs(ataque - previo).max() < TOLERANCIA:
+            break
+
+    # ρ por máxima verosimilitud en rejilla (la parte Poisson no depende de ρ)
+    lam = base * ventaja * ataque[local] * defensa[visitante]
+    mu = base * ataque[visitante] * defensa[local]
+    bajos = (gl <= 1) & (gv <= 1)
+    tau = _tau(gl[bajos], gv[bajos], lam[bajos], mu[bajos], RHO_REJILLA)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_vero = np.where(tau > 0, np.log(tau), -np.inf) @ peso[bajos]
+    rho = float(RHO_REJILLA[int(np.argmax(log_vero))]) if bajos.any() else 0.0
+
+    ms = round((time.perf_counter() - t0) * 1000, 2)
+    return ModeloGoles(ataque, defensa, float(base), float(ventaja), rho, n, ms)
+
+
+def modelo_actual() -> ModeloGoles:
+    """Modelo ajustado con el feature store actual (cacheado hasta que el store cambie)."""
+    nombres, partidos, firma = feature_store_service.resultados_historicos()
+    clave = (firma, len(partidos), len(nombres))
+    if _cache["clave"] == clave:
+        return _cache["modelo"]
+    with _lock:
+        if _cache["clave"] != clave:
+            modelo = ajustar(partidos, len(nombres))
+            _cache.update({"clave": clave, "modelo": modelo})
+            logger.info(
+                f"⚽ Modelo de goles ajustado: {modelo.partidos} partidos, {len(nombres)} equipos, "
+                f"base {modelo.base:.2f}, ventaja local {modelo.ventaja_local:.2f}, ρ {modelo.rho:+.3f} "
+                f"({modelo.ms} ms)"
+            )
+    return _cache["modelo"]
+
+
+# === MATRIZ DE MARCADORES === #
+def _poisson(lam):
+    """P(goles = k) para k en 0..MAX_GOLES, shape (n, MAX_GOLES+1)."""
+    lam = np.maximum(np.asarray(lam, dtype=np.float64), 1e-9)[:, None]
+    return np.exp(_GOLES * np.log(lam) - lam - _LOG_FACTORIAL)
+
+
+def matriz_marcadores(lam, mu, rho=0.0):
+    """
+    Probabilidad de cada marcador, shape (n, MAX_GOLES+1, MAX_GOLES+1):
+    [p, i, j] = P(local marca i, visitante marca j). Renormalizada (la cola
+    más allá de MAX_GOLES se reparte proporcionalmente).
+    """
+    lam = np.atleast_1d(np.asarray(lam, dtype=np.float64))
+    mu = np.atleast_1d(np.asarray(mu, dtype=np.float64))
+    matriz = _poisson(lam)[:, :, None] * _poisson(mu)[:, None, :]
+    if rho:
+        matriz[:, 0, 0] *= np.maximum(1 - lam * mu * rho, 0)
+        matriz[:, 0, 1] *= np.maximum(1 + lam * rho, 0)
+        matriz[:, 1, 0] *= np.maximum(1 + mu * rho, 0)
+        matriz[:, 1, 1] *= max(1 - rho, 0)
+    return matriz / matriz.sum(axis=(1, 2), keepdims=True)
+
+
+def mercados(matriz, lineas=LINEAS_GOLES, marcadores=3) -> dict:
+    """Mercados derivados de matrices de marcadores (todo vectorizado sobre partidos)."""
+    n = len(matriz)
+    planas = matriz.reshape(n, -1)
+    top = np.argsort(planas, axis=1)[:, ::-1][:, :marcadores]
+    return {
+        "local": (matriz * _GANA_LOCAL).sum(axis=(1, 2)),
+        "empate": (matriz * _EMPATE).sum(axis=(1, 2)),
+        "visitante": (matriz * _GANA_LOCAL.T).sum(axis=(1, 2)),
+        "mas": {l: (matriz * (_TOTAL > l)).sum(axis=(1, 2)) for l in lineas},
+        "ambos_anotan": matriz[:, 1:, 1:].sum(axis=(1, 2)),
+        "marcadores": [
+            [(int(k // (MAX_GOLES + 1)), int(k % (MAX_GOLES + 1)), float(planas[p, k])) for k in top[p]]
+            for p in range(n)
+        ],
+    }
+
+
+# === API === #
+def valorar_partidos(pares, modelo=None) -> dict:
+    """
+    Valora muchos partidos a la vez. pares: lista de (local, visitante).
+    Devuelve los arrays de mercados() más los goles esperados y si cada
+    equipo era conocido.
+    """
+    modelo = modelo or modelo_actual()
+    ids = np.array([[_id(l), _id(v)] for l, v in pares], dtype=np.int64).reshape(-1, 2)
+    lam, mu = modelo.goles_esperados(ids[:, 0], ids[:, 1])
+    resultado = mercados(matriz_marcadores(lam, mu, modelo.rho))
+    resultado.update({"goles_local": lam, "goles_visitante": mu, "conocidos": ids >= 0})
+    return resultado
+
+
+def _id(nombre):
+    equipo_id = feature_store_service.id_equipo(nombre)
+    return -1 if equipo_id is None else equipo_id
+
+
+def probabilidades_partido(equipo_local: str, equipo_visitante: str) -> dict:
+    """Mercados de un partido como floats (probabilidades en 0–1)."""
+    v = valorar_partidos([(equipo_local, equipo_visitante)])
+    return {
+        "local": float(v["local"][0]),
+        "empate": float(v["empate"][0]),
+        "visitante": float(v["visitante"][0]),
+        "mas": {l: float(p[0]) for l, p in v["mas"].items()},
+        "ambos_anotan": float(v["ambos_anotan"][0]),
+        "marcadores": v["marcadores"][0],
+        "goles_local": float(v["goles_local"][0]),
+        "goles_visitante": float(v["goles_visitante"][0]),
+        "conocidos": bool(v["conocidos"][0].all()),
+    }
@@ -1,28 +1,60 @@
 import os
 import logging
 import numpy as np
-import random
-from joblib import load
 
 # === Importaciones internas === #
 from services.api_service import obtener_estadisticas_equipo  # Datos reales
 from services.evaluacion_service import registrar_prediccion  # Registro automático para evaluación
+from services.aprendizaje_incremental_service import predecir_proba_incremental
+from services.registro_modelos import cargar_modelo_actual
+from services import goles_service
+from services import elo_service
+from services.metricas_service import INFERENCIA_SEGUNDOS
+from services import trazas_service as trazas
+from services.feature_store_service import (
+    vector_modelo,
+    TIROS_LOCAL_DEFECTO,
+    TIROS_VISITANTE_DEFECTO,
+)
 
 # === CONFIGURACIÓN DE LOGS === #
 logger = logging.getLogger(__name__)
 
-# === RUTA DEL MODELO ENTRENADO === #
+# === MODELO ENTRENADO === #
+# Nombre en el registro versionado (services/registro_modelos.py)
+NOMBRE_MODELO = "partido_1x2"
+# Ruta antigua, solo como respaldo si el registro está vacío
 MODEL_PATH = "data/modelo_entrenado.joblib"
+# Peso del 1X2 derivado de la diferencia de rating Elo en la mezcla final
+PESO_ELO = float(os.getenv("PESO_ELO", 0.25))
+
+
+def _mezclar_elo(proba: dict, diferencia_elo) -> dict:
+    """Mezcla probabilidades {-1, 0, 1} con las del rating Elo (si ambos equipos tienen rating)."""
+    if diferencia_elo is None or not PESO_ELO:
+        return proba
+    elo = elo_service.probabilidades_1x2(diferencia_elo)
+    return {c: (1 - PESO_ELO) * p + PESO_ELO * elo[c] for c, p in proba.items()}
 
 
 # === CARGAR MODELO === #
+@trazas.trazado("ia.cargar_modelo")
 def cargar_modelo():
     """
-    Carga el modelo IA entrenado desde disco, si existe.
-    Si no está disponible, usa modo simulado.
+    Carga la versión activa del modelo IA desde el registro (mmap, cacheada).
+    Si el registro está vacío intenta la ruta antigua; si no hay nada, usa modo simulado.
     """
+    try:
+        modelo, _ = cargar_modelo_actual(NOMBRE_MODELO)
+        if modelo is not None:
+            return modelo, "modo_real"
+    except Exception as e:
+        logger.error(f"❌ Error al cargar el modelo del registro: {e}")
+
     if os.path.exists(MODEL_PATH):
         try:
+            from joblib import load
+
             modelo = load(MODEL_PATH)
             logger.info("✅ Modelo IA cargado correctamente desde disco.")
             return modelo, "modo_real"
@@ -35,41 +67,66 @@ def cargar_modelo():
 
 
 # === FUNCIÓN PRINCIPAL DE PREDICCIÓN === #
+@trazas.trazado("ia.predecir_partido")
 def predecir_partido(equipo_local: str, equipo_visitante: str):
     """
     Genera una predicción IA entre dos equipos,
     usando datos reales si están disponibles.
     """
+    trazas.atributo("local", equipo_local)
+    trazas.atributo("visitante", equipo_visitante)
     modelo, modo = cargar_modelo()
-
-    # === 1️⃣ Obtener estadísticas reales desde la API === #
-    stats_local = obtener_estadisticas_equipo(equipo_local)
-    stats_visitante = obtener_estadisticas_equipo(equipo_visitante)
-
-    if stats_local and stats_visitante:
-        logger.info("📈 Datos reales obtenidos correctamente. Usando predicción avanzada.")
-        goles_local = stats_local["goles_prom"]
-        goles_visitante = stats_visitante["goles_prom"]
-        tiros_local = random.randint(6, 14)
-        tiros_visitante = random.randint(4, 12)
-        posesion_local = 50 + (stats_local["win_rate"] - stats_visitante["win_rate"]) / 4
-        posesion_visitante = 100 - posesion_local
+    trazas.atributo("modo_modelo", modo)
+    # Diferencia de rating (local − visitante, con ventaja de local): O(1), sin HTTP
+    diferencia_elo = elo_service.diferencia(equipo_local, equipo_visitante)
+    trazas.atributo("elo_diff", None if diferencia_elo is None else round(diferencia_elo, 1))
+
+    # === 1️⃣ Features: feature store (lectura de dos filas) o API como respaldo === #
+    features = vector_modelo(equipo_local, equipo_visitante)
+    # Solo las features del store (datos reales) sirven para aprender después;
+    # el vector de respaldo lleva tiros por defecto y una posesión estimada
+    features_reales = features
+    trazas.atributo("feature_store_hit", features is not None)
+    if features is not None:
+        logger.info("⚡ Features obtenidas del feature store.")
     else:
-        logger.warning("⚠️ Datos reales no disponibles, generando simulación.")
-        goles_local = np.random.poisson(1.5)
-        goles_visitante = np.random.poisson(1.2)
-        tiros_local = np.random.randint(5, 15)
-        tiros_visitante = np.random.randint(3, 12)
-        posesion_local = np.random.randint(45, 65)
-        posesion_visitante = 100 - posesion_local
+        stats_local = obtener_estadisticas_equipo(equipo_local)
+        stats_visitante = obtener_estadisticas_equipo(equipo_visitante)
+        if stats_local and stats_visitante:
+            logger.info("📈 Datos reales obtenidos correctamente. Usando predicción avanzada.")
+            # La consulta a la API acaba de alimentar el store: se reintenta la lectura
+            features = vector_modelo(equipo_local, equipo_visitante)
+            features_reales = features
+            if features is None:
+                posesion_local = 50 + (stats_local["win_rate"] - stats_visitante["win_rate"]) / 4
+                features = [
+                    stats_local["goles_prom"], stats_visitante["goles_prom"],
+                    TIROS_LOCAL_DEFECTO, TIROS_VISITANTE_DEFECTO,
+                    posesion_local, 100 - posesion_local,
+                ]
 
     # === 2️⃣ Predicción con el modelo entrenado (modo real) === #
-    if modelo and modo == "modo_real":
+    if modelo and modo == "modo_real" and features is not None:
         try:
-            X_pred = np.array([[goles_local, goles_visitante, tiros_local, tiros_visitante,
-                                posesion_local, posesion_visitante]])
-            pred = modelo.predict(X_pred)[0]
-            proba = modelo.predict_proba(X_pred)[0] if hasattr(modelo, "predict_proba") else [0.33, 0.33, 0.33]
+            X_pred = np.array([features])
+            with INFERENCIA_SEGUNDOS.tiempo(modelo="principal"), trazas.span("ia.inferencia", modelo="principal"):
+                pred = modelo.predict(X_pred)[0]
+                proba = modelo.predict_proba(X_pred)[0] if hasattr(modelo, "predict_proba") else [0.33, 0.33, 0.33]
+
+            # Mezcla con el modelo incremental (entrenado con resultados reales) si ya está listo
+            proba_inc = None
+            if features_reales:
+                with INFERENCIA_SEGUNDOS.tiempo(modelo="incremental"), trazas.span("ia.inferencia", modelo="incremental"):
+                    proba_inc = predecir_proba_incremental(features)
+            if proba_inc and hasattr(modelo, "classes_"):
+                clases = modelo.classes_.tolist()
+                proba = np.array([(p + proba_inc.get(c, 0.0)) / 2 for c, p in zip(clases, proba)])
+                pred = clases[int(np.argmax(proba))]
+            if diferencia_elo is not None and hasattr(modelo, "classes_"):
+                clases = modelo.classes_.tolist()
+                mezcla = _mezclar_elo(dict(zip(clases, proba)), diferencia_elo)
+                proba = np.array([mezcla[c] for c in clases])
+                pred = clases[int(np.argmax(proba))]
 
             # Interpretación de resultado
             if pred == 1:
@@ -83,7 +140,7 @@ def predecir_partido(equipo_local: str, equipo_visitante: str):
                 probabilidad = round(proba[1] * 100 if len(proba) > 1 else 33.3, 2)
 
             # Registrar la predicción para futura evaluación
-            registrar_prediccion(equipo_local, equipo_visitante, resultado, probabilidad)
+            registrar_prediccion(equipo_local, equipo_visitante, resultado, probabilidad, features_reales)
 
             return {
                 "resultado": resultado,
@@ -93,33 +150,39 @@ def predecir_partido(equipo_local: str, equipo_visitante: str):
 
         except Exception as e:
             logger.error(f"❌ Error al generar predicción con el modelo: {e}")
-            resultado = random.choice([
-                f"🏆 {equipo_local} gana",
-                f"⚽ {equipo_visitante} gana",
-                "🤝 Empate"
-            ])
-            probabilidad = random.randint(40, 70)
-            registrar_prediccion(equipo_local, equipo_visitante, resultado, probabilidad)
-            return {
-                "resultado": resultado,
-                "probabilidad": probabilidad,
-                "modo": "Fallback - Simulación de emergencia",
-            }
 
-    # === 3️⃣ Modo simulado (sin modelo entrenado) === #
-    else:
-        outcomes = [
-            (f"🏆 {equipo_local} gana", 60),
-            ("🤝 Empate", 25),
-            (f"⚽ {equipo_visitante} gana", 15)
-        ]
-        resultado, prob = random.choice(outcomes)
-
-        # Registrar predicción simulada
-        registrar_prediccion(equipo_local, equipo_visitante, resultado, prob)
-
-        return {
-            "resultado": resultado,
-            "probabilidad": prob,
-            "modo": "Simulado (sin modelo)",
-        }
+    # === 3️⃣ Sin modelo o sin features: modelo de goles Poisson / Dixon-Coles === #
+    if features is None:
+        logger.warning("⚠️ Datos reales no disponibles, se usa el modelo de goles.")
+    return _prediccion_por_goles(equipo_local, equipo_visitante, features_reales, diferencia_elo)
+
+
+def _prediccion_por_goles(equipo_local: str, equipo_visitante: str, features_reales=None, diferencia_elo=None):
+    """
+    1X2 y mercados de goles a partir de la matriz de marcadores
+    (services/goles_service.py); el 1X2 se mezcla con el rating Elo.
+    """
+    with trazas.span("ia.goles"):
+        p = goles_service.probabilidades_partido(equipo_local, equipo_visitante)
+    proba = _mezclar_elo({1: p["local"], 0: p["empate"], -1: p["visitante"]}, diferencia_elo)
+    opciones = [
+        (proba[1], f"🏆 {equipo_local} gana"),
+        (proba[0], "🤝 Empate"),
+        (proba[-1], f"⚽ {equipo_visitante} gana"),
+    ]
+    proba, resultado = max(opciones)
+    probabilidad = round(proba * 100, 2)
+    registrar_prediccion(equipo_local, equipo_visitante, resultado, probabilidad, features_reales)
+
+    local, visita, _ = p["marcadores"][0]
+    return {
+        "resultado": resultado,
+        "probabilidad": probabilidad,
+        "modo": "Modelo de goles (Dixon-Coles)" if p["conocidos"] else "Modelo de goles (promedio de liga)",
+        "mercados": {
+            "mas_2_5": round(p["mas"][2.5] * 100, 1),
+            "ambos_anotan": round(p["ambos_anotan"] * 100, 1),
+            "marcador": f"{local}-{visita}",
+            "goles_esperados": (round(p["goles_local"], 2), round(p["goles_visitante"], 2)),
+        },
+    }
@@ -0,0 +1,373 @@
+"""
+Ingesta masiva y reanudable de fixtures y resultados de api-sports
+(v3.football.api-sports.io) en la tabla `partidos` de data/db_manager.py.
+
+Uso:
+    python -m services.ingesta_service --ligas 39 140 --temporadas 2023 2024
+    python -m services.ingesta_service --ligas 39 140 135 --temporadas 2024 --paralelo 3
+
+Por cada liga y temporada se recorren las páginas de /fixtures (paging.total).
+Cada página se guarda en una sola transacción SQLite: upserts por lotes de
+LOTE filas (clave única fixture_id) y el checkpoint de ingesta_progreso.
+Así, si la ejecución se corta, la siguiente sigue en la página que faltaba.
+Una temporada recorrida entera queda completada si no le quedan partidos
+sin terminar; si le quedan, la próxima ejecución la refresca desde la
+página 1 (los upserts solo reescriben las filas que cambiaron).
+
+Cuota: las peticiones de todas las ligas pasan por un mismo turnero
+(PETICIONES_MINUTO por minuto) que lee x-ratelimit-requests-remaining.
+Cuando la cuota diaria baja a RESERVA la ingesta se detiene sin error y
+deja el resto para otro día. Los 429, los 5xx y los errores rateLimit se
+reintentan con espera exponencial (o la de Retry-After).
+
+Con --paralelo N cada liga va en su propio hilo y con su propia conexión
+(WAL): se solapan las latencias de red, siempre dentro de la misma cuota.
+Para probar sin consumir cuota: tools/fake_api_sports.py y
+tools/prueba_ingesta.py.
+"""
+
+import os
+import time
+import logging
+import argparse
+import threading
+import contextvars
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from data import db_manager
+from services.metricas_service import llamar_api, medir_job
+from services import trazas_service as trazas
+
+logger = logging.getLogger(__name__)
+
+# === CONFIGURACIÓN === #
+# Configurable para apuntar a un servidor falso (tools/fake_api_sports.py)
+API_SPORTS_URL = os.getenv("API_SPORTS_URL", "https://v3.football.api-sports.io")
+API_SPORTS_KEY = os.getenv("API_SPORTS_KEY", os.getenv("API_KEY", ""))
+LOTE = int(os.getenv("INGESTA_LOTE", 500))
+# El plan gratuito permite 10 peticiones por minuto y 100 al día
+PETICIONES_MINUTO = float(os.getenv("INGESTA_PETICIONES_MINUTO", 10))
+# Peticiones diarias que se dejan libres para el resto del bot
+RESERVA = int(os.getenv("INGESTA_RESERVA_PETICIONES", 10))
+REINTENTOS = int(os.getenv("INGESTA_REINTENTOS", 4))
+ESPERA_BASE = float(os.getenv("INGESTA_ESPERA_SEGUNDOS", 2))
+TIMEOUT = 15
+
+# Estados cortos de api-sports con los que un partido ya no cambia
+ESTADOS_FINALES = {"FT", "AET", "PEN", "CANC", "ABD", "AWD", "WO"}
+
+_UPSERT = """
+    INSERT INTO partidos (fixture_id, deporte, liga, liga_id, temporada, equipo_local,
+                          equipo_visitante, fecha, estado, goles_local, goles_visitante, actualizado)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(fixture_id) DO UPDATE SET
+        liga = excluded.liga,
+        equipo_local = excluded.equipo_local,
+        equipo_visitante = excluded.equipo_visitante,
+        fecha = excluded.fecha,
+        estado = excluded.estado,
+        goles_local = excluded.goles_local,
+        goles_visitante = excluded.goles_visitante,
+        actualizado = excluded.actualizado
+    WHERE partidos.estado IS NOT excluded.estado
+       OR partidos.fecha IS NOT excluded.fecha
+       OR partidos.goles_local IS NOT excluded.goles_local
+       OR partidos.goles_visitante IS NOT excluded.goles_visitante
+"""
+
+_CHECKPOINT = """
+    INSERT INTO ingesta_progreso (liga_id, temporada, pagina, total_paginas, filas, pendientes, completado, actualizado)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(liga_id, temporada) DO UPDATE SET
+        pagina = excluded.pagina,
+        total_paginas = excluded.total_paginas,
+        filas = CASE WHEN excluded.pagina = 1 THEN excluded.filas ELSE ingesta_progreso.filas + excluded.filas END,
+        pendientes = CASE WHEN excluded.pagina = 1 THEN excluded.pendientes
+                          ELSE ingesta_progreso.pendientes + excluded.pendientes END,
+        completado = excluded.completado,
+        actualizado = excluded.actualizado
+"""
+
+
+class CuotaAgotada(Exception):
+    """La cuota diaria (menos la reserva) se acabó: se reanuda en otra ejecución."""
+
+
+class ErrorIngesta(Exception):
+    """La API respondió con un error que no se arregla reintentando."""
+
+
+# === CUOTA === #
+class _Cuota:
+    """Turnero compartido por todos los hilos de una ejecución."""
+
+    def __init__(self, por_minuto=PETICIONES_MINUTO, reserva=RESERVA, max_peticiones=None):
+        self.intervalo = 60 / por_minuto if por_minuto else 0.0
+        self.reserva = reserva
+        self.max_peticiones = max_peticiones
+        self.restantes = None  # según x-ratelimit-requests-remaining
+        self.hechas = 0
+        self._proxima = 0.0
+        self._lock = threading.Lock()
+
+    def turno(self):
+        """Reserva la próxima petición y espera hasta que le toque."""
+        with self._lock:
+            if self.max_peticiones is not None and self.hechas >= self.max_peticiones:
+                raise CuotaAgotada(f"se alcanzó el máximo de {self.max_peticiones} peticiones")
+            if self.restantes is not None and self.restantes <= self.reserva:
+                raise CuotaAgotada(f"quedan {self.restantes} peticiones (reserva {self.reserva})")
+            ahora = time.monotonic()
+            espera = self._proxima - ahora
+            self._proxima = max(ahora, self._proxima) + self.intervalo
+            self.hechas += 1
+        if espera > 0:
+            time.sleep(espera)
+
+    def anotar(self, cabeceras):
+        restantes = cabeceras.get("x-ratelimit-requests-remaining")
+        with self._lock:
+            if restantes is not None and restantes.lstrip("-").isdigit():
+                # Con varios hilos las respuestas llegan desordenadas: vale la menor
+                restantes = int(restantes)
+                self.restantes = restantes if self.restantes is None else min(self.restantes, restantes)
+            if cabeceras.get("X-RateLimit-Remaining") == "0":
+                self._proxima = max(self._proxima, time.monotonic() + 60 / max(PETICIONES_MINUTO, 1))
+
+    def frenar(self, segundos):
+        """Ninguna petición sale antes de `segundos` (429 / rateLimit)."""
+        with self._lock:
+            self._proxima = max(self._proxima, time.monotonic() + segundos)
+
+    def agotar(self):
+        with self._lock:
+            self.restantes = 0
+
+
+# === API === #
+def _pedir_pagina(sesion, cuota, liga, temporada, pagina):
+    """JSON de una página de /fixtures, reintentando errores transitorios."""
+    params = {"league": liga, "season": temporada}
+    if pagina > 1:
+        params["page"] = pagina
+    headers = {"x-apisports-key": API_SPORTS_KEY}
+    motivo = None
+    for intento in range(REINTENTOS + 1):
+        if intento:
+            time.sleep(ESPERA_BASE * 2 ** (intento - 1))
+        cuota.turno()
+        try:
+            respuesta = llamar_api("fixtures", sesion.get, f"{API_SPORTS_URL}/fixtures",
+                                   params=params, headers=headers, timeout=TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            motivo = f"conexión: {e}"
+            continue
+        cuota.anotar(respuesta.headers)
+        if respuesta.status_code == 429 or respuesta.status_code >= 500:
+            motivo = f"HTTP {respuesta.status_code}"
+            espera = respuesta.headers.get("Retry-After")
+            if espera and espera.isdigit():
+                cuota.frenar(int(espera))
+            continue
+        if respuesta.status_code >= 400:
+            raise ErrorIngesta(f"HTTP {respuesta.status_code}: {respuesta.text[:200]}")
+        datos = respuesta.json()
+        # api-sports responde 200 con "errors" como dict cuando algo falla
+        errores = datos.get("errors") or {}
+        if errores:
+            if "requests" in errores:
+                cuota.agotar()
+                raise CuotaAgotada(errores["requests"])
+            if "rateLimit" in errores:
+                motivo = errores["rateLimit"]
+                cuota.frenar(60 / max(PETICIONES_MINUTO, 1))
+                continue
+            raise ErrorIngesta(str(errores))
+        return datos
+    raise ErrorIngesta(f"liga {liga} temporada {temporada} página {pagina}: {motivo} tras {REINTENTOS} reintentos")
+
+
+def _filas(fixtures, ahora):
+    """Tuplas para el upsert, una por fixture (generador)."""
+    for item in fixtures:
+        fixture = item.get("fixture") or {}
+        if fixture.get("id") is None:
+            continue
+        liga = item.get("league") or {}
+        equipos = item.get("teams") or {}
+        goles = item.get("goals") or {}
+        yield (
+            int(fixture["id"]), "futbol", liga.get("name"), liga.get("id"), liga.get("season"),
+            (equipos.get("home") or {}).get("name"), (equipos.get("away") or {}).get("name"),
+            fixture.get("date"), (fixture.get("status") or {}).get("short"),
+            goles.get("home"), goles.get("away"), ahora,
+        )
+
+
+def _lotes(filas, tamano):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+# === SQLITE === #
+def _guardar_pagina(conn, liga, temporada, pagina, total_paginas, fixtures):
+    """Upserts de la página y su checkpoint en la misma transacción. Devuelve las filas."""
+    ahora = datetime.now().isoformat(timespec="seconds")
+    filas = pendientes = 0
+    with conn:
+        for lote in _lotes(_filas(fixtures, ahora), LOTE):
+            conn.executemany(_UPSERT, lote)
+            filas += len(lote)
+            pendientes += sum(1 for fila in lote if fila[8] not in ESTADOS_FINALES)
+        previos = 0
+        if pagina > 1:
+            fila = conn.execute("SELECT pendientes FROM ingesta_progreso WHERE liga_id = ? AND temporada = ?",
+                                (liga, temporada)).fetchone()
+            previos = fila[0] if fila else 0
+        completado = int(pagina >= total_paginas and previos + pendientes == 0)
+        conn.execute(_CHECKPOINT, (liga, temporada, pagina, total_paginas, filas, pendientes, completado, ahora))
+    return filas
+
+
+def progreso(db_path=None):
+    """Checkpoints: [{"liga_id", "temporada", "pagina", "total_paginas", "filas", "pendientes", "completado"}]."""
+    db_manager.crear_tablas(db_path)
+    conn = db_manager.conectar(db_path)
+    try:
+        cursor = conn.execute("""
+            SELECT liga_id, temporada, pagina, total_paginas, filas, pendientes, completado, actualizado
+            FROM ingesta_progreso ORDER BY liga_id, temporada
+        """)
+        columnas = [c[0] for c in cursor.description]
+        return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def _pagina_inicial(conn, liga, temporada, reiniciar):
+    """Página por la que empezar, o None si la temporada ya está completa."""
+    if reiniciar:
+        return 1
+    fila = conn.execute("SELECT pagina, total_paginas, completado FROM ingesta_progreso "
+                        "WHERE liga_id = ? AND temporada = ?", (liga, temporada)).fetchone()
+    if fila is None:
+        return 1
+    pagina, total, completado = fila
+    if completado:
+        return None
+    # Interrumpida a medias: sigue; recorrida con partidos pendientes: se refresca entera
+    return pagina + 1 if total and pagina < total else 1
+
+
+# === INGESTA === #
+def ingestar_liga(liga, temporadas, cuota, db_path=None, reiniciar=False) -> dict:
+    """Recorre las temporadas de una liga. Nunca lanza: el estado queda en el resumen."""
+    resumen = {"liga": liga, "paginas": 0, "filas": 0, "temporadas_completas": 0, "estado": "ok"}
+    conn = db_manager.conectar(db_path)
+    sesion = requests.Session()
+    try:
+        for temporada in temporadas:
+            pagina = _pagina_inicial(conn, liga, temporada, reiniciar)
+            if pagina is None:
+                resumen["temporadas_completas"] += 1
+                continue
+            if pagina > 1:
+                logger.info(f"⏯️ Liga {liga} temporada {temporada}: se reanuda en la página {pagina}.")
+            total = pagina
+            while pagina <= total:
+                with trazas.span("ingesta.pagina", liga=liga, temporada=temporada, pagina=pagina) as s:
+                    datos = _pedir_pagina(sesion, cuota, liga, temporada, pagina)
+                    total = max(int((datos.get("paging") or {}).get("total") or 1), 1)
+                    filas = _guardar_pagina(conn, liga, temporada, pagina, total, datos.get("response") or [])
+                    s.atributo("filas", filas)
+                resumen["paginas"] += 1
+                resumen["filas"] += filas
+                pagina += 1
+            if _pagina_inicial(conn, liga, temporada, False) is None:
+                resumen["temporadas_completas"] += 1
+    except CuotaAgotada as e:
+        resumen["estado"] = "cuota_agotada"
+        logger.warning(f"⏸️ Liga {liga}: cuota agotada ({e}); se reanudará en la próxima ejecución.")
+    except ErrorIngesta as e:
+        resumen["estado"] = "error"
+        resumen["error"] = str(e)
+        logger.error(f"❌ Liga {liga}: {e}")
+    finally:
+        sesion.close()
+        conn.close()
+    return resumen
+
+
+def ingestar(ligas, temporadas, paralelo=1, db_path=None, reiniciar=False,
+             por_minuto=PETICIONES_MINUTO, reserva=RESERVA, max_peticiones=None) -> dict:
+    """
+    Ingesta fixtures y resultados de `ligas` × `temporadas`. Con paralelo > 1
+    reparte las ligas entre hilos. Devuelve el resumen por liga y de la cuota.
+    """
+    db_manager.crear_tablas(db_path)
+    cuota = _Cuota(por_minuto, reserva, max_peticiones)
+    t0 = time.perf_counter()
+    with medir_job("ingesta"), trazas.span("ingesta", ligas=len(ligas), paralelo=paralelo):
+        if paralelo > 1 and len(ligas) > 1:
+            with ThreadPoolExecutor(max_workers=min(paralelo, len(ligas)), thread_name_prefix="ingesta") as pool:
+                # Cada liga corre en una copia del contexto: sus spans cuelgan de "ingesta"
+                futuros = [pool.submit(contextvars.copy_context().run, ingestar_liga,
+                                       liga, temporadas, cuota, db_path, reiniciar) for liga in ligas]
+                resumenes = [f.result() for f in futuros]
+        else:
+            resumenes = [ingestar_liga(liga, temporadas, cuota, db_path, reiniciar) for liga in ligas]
+
+    resultado = {
+        "ligas": resumenes,
+        "paginas": sum(r["paginas"] for r in resumenes),
+        "filas": sum(r["filas"] for r in resumenes),
+        "peticiones": cuota.hechas,
+        "cuota_restante": cuota.restantes,
+        "completa": all(r["temporadas_completas"] == len(temporadas) for r in resumenes),
+        "segundos": round(time.perf_counter() - t0, 2),
+    }
+    logger.info(
+        f"📥 Ingesta: {resultado['paginas']} páginas, {resultado['filas']} filas, "
+        f"{resultado['peticiones']} peticiones (quedan {resultado['cuota_restante']}) "
+        f"en {resultado['segundos']}s{'' if resultado['completa'] else ' — incompleta'}."
+    )
+    return resultado
+
+
+# === CLI === #
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingesta de fixtures y resultados de api-sports")
+    parser.add_argument("--ligas", type=int, nargs="+", help="IDs de liga de api-sports")
+    parser.add_argument("--temporadas", type=int, nargs="+")
+    parser.add_argument("--paralelo", type=int, default=1, help="Ligas en paralelo")
+    parser.add_argument("--db", help="Base SQLite (por defecto la de data/db_manager.py)")
+    parser.add_argument("--reiniciar", action="store_true", help="Ignora los checkpoints y empieza de cero")
+    parser.add_argument("--max-peticiones", type=int, help="Tope de peticiones de esta ejecución")
+    parser.add_argument("--progreso", action="store_true", help="Solo muestra los checkpoints")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+    if args.progreso:
+        for fila in progreso(args.db):
+            print(fila)
+        return
+    if not args.ligas or not args.temporadas:
+        parser.error("se necesitan --ligas y --temporadas")
+    resultado = ingestar(args.ligas, args.temporadas, paralelo=args.paralelo, db_path=args.db,
+                         reiniciar=args.reiniciar, max_peticiones=args.max_peticiones)
+    for resumen in resultado["ligas"]:
+        print(resumen)
+
+
+if __name__ == "__main__":
+    main()
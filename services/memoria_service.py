@@ -1,7 +1,8 @@
-import json
 import os
 from datetime import datetime
 
+from services.almacen_json import leer_json, escribir_json, transaccion_json
+
 # === RUTAS DE LOS ARCHIVOS DE MEMORIA === #
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 GLOBAL_FILE = os.path.join(BASE_DIR, "../data/memoria_global.json")
@@ -11,26 +12,17 @@ USERS_FILE = os.path.join(BASE_DIR, "../data/memoria_usuarios.json")
 # === FUNCIONES AUXILIARES === #
 def _leer_json(path):
     """Lee un archivo JSON y devuelve su contenido."""
-    if not os.path.exists(path):
-        return {}
-    with open(path, "r", encoding="utf-8") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return {}
+    return leer_json(path, dict)
 
 
 def _guardar_json(path, data):
-    """Guarda un diccionario en un archivo JSON."""
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    """Guarda un diccionario en un archivo JSON (escritura atómica)."""
+    escribir_json(path, data, indent=4)
 
 
 # === MEMORIA GLOBAL === #
 def guardar_evento_global(usuario, accion, datos):
     """Guarda un evento en la memoria global."""
-    memoria = _leer_json(GLOBAL_FILE)
     evento = {
         "usuario": usuario,
         "accion": accion,
@@ -38,25 +30,24 @@ def guardar_evento_global(usuario, accion, datos):
         "timestamp": datetime.utcnow().isoformat()
     }
 
-    memoria.setdefault("eventos", []).append(evento)
-    _guardar_json(GLOBAL_FILE, memoria)
+    with transaccion_json(GLOBAL_FILE, dict, indent=4) as memoria:
+        memoria.setdefault("eventos", []).append(evento)
 
 
 # === MEMORIA POR USUARIO === #
 def guardar_evento_usuario(user_id, accion, datos):
     """Guarda un evento individual por usuario."""
-    memoria = _leer_json(USERS_FILE)
     evento = {
         "accion": accion,
         "datos": datos,
         "timestamp": datetime.utcnow().isoformat()
     }
 
-    if str(user_id) not in memoria:
-        memoria[str(user_id)] = []
+    with transaccion_json(USERS_FILE, dict, indent=4) as memoria:
+        if str(user_id) not in memoria:
+            memoria[str(user_id)] = []
 
-    memoria[str(user_id)].append(evento)
-    _guardar_json(USERS_FILE, memoria)
+        memoria[str(user_id)].append(evento)
 
 
 def obtener_historial_usuario(user_id, limite=5):
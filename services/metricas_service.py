@@ -0,0 +1,311 @@
+"""
+Registro de métricas de Neurobet IA en formato Prometheus (/metrics).
+
+Pensado para dejarlo siempre encendido:
+  - cada métrica guarda un shard por hilo (threading.local): el hilo que
+    observa solo escribe en su propio dict, sin locks ni contención
+  - los histogramas tienen cubetas fijas; observar es un bisect y tres sumas
+  - al exponer se suman los shards (copiar un dict o una lista es atómico
+    con el GIL, así que no hace falta parar a los hilos)
+
+Con varios workers de gunicorn cada proceso tiene su registro: un hilo
+vuelca la instantánea cada EXPORTAR_CADA segundos en data/metricas/<pid>.json
+y /metrics suma la del propio proceso (en vivo) con las de los demás workers
+vivos. Las de procesos muertos se descartan (Prometheus lo ve como un reinicio
+de contadores).
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import tempfile
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from services.perfilador_service import perfilar_job
+from services import trazas_service as trazas
+
+logger = logging.getLogger(__name__)
+
+METRICAS_DIR = os.path.join("data", "metricas")
+EXPORTAR_CADA = float(os.getenv("METRICAS_EXPORTAR_SEGUNDOS", 10))
+
+CUBETAS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+CUBETAS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+_registro = {}  # nombre → métrica
+_exportador_iniciado = False
+_lock_exportador = threading.Lock()
+
+
+# === MÉTRICAS === #
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        if nombre in _registro:
+            raise ValueError(f"Métrica duplicada: {nombre}")
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()  # solo al crear el shard de un hilo nuevo
+        _registro[nombre] = self
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def _clave(self, etiquetas):
+        return tuple(str(etiquetas[e]) for e in self.etiquetas)
+
+    def series(self) -> dict:
+        """Suma de los shards: {valores de etiquetas: valor o lista de cubetas}."""
+        total = {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for clave, valor in shard.copy().items():
+                total[clave] = _sumar(total.get(clave), valor)
+        return total
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, valor=1, **etiquetas):
+        shard = self._shard()
+        clave = self._clave(etiquetas)
+        shard[clave] = shard.get(clave, 0) + valor
+
+
+class Histograma(_Metrica):
+    """Cubetas fijas (límites superiores, le); la fila es [cubetas..., +Inf, suma, cuenta]."""
+
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), cubetas=CUBETAS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.cubetas = tuple(cubetas)
+
+    def observar(self, valor, **etiquetas):
+        shard = self._shard()
+        clave = self._clave(etiquetas)
+        fila = shard.get(clave)
+        if fila is None:
+            fila = shard[clave] = [0] * (len(self.cubetas) + 3)
+        fila[bisect_left(self.cubetas, valor)] += 1
+        fila[-2] += valor
+        fila[-1] += 1
+
+    @contextmanager
+    def tiempo(self, **etiquetas):
+        """Observa la duración del bloque en segundos (también si lanza)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - t0, **etiquetas)
+
+
+def _sumar(a, b):
+    if a is None:
+        return list(b) if isinstance(b, list) else b
+    if isinstance(a, list):
+        return [x + y for x, y in zip(a, b)]
+    return a + b
+
+
+# === SERIES DE NEUROBET === #
+HANDLER_SEGUNDOS = Histograma(
+    "neurobet_handler_segundos", "Duración de los handlers de comandos de Telegram", ("comando",))
+HANDLER_ERRORES = Contador(
+    "neurobet_handler_errores_total", "Excepciones en handlers de Telegram", ("comando",))
+API_PETICIONES = Contador(
+    "neurobet_api_peticiones_total", "Llamadas a APIs externas", ("endpoint", "status", "clase"))
+API_SEGUNDOS = Histograma(
+    "neurobet_api_segundos", "Latencia de las APIs externas", ("endpoint",))
+ALMACEN_SEGUNDOS = Histograma(
+    "neurobet_almacen_segundos", "Duración de lecturas/escrituras de archivos de data/", ("operacion", "archivo"))
+ALMACEN_BYTES = Histograma(
+    "neurobet_almacen_bytes", "Tamaño de los archivos leídos/escritos en data/", ("operacion", "archivo"),
+    cubetas=CUBETAS_BYTES)
+INFERENCIA_SEGUNDOS = Histograma(
+    "neurobet_inferencia_segundos", "Tiempo de inferencia de los modelos", ("modelo",))
+JOB_SEGUNDOS = Histograma(
+    "neurobet_job_segundos", "Duración de los trabajos de fondo", ("job",))
+JOB_ERRORES = Contador(
+    "neurobet_job_errores_total", "Trabajos de fondo que terminaron con excepción", ("job",))
+
+
+def etiqueta_archivo(path) -> str:
+    """Nombre de archivo sin dígitos (picks-2025-01-01.json → picks-N-N-N.json): cardinalidad acotada."""
+    return re.sub(r"\d+", "N", os.path.basename(os.fspath(path)))
+
+
+def llamar_api(endpoint, peticion, *args, **kwargs):
+    """
+    Ejecuta peticion(*args, **kwargs) (p. ej. requests.get) midiendo latencia
+    y contando por endpoint, status HTTP y clase de error.
+    """
+    with trazas.span(f"http.{endpoint}") as s:
+        t0 = time.perf_counter()
+        try:
+            respuesta = peticion(*args, **kwargs)
+        except Exception as e:
+            API_PETICIONES.inc(endpoint=endpoint, status="error", clase=type(e).__name__)
+            raise
+        finally:
+            API_SEGUNDOS.observar(time.perf_counter() - t0, endpoint=endpoint)
+        status = respuesta.status_code
+        clase = "ok" if status < 400 else f"http_{status // 100}xx"
+        API_PETICIONES.inc(endpoint=endpoint, status=str(status), clase=clase)
+        s.atributo("status", status)
+        return respuesta
+
+
+@contextmanager
+def medir_job(job):
+    """
+    Duración de una vuelta de un trabajo de fondo; cuenta las que lanzan
+    excepción. Si el perfilador está activo, puede perfilar la vuelta.
+    """
+    t0 = time.perf_counter()
+    try:
+        with perfilar_job(job):
+            yield
+    except Exception:
+        JOB_ERRORES.inc(job=job)
+        raise
+    finally:
+        JOB_SEGUNDOS.observar(time.perf_counter() - t0, job=job)
+
+
+# === EXPOSICIÓN === #
+def instantanea() -> dict:
+    return {
+        m.nombre: {"series": [[list(clave), valor] for clave, valor in m.series().items()]}
+        for m in _registro.values()
+    }
+
+
+def _vivo(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def _instantaneas_de_otros_workers():
+    try:
+        archivos = os.listdir(METRICAS_DIR)
+    except FileNotFoundError:
+        return []
+    otras = []
+    for archivo in archivos:
+        if not archivo.endswith(".json") or not archivo[:-5].isdigit():
+            continue
+        pid = int(archivo[:-5])
+        ruta = os.path.join(METRICAS_DIR, archivo)
+        if pid == os.getpid():
+            continue
+        if not _vivo(pid):
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+            continue
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                otras.append(json.load(f))
+        except (OSError, ValueError):
+            pass
+    return otras
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _num(valor) -> str:
+    if isinstance(valor, float) and not valor.is_integer():
+        return repr(valor)
+    return str(int(valor))
+
+
+def _etiquetas(nombres, valores, extra=None) -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def exponer() -> str:
+    """Texto en formato de exposición de Prometheus (0.0.4) con todos los workers vivos."""
+    propias = {m.nombre: m.series() for m in _registro.values()}
+    for otra in _instantaneas_de_otros_workers():
+        for nombre, datos in otra.items():
+            if nombre not in propias:
+                continue
+            for clave, valor in datos["series"]:
+                clave = tuple(clave)
+                propias[nombre][clave] = _sumar(propias[nombre].get(clave), valor)
+
+    lineas = []
+    for m in _registro.values():
+        lineas.append(f"# HELP {m.nombre} {m.ayuda}")
+        lineas.append(f"# TYPE {m.nombre} {m.tipo}")
+        for clave, valor in sorted(propias[m.nombre].items()):
+            if m.tipo == "counter":
+                lineas.append(f"{m.nombre}{_etiquetas(m.etiquetas, clave)} {_num(valor)}")
+                continue
+            acumulado = 0
+            for limite, n in zip(list(m.cubetas) + ["+Inf"], valor[:-2]):
+                acumulado += n
+                le = 'le="' + (limite if isinstance(limite, str) else _num(float(limite))) + '"'
+                lineas.append(f"{m.nombre}_bucket{_etiquetas(m.etiquetas, clave, le)} {acumulado}")
+            lineas.append(f"{m.nombre}_sum{_etiquetas(m.etiquetas, clave)} {_num(float(valor[-2]))}")
+            lineas.append(f"{m.nombre}_count{_etiquetas(m.etiquetas, clave)} {_num(valor[-1])}")
+    return "\n".join(lineas) + "\n"
+
+
+# === EXPORTADOR ENTRE WORKERS === #
+def _volcar():
+    """Escribe la instantánea de este proceso (atómico; no pasa por almacen_json para no medirse)."""
+    os.makedirs(METRICAS_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=METRICAS_DIR, prefix=".tmp-", suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(instantanea(), f)
+    os.replace(tmp, os.path.join(METRICAS_DIR, f"{os.getpid()}.json"))
+
+
+def _hilo_exportador():
+    while True:
+        time.sleep(EXPORTAR_CADA)
+        try:
+            _volcar()
+        except Exception as e:
+            logger.error(f"❌ Error volcando métricas: {e}")
+
+
+def iniciar_exportador():
+    """Idempotente: lanza el hilo que comparte las métricas de este worker."""
+    global _exportador_iniciado
+    with _lock_exportador:
+        if _exportador_iniciado:
+            return
+        _exportador_iniciado = True
+    threading.Thread(target=_hilo_exportador, name="metricas", daemon=True).start()
+    logger.info("📈 Exportador de métricas iniciado.")
@@ -0,0 +1,216 @@
+"""
+Simulación Monte Carlo de parleys (combinadas) de Neurobet IA.
+
+Cada selección trae su probabilidad de acierto según el modelo (y, si
+aplica, de push: la selección se anula y su cuota cuenta como 1.0). Las
+selecciones pueden estar correlacionadas (cópula gaussiana): por defecto,
+dos selecciones del mismo partido tienen correlación
+CORRELACION_MISMO_PARTIDO y las de partidos distintos son independientes;
+también se puede pasar la matriz completa.
+
+Los ensayos se generan por bloques de BLOQUE filas (memoria acotada sin
+importar cuántos millones se pidan), todo vectorizado con NumPy:
+  - independientes: uniformes contra p
+  - correlacionadas: normales · Cholesky(R)ᵀ contra Φ⁻¹(p) (NormalDist)
+De cada bloque se acumulan aciertos, pagos y la distribución de pagos, así
+que el resultado no depende del tamaño de bloque.
+
+Si una selección no trae probabilidad pero su mercado es de goles o 1X2 y
+el partido tiene la forma "Local vs Visitante", se valora con el modelo de
+goles (services/goles_service.py).
+"""
+
+import os
+import re
+import time
+import logging
+from statistics import NormalDist
+
+import numpy as np
+
+from services import goles_service
+from services.apuestas_service import americano_a_decimal
+
+logger = logging.getLogger(__name__)
+
+ENSAYOS = int(os.getenv("PARLEY_ENSAYOS", 1_000_000))
+# Al registrar una apuesta basta menos precisión (±0.1 pp) y responde en decenas de ms
+ENSAYOS_REGISTRO = int(os.getenv("PARLEY_ENSAYOS_REGISTRO", 200_000))
+BLOQUE = int(os.getenv("PARLEY_BLOQUE", 131_072))
+CORRELACION_MISMO_PARTIDO = float(os.getenv("PARLEY_CORRELACION_MISMO_PARTIDO", 0.35))
+
+_NORMAL = NormalDist()
+
+
+# === ENTRADAS === #
+def _probabilidad(valor):
+    """Acepta 0–1 o porcentaje (0–100)."""
+    p = float(valor)
+    return p / 100 if p > 1 else p
+
+
+def matriz_correlacion(selecciones, rho=CORRELACION_MISMO_PARTIDO):
+    """Correlación rho entre selecciones del mismo partido, 0 entre partidos distintos."""
+    partidos = [str(s.get("partido", i)).strip().lower() for i, s in enumerate(selecciones)]
+    n = len(partidos)
+    matriz = np.eye(n)
+    for i in range(n):
+        for j in range(i + 1, n):
+            if partidos[i] == partidos[j]:
+                matriz[i, j] = matriz[j, i] = rho
+    return matriz
+
+
+def _cholesky(correlacion):
+    """Cholesky; si la matriz no es definida positiva, se recortan sus autovalores."""
+    try:
+        return np.linalg.cholesky(correlacion)
+    except np.linalg.LinAlgError:
+        valores, vectores = np.linalg.eigh(correlacion)
+        ajustada = vectores @ np.diag(np.maximum(valores, 1e-6)) @ vectores.T
+        d = np.sqrt(np.diag(ajustada))
+        logger.warning("⚠️ Matriz de correlación no definida positiva; se usa la más cercana.")
+        return np.linalg.cholesky(ajustada / np.outer(d, d))
+
+
+# === SIMULACIÓN === #
+def simular(probabilidades, cuotas, monto=1.0, pushes=None, correlacion=None, cuota_total=None,
+            ensayos=ENSAYOS, bloque=BLOQUE, semilla=None) -> dict:
+    """
+    Simula el parley. probabilidades/pushes en 0–1 por selección, cuotas
+    decimales; correlacion: matriz n×n o None (independientes). cuota_total
+    es la cuota combinada que paga la casa si difiere del producto de cuotas
+    (los pagos se escalan en esa proporción).
+    """
+    t0 = time.perf_counter()
+    p = np.asarray([_probabilidad(x) for x in probabilidades], dtype=np.float64)
+    cuotas = np.asarray(cuotas, dtype=np.float64)
+    push = np.zeros_like(p) if pushes is None else np.asarray([_probabilidad(x) for x in pushes], dtype=np.float64)
+    n = len(p)
+    if n == 0 or len(cuotas) != n or len(push) != n:
+        raise ValueError("Se necesita al menos una selección, con una cuota y probabilidad por selección.")
+    if np.any(p < 0) or np.any(p + push > 1):
+        raise ValueError("Probabilidades fuera de rango (acierto + push debe ser ≤ 1).")
+
+    escala = float(monto * (cuota_total / cuotas.prod() if cuota_total else 1.0))
+    azar = np.random.default_rng(semilla)
+    correlacionado = correlacion is not None and not np.allclose(correlacion, np.eye(n))
+    if correlacionado:
+        factor = _cholesky(np.asarray(correlacion, dtype=np.float64)).T
+        # Umbrales en escala normal: acierto si z < Φ⁻¹(p); push si Φ⁻¹(p) ≤ z < Φ⁻¹(p + push)
+        umbral_acierto = np.array([_NORMAL.inv_cdf(min(max(x, 1e-12), 1 - 1e-12)) for x in p])
+        umbral_push = np.array([_NORMAL.inv_cdf(min(max(x, 1e-12), 1 - 1e-12)) for x in p + push])
+    else:
+        umbral_acierto, umbral_push = p, p + push
+
+    con_push = bool(push.any())
+    aciertos_parley = 0
+    suma_pagos = 0.0
+    suma_pagos2 = 0.0
+    por_aciertos = np.zeros(n + 1, dtype=np.int64)
+    pagos = {}
+    hechos = 0
+    while hechos < ensayos:
+        m = min(bloque, ensayos - hechos)
+        if correlacionado:
+            z = azar.standard_normal((m, n)) @ factor
+        else:
+            z = azar.random((m, n))
+        gana = z < umbral_acierto
+        por_aciertos += np.bincount(gana.sum(axis=1), minlength=n + 1)
+        if con_push:
+            anulada = ~gana & (z < umbral_push)
+            # Cuota efectiva por ensayo: producto de las ganadas (push cuenta 1.0), 0 si alguna perdió
+            viva = (gana | anulada).all(axis=1)
+            cuota = np.where(viva, np.prod(np.where(gana, cuotas, 1.0), axis=1), 0.0)
+            aciertos_parley += int((viva & ~anulada.all(axis=1)).sum())
+        else:
+            viva = gana.all(axis=1)
+            cuota = np.where(viva, cuotas.prod(), 0.0)
+            aciertos_parley += int(viva.sum())
+        valores, veces = np.unique(np.round(cuota * escala, 2), return_counts=True)
+        for valor, k in zip(valores.tolist(), veces.tolist()):
+            pagos[valor] = pagos.get(valor, 0) + k
+        suma_pagos += float(cuota.sum()) * escala
+        suma_pagos2 += float((cuota * cuota).sum()) * escala * escala
+        hechos += m
+
+    prob = aciertos_parley / ensayos
+    pago_medio = suma_pagos / ensayos
+    varianza = max(suma_pagos2 / ensayos - pago_medio ** 2, 0.0)
+    return {
+        "selecciones": n,
+        "ensayos": ensayos,
+        "prob_acierto": round(prob, 6),
+        "error_estandar": round(float(np.sqrt(prob * (1 - prob) / ensayos)), 6),
+        "prob_independientes": round(float(p.prod()), 6),
+        "cuota_combinada": round(float(cuota_total or cuotas.prod()), 4),
+        "cuota_justa": round(1 / prob, 4) if prob else None,
+        "monto": monto,
+        "pago_esperado": round(pago_medio, 4),
+        "valor_esperado": round(pago_medio - monto, 4),
+        "roi_esperado": round((pago_medio - monto) / monto * 100, 2) if monto else None,
+        "desviacion_pago": round(float(np.sqrt(varianza)), 4),
+        "distribucion_pagos": [[valor, round(k / ensayos, 6)] for valor, k in sorted(pagos.items())],
+        "distribucion_aciertos": [round(int(k) / ensayos, 6) for k in por_aciertos],
+        "ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+
+
+# === PARLEYS DE APUESTAS === #
+_MERCADO_MAS = re.compile(r"m[aá]s de (\d+(?:\.\d+)?)", re.IGNORECASE)
+_MERCADO_MENOS = re.compile(r"menos de (\d+(?:\.\d+)?)", re.IGNORECASE)
+
+
+def probabilidad_modelo(partido: str, mercado: str):
+    """
+    Probabilidad del modelo de goles para un mercado en texto ("Gana X",
+    "Empate", "Más de 2.5 goles", "Menos de 2.5", "Ambos anotan: sí/no"),
+    o None si no se reconoce.
+    """
+    if " vs " not in str(partido).lower():
+        return None
+    local, visitante = re.split(r"\s+vs\s+", str(partido).strip(), maxsplit=1, flags=re.IGNORECASE)
+    mercado_bajo = str(mercado).strip().lower()
+    linea = _MERCADO_MAS.search(mercado_bajo) or _MERCADO_MENOS.search(mercado_bajo)
+    p = goles_service.probabilidades_partido(local, visitante)
+    if linea:
+        valor = float(linea.group(1))
+        mas = p["mas"].get(valor)
+        if mas is None:
+            mas = float(goles_service.mercados(goles_service.matriz_marcadores(
+                p["goles_local"], p["goles_visitante"], goles_service.modelo_actual().rho),
+                lineas=(valor,))["mas"][valor][0])
+        return 1 - mas if _MERCADO_MENOS.search(mercado_bajo) else mas
+    if "ambos" in mercado_bajo:
+        return p["ambos_anotan"] if not mercado_bajo.endswith("no") else 1 - p["ambos_anotan"]
+    if "empate" in mercado_bajo:
+        return p["empate"]
+    if local.lower() in mercado_bajo:
+        return p["local"]
+    if visitante.lower() in mercado_bajo:
+        return p["visitante"]
+    return None
+
+
+def evaluar_selecciones(selecciones, monto, cuota_total=None, ensayos=ENSAYOS, semilla=None):
+    """
+    Simula un parley a partir de sus selecciones
+    ([{"partido", "mercado", "odd", "probabilidad"?, "push"?}]).
+    Devuelve None si alguna selección no tiene cuota o probabilidad.
+    """
+    probabilidades, cuotas, pushes = [], [], []
+    for s in selecciones:
+        odd = str(s.get("odd", "")).strip()
+        if not odd:
+            return None
+        cuotas.append(americano_a_decimal(float(odd)) if odd[0] in "+-" else float(odd))
+        proba = s.get("probabilidad")
+        if proba is None:
+            proba = probabilidad_modelo(s.get("partido", ""), s.get("mercado", s.get("tipo_apuesta", "")))
+        if proba is None:
+            return None
+        probabilidades.append(proba)
+        pushes.append(s.get("push", 0.0))
+    return simular(probabilidades, cuotas, monto, pushes, matriz_correlacion(selecciones),
+                   cuota_total=cuota_total, ensayos=ensayos, semilla=semilla)
@@ -0,0 +1,206 @@
+"""
+Perfilador por muestreo de pilas, opcional, para updates y trabajos de fondo.
+
+Apagado por defecto. Se enciende con variables de entorno:
+  PERFILADOR_MUESTREO=N        perfila 1 de cada N updates y vueltas de jobs
+  PERFILADOR_CHATS=123,456     perfila siempre los updates de esos chats
+  PERFILADOR_COMANDOS=predecir perfila siempre esos comandos (o jobs, p. ej. autoaprendizaje)
+  PERFILADOR_INTERVALO_MS=5    periodo de muestreo
+
+Apagado, main_bot ni siquiera envuelve los handlers (costo cero) y los jobs
+solo miran un booleano.
+
+Mientras dura una sesión, un único hilo muestreador lee sys._current_frames()
+cada PERFILADOR_INTERVALO_MS y cuenta las pilas de los hilos de la sesión:
+  - update: el hilo del handler y los hilos "asyncio_*" del executor (donde
+    caen los asyncio.to_thread); en modo ASGI el loop es compartido, así que
+    pueden colarse pilas de otros updates concurrentes
+  - job: solo el hilo del job
+Las pilas ociosas (esperando en select, colas o locks) se descartan.
+
+Cada sesión se guarda en data/profiles/ en formato "collapsed"
+(marco;marco;marco N), el que leen flamegraph.pl y speedscope. Se conservan
+los últimos MAX_PERFILES archivos. agregado() los suma para servirlos por
+/profiles/collapsed.
+"""
+
+import os
+import re
+import sys
+import time
+import logging
+import itertools
+import threading
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+PROFILES_DIR = os.path.join("data", "profiles")
+MUESTREO = int(os.getenv("PERFILADOR_MUESTREO", 0))
+CHATS = {int(c) for c in os.getenv("PERFILADOR_CHATS", "").split(",") if c.strip()}
+COMANDOS = {c.strip().lstrip("/") for c in os.getenv("PERFILADOR_COMANDOS", "").split(",") if c.strip()}
+INTERVALO = float(os.getenv("PERFILADOR_INTERVALO_MS", 5)) / 1000
+MAX_PERFILES = int(os.getenv("PERFILADOR_MAX_PERFILES", 200))
+
+ACTIVO = bool(MUESTREO or CHATS or COMANDOS)
+
+# Hojas de pila que significan "hilo esperando", no trabajo
+_OCIOSAS = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get"),
+    ("socket.py", "accept"),
+    ("socketserver.py", "serve_forever"),
+}
+
+_contador = itertools.count()
+_sesiones = []
+_lock = threading.Lock()
+_muestreador = None
+
+
+class _Sesion:
+    def __init__(self, etiqueta, hilo, prefijos):
+        self.etiqueta = etiqueta
+        self.hilo = hilo
+        self.prefijos = prefijos
+        self.pilas = Counter()
+        self.inicio = time.time()
+        self.terminada = False
+
+    def incluye(self, ident, nombre):
+        return ident == self.hilo or (self.prefijos and nombre.startswith(self.prefijos))
+
+
+# === MUESTREO === #
+def _pila(frame, nombre_hilo):
+    marcos = []
+    while frame is not None:
+        codigo = frame.f_code
+        marcos.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}")
+        frame = frame.f_back
+    if not marcos:
+        return None
+    hoja = marcos[0].split(":", 1)
+    if (hoja[0], hoja[1]) in _OCIOSAS:
+        return None
+    marcos.append(re.sub(r"[_-]?\d+$", "", nombre_hilo) or "hilo")
+    return ";".join(reversed(marcos))
+
+
+def _muestrear():
+    global _muestreador
+    propio = threading.get_ident()
+    while True:
+        with _lock:
+            activas = [s for s in _sesiones if not s.terminada]
+            terminadas = [s for s in _sesiones if s.terminada]
+            _sesiones[:] = activas
+            if not activas and not terminadas:
+                _muestreador = None
+                return
+        for sesion in terminadas:
+            _guardar(sesion)
+        if activas:
+            nombres = {h.ident: h.name for h in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                nombre = nombres.get(ident, "")
+                pila = None
+                for sesion in activas:
+                    if sesion.incluye(ident, nombre):
+                        pila = pila or _pila(frame, nombre)
+                        if pila:
+                            sesion.pilas[pila] += 1
+        time.sleep(INTERVALO)
+
+
+def _guardar(sesion):
+    if not sesion.pilas:
+        return
+    try:
+        os.makedirs(PROFILES_DIR, exist_ok=True)
+        marca = time.strftime("%Y%m%d-%H%M%S", time.localtime(sesion.inicio))
+        nombre = f"{marca}-{int(sesion.inicio * 1000) % 1000:03d}-{os.getpid()}-{sesion.etiqueta}.collapsed"
+        ruta = os.path.join(PROFILES_DIR, nombre)
+        with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+            for pila, n in sesion.pilas.most_common():
+                f.write(f"{pila} {n}\n")
+        os.replace(ruta + ".tmp", ruta)
+        _rotar()
+    except OSError as e:
+        logger.error(f"❌ No se pudo guardar el perfil {sesion.etiqueta}: {e}")
+
+
+def _rotar():
+    archivos = sorted(a for a in os.listdir(PROFILES_DIR) if a.endswith(".collapsed"))
+    for viejo in archivos[:-MAX_PERFILES]:
+        try:
+            os.remove(os.path.join(PROFILES_DIR, viejo))
+        except OSError:
+            pass
+
+
+@contextmanager
+def _sesion(etiqueta, prefijos=()):
+    global _muestreador
+    sesion = _Sesion(re.sub(r"[^\w.-]", "_", etiqueta), threading.get_ident(), tuple(prefijos))
+    with _lock:
+        _sesiones.append(sesion)
+        if _muestreador is None:
+            _muestreador = threading.Thread(target=_muestrear, name="perfilador", daemon=True)
+            _muestreador.start()
+    try:
+        yield sesion
+    finally:
+        # El muestreador la guarda en su hilo: el handler no paga la escritura
+        sesion.terminada = True
+
+
+# === API === #
+def debe_perfilar(chat_id=None, comando=None) -> bool:
+    if chat_id in CHATS or comando in COMANDOS:
+        return True
+    return bool(MUESTREO) and next(_contador) % MUESTREO == 0
+
+
+def perfilar_job(job):
+    """Contexto para una vuelta de un job; nullcontext si no toca perfilarla."""
+    if not ACTIVO or not debe_perfilar(comando=job):
+        return nullcontext()
+    return _sesion(f"job-{job}")
+
+
+def envolver_handler(comando, handler):
+    """Envuelve un handler async de PTB para perfilar los updates que toquen."""
+    async def envuelto(update, context):
+        chat_id = update.effective_chat.id if update.effective_chat else None
+        if not debe_perfilar(chat_id, comando):
+            return await handler(update, context)
+        with _sesion(f"update-{comando}-{chat_id}", prefijos=("asyncio_",)):
+            return await handler(update, context)
+    return envuelto
+
+
+def agregado(filtro=None) -> str:
+    """Suma de los perfiles guardados (opcionalmente los que contienen `filtro` en el nombre)."""
+    total = Counter()
+    try:
+        archivos = sorted(a for a in os.listdir(PROFILES_DIR) if a.endswith(".collapsed"))
+    except FileNotFoundError:
+        return ""
+    for archivo in archivos:
+        if filtro and filtro not in archivo:
+            continue
+        try:
+            with open(os.path.join(PROFILES_DIR, archivo), encoding="utf-8") as f:
+                for linea in f:
+                    pila, _, n = linea.rstrip("\n").rpartition(" ")
+                    if pila and n.isdigit():
+                        total[pila] += int(n)
+        except OSError:
+            continue
+    return "".join(f"{pila} {n}\n" for pila, n in total.most_common())
@@ -0,0 +1,308 @@
+"""
+Picks del día de Neurobet IA.
+
+Los picks se eligen entre los partidos programados del día, valorados todos
+a la vez con el modelo de goles (services/goles_service.py): por partido se
+toma el mercado más probable (1X2, más/menos de 2.5, ambos anotan) y se
+publican los PICKS_MAX más seguros por encima de PICKS_PROB_MINIMA, con su
+cuota justa (1/p). Sin partidos o sin API se usa la lista de ejemplo.
+
+Los picks de hoy viven en memoria junto con sus mensajes ya renderizados
+(todos / free / premium). Un comando de picks solo compara la fecha y
+devuelve el texto: sin disco y sin construir strings.
+
+La caché se invalida al cambiar el día o al regenerar los picks. Como otro
+worker puede reescribir picks_diarios.json, cada REVALIDAR_SEGUNDOS se
+compara la firma del archivo (un stat) y se recarga si cambió.
+
+Generar picks llama a la API y ajusta el modelo de goles: eso solo ocurre
+en hilos de fondo (el diario o uno que se lanza al cambiar el día), nunca en
+una consulta. Las consultas se llaman desde handlers async: si los picks de
+hoy aún no están, piden la generación y mientras tanto sirven los últimos
+publicados (o los de ejemplo).
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+from services.almacen_json import leer_json, escribir_json, bloqueo
+from services.cambios_service import firma_archivo
+from services.metricas_service import medir_job
+from services.api_service import obtener_partidos_del_dia
+from services import goles_service
+
+logger = logging.getLogger(__name__)
+
+PICKS_PATH = Path("data") / "picks_diarios.json"
+REVALIDAR_SEGUNDOS = int(os.getenv("PICKS_REVALIDAR_SEGUNDOS", 60))
+INTERVALO_HILO = 3600
+PICKS_MAX = int(os.getenv("PICKS_MAX", 3))
+PICKS_PROB_MINIMA = float(os.getenv("PICKS_PROB_MINIMA", 0.55))
+
+_lock = threading.Lock()
+_cache = {"fecha": None, "picks": None, "mensajes": {}, "firma": None, "revisado": 0.0, "generando": False}
+
+
+# === GENERACIÓN === #
+def _generar_picks_del_dia():
+    """Picks de hoy valorados con el modelo de goles; la lista de ejemplo si no hay partidos."""
+    hoy = date.today().isoformat()
+    partidos = obtener_partidos_del_dia(hoy)
+    picks = _picks_de_partidos(partidos) if partidos else []
+    if picks:
+        logger.info(f"⚽ {len(picks)} picks elegidos entre {len(partidos)} partidos de hoy.")
+        return {"fecha": hoy, "picks": picks}
+    logger.warning("⚠️ Sin partidos valorables hoy; se publican los picks de ejemplo.")
+    return _picks_de_ejemplo(hoy)
+
+
+def _picks_de_partidos(partidos) -> list:
+    """Mejor mercado de cada partido (una sola valoración vectorizada) y los más probables."""
+    v = goles_service.valorar_partidos([(p["local"], p["visitante"]) for p in partidos])
+    mercados = [
+        ("Gana {local}", v["local"]),
+        ("Gana {visitante}", v["visitante"]),
+        ("Más de 2.5 goles", v["mas"][2.5]),
+        ("Menos de 2.5 goles", 1 - v["mas"][2.5]),
+        ("Ambos anotan: sí", v["ambos_anotan"]),
+        ("Ambos anotan: no", 1 - v["ambos_anotan"]),
+    ]
+    probas = np.column_stack([p for _, p in mercados])
+    # Solo partidos con ambos equipos en el historial (si no, todo es promedio de liga)
+    probas[~v["conocidos"].all(axis=1)] = 0.0
+    mejor = probas.argmax(axis=1)
+    proba_mejor = probas[np.arange(len(partidos)), mejor]
+
+    picks = []
+    for i in np.argsort(-proba_mejor)[:PICKS_MAX]:
+        proba = float(proba_mejor[i])
+        if proba < PICKS_PROB_MINIMA:
+            break
+        partido = partidos[i]
+        local, visita, _ = v["marcadores"][i][0]
+        picks.append({
+            "tipo": "free" if not picks else "premium",
+            "partido": f"{partido['local']} vs {partido['visitante']}",
+            "mercado": mercados[mejor[i]][0].format(**partido),
+            "odd": round(1 / proba, 2),
+            "confianza": round(proba * 100),
+            "analisis": (
+                f"Goles esperados {v['goles_local'][i]:.2f} - {v['goles_visitante'][i]:.2f}, "
+                f"marcador más probable {local}-{visita}. "
+                f"Cuota justa {1 / proba:.2f}: hay valor si la casa paga más."
+            ),
+        })
+    return picks
+
+
+def _picks_de_ejemplo(hoy: str) -> dict:
+    """Lista fija de ejemplo (free + premium) para cuando no hay partidos que valorar."""
+    return {
+        "fecha": hoy,
+        "picks": [
+            {
+                "tipo": "free",
+                "partido": "América vs Chivas",
+                "mercado": "Handicap -1 América",
+                "odd": 1.65,
+                "confianza": 82,
+                "analisis": (
+                    "América llega con racha goleadora y Chivas flojo de visita. "
+                    "En los últimos 5 enfrentamientos América ha dominado."
+                ),
+            },
+            {
+                "tipo": "premium",
+                "partido": "Dodgers vs Yankees",
+                "mercado": "Gana Yankees",
+                "odd": 1.70,
+                "confianza": 78,
+                "analisis": (
+                    "Yankees con mejor bullpen para hoy y Dodgers rotación secundaria. "
+                    "Valor aceptable por arriba de 1.65."
+                ),
+            },
+            {
+                "tipo": "premium",
+                "partido": "Barcelona vs Sevilla",
+                "mercado": "Más de 2.5 goles",
+                "odd": 1.68,
+                "confianza": 75,
+                "analisis": (
+                    "Ambos con promedio alto de tiros y Barcelona concede ocasiones. "
+                    "Buen pick para combinadas."
+                ),
+            },
+        ],
+    }
+
+
+# === RENDER === #
+def _renderizar(data: dict) -> dict:
+    """Construye una sola vez los tres mensajes Markdown."""
+    picks = data.get("picks", [])
+
+    todos = "🎯 *Picks del día*\n\n"
+    for p in picks:
+        todos += (
+            f"• [{p['tipo'].upper()}] {p['partido']} → {p['mercado']} "
+            f"(odd {p['odd']})\n"
+            f"  Confianza: {p['confianza']}%\n"
+            f"  {p['analisis']}\n\n"
+        )
+
+    mensajes = {"todos": todos}
+    for tipo, titulo in (("free", "🆓 *Picks FREE de hoy*"), ("premium", "💎 *Picks PREMIUM de hoy*")):
+        seleccion = [p for p in picks if p["tipo"] == tipo]
+        if not seleccion:
+            mensajes[tipo] = f"📭 Hoy no hay picks {tipo}."
+            continue
+        texto = f"{titulo}\n\n"
+        for p in seleccion:
+            texto += (
+                f"• {p['partido']} → {p['mercado']} (odd {p['odd']})\n"
+                f"{p['analisis']}\n\n"
+            )
+        mensajes[tipo] = texto
+    return mensajes
+
+
+def _publicar(data: dict):
+    _cache.update({
+        "fecha": data.get("fecha"),
+        "picks": data,
+        "mensajes": _renderizar(data),
+        "firma": firma_archivo(PICKS_PATH),
+        "revisado": time.monotonic(),
+    })
+
+
+# === DISCO === #
+def asegurar_picks_de_hoy() -> dict:
+    """
+    Se asegura de que existan picks de hoy (en disco y en caché) y los devuelve.
+    Puede llamar a la API: solo desde hilos de fondo (o asyncio.to_thread).
+    """
+    hoy = date.today().isoformat()
+    data = leer_json(PICKS_PATH, dict)
+    if data.get("fecha") != hoy:
+        # Solo un worker genera los picks; los demás leen lo que escribió
+        with bloqueo(PICKS_PATH):
+            data = leer_json(PICKS_PATH, dict)
+            if data.get("fecha") != hoy:
+                data = _generar_picks_del_dia()
+                escribir_json(PICKS_PATH, data)
+                logger.info("🧠 Picks del día generados automáticamente.")
+    with _lock:
+        _publicar(data)
+    return data
+
+
+def regenerar_picks(data: dict = None) -> dict:
+    """Reemplaza los picks de hoy (generados o dados) e invalida la caché."""
+    data = data or _generar_picks_del_dia()
+    with _lock:
+        escribir_json(PICKS_PATH, data)
+        _publicar(data)
+    logger.info("♻️ Picks del día regenerados.")
+    return data
+
+
+def _vigente() -> bool:
+    """
+    True si la caché corresponde a hoy y al archivo actual. El disco se
+    mira como mucho una vez cada REVALIDAR_SEGUNDOS, también mientras se
+    sirven los picks de ayer a la espera de los de hoy.
+    """
+    if _cache["picks"] is None:
+        return False
+    if time.monotonic() - _cache["revisado"] < REVALIDAR_SEGUNDOS:
+        return True
+    if _cache["fecha"] != date.today().isoformat():
+        return False
+    _cache["revisado"] = time.monotonic()
+    return firma_archivo(PICKS_PATH) == _cache["firma"]
+
+
+def _solicitar_generacion():
+    """Genera los picks de hoy en un hilo de fondo (uno a la vez por worker)."""
+    with _lock:
+        if _cache["generando"]:
+            return
+        _cache["generando"] = True
+
+    def generar():
+        try:
+            with medir_job("picks_diarios"):
+                asegurar_picks_de_hoy()
+        except Exception as e:
+            logger.error(f"❌ Error generando picks: {e}")
+        finally:
+            _cache["generando"] = False
+
+    threading.Thread(target=generar, name="picks-generacion", daemon=True).start()
+
+
+def _refrescar():
+    """
+    Pone en caché los picks de hoy si ya están en disco. Si no, pide la
+    generación en segundo plano y deja los últimos publicados (o los de
+    ejemplo). Nunca llama a la API ni al modelo: apto para handlers async.
+    """
+    hoy = date.today().isoformat()
+    data = leer_json(PICKS_PATH, dict)
+    if data.get("fecha") == hoy:
+        with _lock:
+            _publicar(data)
+        return
+    _solicitar_generacion()
+    with _lock:
+        if _cache["picks"] is None:
+            _publicar(data if data.get("picks") else _picks_de_ejemplo(hoy))
+        # Hasta el siguiente intervalo se sirve lo que hay sin volver al disco
+        _cache["revisado"] = time.monotonic()
+
+
+# === CONSULTA === #
+def obtener_picks() -> dict:
+    """Picks de hoy ({"fecha", "picks"}); los anteriores mientras se generan."""
+    if not _vigente():
+        _refrescar()
+    return _cache["picks"]
+
+
+def obtener_mensaje(tipo: str = "todos") -> str:
+    """Mensaje ya renderizado: "todos", "free" o "premium"."""
+    if not _vigente():
+        _refrescar()
+    return _cache["mensajes"][tipo]
+
+
+def hay_picks_hoy() -> bool:
+    """Si existen picks de hoy. Solo lee disco si la caché no está vigente."""
+    if _vigente():
+        return True
+    return leer_json(PICKS_PATH, dict).get("fecha") == date.today().isoformat()
+
+
+# === HILO DIARIO === #
+def _hilo_picks_daemon():
+    """Hilo muy ligero que cada hora se asegura de que existan picks del día."""
+    while True:
+        try:
+            with medir_job("picks_diarios"):
+                asegurar_picks_de_hoy()
+        except Exception as e:
+            logger.error(f"❌ Error auto-picks: {e}")
+        time.sleep(INTERVALO_HILO)
+
+
+def iniciar_hilo_picks():
+    threading.Thread(target=_hilo_picks_daemon, name="picks-diarios", daemon=True).start()
+    logger.info("🟣 Hilo de picks diarios iniciado.")
@@ -0,0 +1,194 @@
+"""
+Registro versionado de modelos de Neurobet IA.
+
+Estructura en disco:
+    data/modelos/<nombre>/v0001/modelo.joblib
+    data/modelos/<nombre>/v0001/manifest.json   (métricas, features, hash de datos…)
+    data/modelos/<nombre>/CURRENT                (versión activa, p. ej. "v0003")
+
+Las versiones son inmutables: se escriben en un directorio temporal y se
+publican con un rename atómico; el puntero CURRENT se reemplaza con
+os.replace. La carga usa joblib con mmap_mode="r", de modo que los arrays
+grandes del modelo se comparten entre workers vía page cache.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from services import trazas_service as trazas
+
+logger = logging.getLogger(__name__)
+
+# === RUTAS === #
+REGISTRO_DIR = Path(os.getenv("REGISTRO_MODELOS_DIR", "data/modelos"))
+ARTEFACTO = "modelo.joblib"
+MANIFEST = "manifest.json"
+
+# Caché en proceso: (nombre) → (versión, modelo, manifest)
+_cache = {}
+_lock = threading.Lock()
+
+
+# === UTILIDADES === #
+def _dir_modelo(nombre: str) -> Path:
+    return REGISTRO_DIR / nombre
+
+
+def _sha256_archivo(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def hash_datos(X, y=None) -> str:
+    """Hash de los datos de entrenamiento, para saber con qué se entrenó cada versión."""
+    h = hashlib.sha256()
+    for arr in (X, y):
+        if arr is None:
+            continue
+        arr = np.ascontiguousarray(np.asarray(arr))
+        h.update(str(arr.dtype).encode())
+        h.update(str(arr.shape).encode())
+        h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+def listar_versiones(nombre: str):
+    """Versiones publicadas de un modelo, de la más antigua a la más nueva."""
+    base = _dir_modelo(nombre)
+    if not base.exists():
+        return []
+    return sorted(p.name for p in base.iterdir() if p.is_dir() and p.name.startswith("v"))
+
+
+def obtener_version_actual(nombre: str):
+    """Versión apuntada por CURRENT, o None si el modelo no tiene ninguna activa."""
+    try:
+        return (_dir_modelo(nombre) / "CURRENT").read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def leer_manifest(nombre: str, version: str) -> dict:
+    with open(_dir_modelo(nombre) / version / MANIFEST, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# === PUBLICACIÓN === #
+def activar_version(nombre: str, version: str) -> None:
+    """Cambia el puntero CURRENT de forma atómica."""
+    base = _dir_modelo(nombre)
+    if not (base / version / ARTEFACTO).exists():
+        raise ValueError(f"La versión {version} de '{nombre}' no existe.")
+    fd, tmp = tempfile.mkstemp(dir=base, prefix=".CURRENT-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, base / "CURRENT")
+    logger.info(f"📌 Modelo '{nombre}' activo: {version}")
+
+
+def publicar_modelo(
+    modelo,
+    nombre: str,
+    metricas: dict,
+    features: list,
+    datos_hash: str = None,
+    activar: bool = True,
+    compresion: int = 0,
+) -> str:
+    """
+    Guarda una nueva versión inmutable del modelo y (opcionalmente) la activa.
+    compresion=0 deja el artefacto apto para mmap; con compresión joblib
+    no puede mapear el archivo y la carga lo lee completo en memoria.
+    Devuelve el nombre de la versión (p. ej. "v0004").
+    """
+    base = _dir_modelo(nombre)
+    base.mkdir(parents=True, exist_ok=True)
+
+    from joblib import dump
+
+    staging = Path(tempfile.mkdtemp(dir=base, prefix=".staging-"))
+    try:
+        dump(modelo, staging / ARTEFACTO, compress=compresion)
+        manifest = {
+            "nombre": nombre,
+            "creado": datetime.utcnow().isoformat(),
+            "clase": type(modelo).__name__,
+            "metricas": metricas,
+            "features": list(features),
+            "datos_hash": datos_hash,
+            "compresion": compresion,
+            "tamano_bytes": (staging / ARTEFACTO).stat().st_size,
+            "sha256": _sha256_archivo(staging / ARTEFACTO),
+        }
+
+        # Reservar el siguiente número con un rename atómico (reintenta si otro proceso ganó)
+        while True:
+            existentes = listar_versiones(nombre)
+            siguiente = int(existentes[-1][1:]) + 1 if existentes else 1
+            version = f"v{siguiente:04d}"
+            manifest["version"] = version
+            with open(staging / MANIFEST, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False, default=str)
+            try:
+                os.rename(staging, base / version)
+                break
+            except OSError:
+                if not (base / version).exists():
+                    raise
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    (base / version).chmod(0o755)
+    for archivo in (base / version).iterdir():
+        archivo.chmod(0o444)
+    logger.info(f"💾 Modelo '{nombre}' publicado como {version} ({manifest['tamano_bytes']} bytes)")
+
+    if activar:
+        activar_version(nombre, version)
+    return version
+
+
+# === CARGA === #
+def cargar_modelo_actual(nombre: str, mmap_mode: str = "r"):
+    """
+    Devuelve (modelo, manifest) de la versión activa, o (None, None).
+    Se cachea por versión: solo se vuelve a leer disco si CURRENT cambió.
+    """
+    version = obtener_version_actual(nombre)
+    if version is None:
+        return None, None
+    trazas.atributo("version", version)
+
+    cacheado = _cache.get(nombre)
+    if cacheado and cacheado[0] == version:
+        trazas.atributo("cache_hit", True)
+        return cacheado[1], cacheado[2]
+    trazas.atributo("cache_hit", False)
+
+    with _lock:
+        cacheado = _cache.get(nombre)
+        if cacheado and cacheado[0] == version:
+            return cacheado[1], cacheado[2]
+
+        manifest = leer_manifest(nombre, version)
+        modo = mmap_mode if not manifest.get("compresion") else None
+        from joblib import load
+
+        modelo = load(_dir_modelo(nombre) / version / ARTEFACTO, mmap_mode=modo)
+        _cache[nombre] = (version, modelo, manifest)
+    logger.info(f"✅ Modelo '{nombre}' {version} cargado (mmap={modo}).")
+    return modelo, manifest
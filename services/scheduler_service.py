@@ -6,6 +6,9 @@ from datetime import datetime, timedelta
 from services.autoaprendizaje_service import evaluar_predicciones
 from services.memoria_service import guardar_evento_global
 from services.visualizacion_service import generar_grafico_precision  # ✅ Nuevo
+from services.cambios_service import firma_entradas
+from services.evaluacion_service import HISTORIAL_PATH
+from services.metricas_service import medir_job
 
 logger = logging.getLogger(__name__)
 
@@ -14,28 +17,75 @@ logger = logging.getLogger(__name__)
 # ⚙️ En producción, cambia a 12 * 3600 (12 horas)
 INTERVALO_SEGUNDOS = 120
 
+# === ENTRADAS QUE DISPARAN UN CICLO === #
+# Si ni el historial ni los resultados cambiaron desde el último ciclo,
+# no se evalúa, no se persiste el modelo y no se regenera el gráfico.
+CLAVES_ENTRADA = ("historial", "resultados")
+ARCHIVOS_ENTRADA = (HISTORIAL_PATH,)
 
-def ciclo_autoaprendizaje():
+_ultima_firma = None
+_estadisticas = {"ejecutados": 0, "omitidos": 0, "ultimo_ejecutado": None}
+
+
+def obtener_estadisticas_ciclo():
+    """Devuelve cuántos ciclos se ejecutaron y cuántos se omitieron por falta de cambios."""
+    return dict(_estadisticas)
+
+
+def ejecutar_ciclo(forzar=False):
     """
-    Ciclo automático de autoentrenamiento y generación de gráficos IA (modo prueba)
+    Ejecuta un ciclo de autoaprendizaje solo si las entradas cambiaron.
+    Devuelve el resultado de la evaluación, o None si se omitió.
     """
-    while True:
-        try:
-            logger.info("🧠 [AUTO] Iniciando ciclo automático de autoaprendizaje...")
+    global _ultima_firma
+
+    firma = firma_entradas(CLAVES_ENTRADA, ARCHIVOS_ENTRADA)
+    if not forzar and firma == _ultima_firma:
+        _estadisticas["omitidos"] += 1
+        logger.info(
+            f"⏭️ [AUTO] Sin cambios en historial/resultados, ciclo omitido "
+            f"({_estadisticas['omitidos']} omitidos / {_estadisticas['ejecutados']} ejecutados)."
+        )
+        return None
 
-            resultado = evaluar_predicciones()
-            if resultado:
-                guardar_evento_global("Sistema", "autoaprendizaje_automatico", resultado)
+    logger.info("🧠 [AUTO] Iniciando ciclo automático de autoaprendizaje...")
+    resultado = evaluar_predicciones()
+    if resultado:
+        # Resumen compacto: las métricas incrementales completas ya viven en su artefacto
+        incremental = resultado.get("incremental") or {}
+        guardar_evento_global("Sistema", "autoaprendizaje_automatico", {
+            "precision": resultado["precision"],
+            "fuente": resultado["fuente"],
+            "filas": incremental.get("filas", 0),
+        })
 
-                # 🧩 Generar gráfico actualizado
-                grafico = generar_grafico_precision()
-                if grafico:
-                    logger.info(f"📊 [AUTO] Gráfico actualizado automáticamente: {grafico}")
+        # 🧩 Generar gráfico actualizado
+        grafico = generar_grafico_precision()
+        if grafico:
+            logger.info(f"📊 [AUTO] Gráfico actualizado automáticamente: {grafico}")
 
-                logger.info(f"✅ [AUTO] Ciclo completado: {resultado}")
-            else:
-                logger.info("⚠️ [AUTO] No hay suficientes datos para entrenar este ciclo.")
+        logger.info(f"✅ [AUTO] Ciclo completado: {resultado}")
+    else:
+        logger.info("⚠️ [AUTO] No hay suficientes datos para entrenar este ciclo.")
 
+    # Se guarda la firma de antes del ciclo: lo que escriban otros hilos o
+    # workers mientras corre dispara la siguiente vuelta. La reescritura
+    # propia del historial se anota con marcar_escritura_propia y no cuenta.
+    # Si algo falla antes de llegar aquí, se reintenta en la siguiente vuelta.
+    _ultima_firma = firma
+    _estadisticas["ejecutados"] += 1
+    _estadisticas["ultimo_ejecutado"] = datetime.utcnow().isoformat()
+    return resultado
+
+
+def ciclo_autoaprendizaje():
+    """
+    Ciclo automático de autoentrenamiento y generación de gráficos IA (modo prueba)
+    """
+    while True:
+        try:
+            with medir_job("autoaprendizaje"):
+                ejecutar_ciclo()
         except Exception as e:
             logger.error(f"❌ Error en autoaprendizaje automático: {e}")
 
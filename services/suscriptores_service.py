@@ -0,0 +1,77 @@
+"""
+Registro de suscriptores a la difusión de picks de Neurobet IA.
+
+data/suscriptores.json: {chat_id: {"nivel": "free"|"premium", "activo": bool, "alta": iso}}
+Las bajas y los chats que bloquean al bot quedan inactivos, no se borran.
+"""
+
+import logging
+from datetime import datetime
+from pathlib import Path
+
+from services.almacen_json import leer_json, transaccion_json
+
+logger = logging.getLogger(__name__)
+
+SUSCRIPTORES_PATH = Path("data") / "suscriptores.json"
+NIVELES = ("free", "premium")
+
+
+def suscribir(chat_id: int, nivel: str = None) -> dict:
+    """
+    Alta (o cambio de nivel) de un chat. Sin nivel se conserva el que tenía
+    (un premium que vuelve a suscribirse sigue premium); si es nuevo, free.
+    """
+    if nivel is not None and nivel not in NIVELES:
+        raise ValueError(f"Nivel inválido: {nivel}")
+    with transaccion_json(SUSCRIPTORES_PATH, dict) as suscriptores:
+        previo = suscriptores.get(str(chat_id), {})
+        nivel = nivel or previo.get("nivel", "free")
+        registro = {
+            "nivel": nivel,
+            "activo": True,
+            "alta": previo.get("alta") or datetime.utcnow().isoformat(),
+        }
+        suscriptores[str(chat_id)] = registro
+    logger.info(f"📬 Chat {chat_id} suscrito ({nivel}).")
+    return registro
+
+
+def desuscribir(chat_id: int, motivo: str = "baja") -> bool:
+    """Marca un chat como inactivo. Devuelve False si no estaba suscrito."""
+    with transaccion_json(SUSCRIPTORES_PATH, dict) as suscriptores:
+        registro = suscriptores.get(str(chat_id))
+        if registro is None:
+            return False
+        registro["activo"] = False
+        registro["motivo_baja"] = motivo
+    return True
+
+
+def desuscribir_varios(chat_ids, motivo: str) -> int:
+    """Baja en bloque (una sola escritura), p. ej. chats que bloquearon al bot."""
+    if not chat_ids:
+        return 0
+    with transaccion_json(SUSCRIPTORES_PATH, dict) as suscriptores:
+        n = 0
+        for chat_id in chat_ids:
+            registro = suscriptores.get(str(chat_id))
+            if registro and registro.get("activo"):
+                registro["activo"] = False
+                registro["motivo_baja"] = motivo
+                n += 1
+    return n
+
+
+def obtener_suscriptores(nivel: str = None) -> dict:
+    """{chat_id (int): nivel} de los suscriptores activos, opcionalmente de un nivel."""
+    return {
+        int(chat_id): r["nivel"]
+        for chat_id, r in leer_json(SUSCRIPTORES_PATH, dict).items()
+        if r.get("activo") and (nivel is None or r["nivel"] == nivel)
+    }
+
+
+def contar_suscriptores() -> dict:
+    activos = obtener_suscriptores()
+    return {nivel: sum(1 for n in activos.values() if n == nivel) for nivel in NIVELES}
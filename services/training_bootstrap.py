@@ -1,79 +1,141 @@
 import os
 import json
-import random
 import logging
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
-from joblib import dump
+from services.registro_modelos import publicar_modelo, hash_datos
 
 # === LOGGING === #
 logger = logging.getLogger(__name__)
 
 # === RUTAS === #
 DATA_DIR = Path("data")
-MODEL_PATH = DATA_DIR / "modelo_entrenado.joblib"
+NOMBRE_MODELO = "partido_1x2"
 BOOTSTRAP_LOG = DATA_DIR / "bootstrap_log.json"
+DATASETS_DIR = DATA_DIR / "datasets"
 
 DATA_DIR.mkdir(exist_ok=True)
 
+# === DATASET SIMULADO === #
+EQUIPOS = ["Barcelona", "Real Madrid", "Bayern", "PSG", "Arsenal", "Juventus", "Inter", "Liverpool"]
+FEATURES = ["goles_local", "goles_visitante", "tiros_local", "tiros_visitante", "posesion_local", "posesion_visitante"]
+COLUMNAS_NUMERICAS = [
+    "goles_local", "goles_visitante", "tiros_local", "tiros_visitante",
+    "posesion_local", "posesion_visitante", "resultado",
+]
+
+
+def _ruta_dataset(n_partidos: int, semilla: int) -> Path:
+    return DATASETS_DIR / f"simulado_n{n_partidos}_s{semilla}.npz"
+
+
+def generar_dataset_simulado(n_partidos: int = 10000, semilla: int = 42) -> pd.DataFrame:
+    """
+    Genera partidos ficticios en una sola pasada vectorizada con NumPy.
+    Mismas columnas y misma regla de etiqueta que el generador original:
+    1 gana local, 0 empate, -1 gana visitante.
+    """
+    rng = np.random.default_rng(semilla)
+    n_equipos = len(EQUIPOS)
+
+    local = rng.integers(0, n_equipos, n_partidos, dtype=np.int8)
+    # Desplazamiento 1..n-1 sobre el índice local: visitante uniforme y nunca igual al local
+    visitante = ((local + rng.integers(1, n_equipos, n_partidos, dtype=np.int8)) % n_equipos).astype(np.int8)
+
+    goles_local = rng.integers(0, 6, n_partidos, dtype=np.int8)
+    goles_visitante = rng.integers(0, 6, n_partidos, dtype=np.int8)
+    tiros_local = rng.integers(1, 16, n_partidos, dtype=np.int8)
+    tiros_visitante = rng.integers(1, 16, n_partidos, dtype=np.int8)
+    posesion_local = rng.integers(40, 71, n_partidos, dtype=np.int8)
+    posesion_visitante = (100 - posesion_local).astype(np.int8)
+    resultado = np.sign(goles_local - goles_visitante).astype(np.int8)
+
+    return pd.DataFrame({
+        "local": pd.Categorical.from_codes(local, categories=EQUIPOS),
+        "visitante": pd.Categorical.from_codes(visitante, categories=EQUIPOS),
+        "goles_local": goles_local,
+        "goles_visitante": goles_visitante,
+        "tiros_local": tiros_local,
+        "tiros_visitante": tiros_visitante,
+        "posesion_local": posesion_local,
+        "posesion_visitante": posesion_visitante,
+        "resultado": resultado,
+    })
+
+
+def cargar_dataset_simulado(n_partidos: int = 10000, semilla: int = 42) -> pd.DataFrame:
+    """
+    Devuelve el dataset simulado para (n_partidos, semilla), leyéndolo del
+    artefacto .npz comprimido si ya existe; si no, lo genera y lo guarda.
+    """
+    ruta = _ruta_dataset(n_partidos, semilla)
+    if ruta.exists():
+        try:
+            with np.load(ruta, allow_pickle=False) as npz:
+                equipos = [str(e) for e in npz["equipos"]]
+                df = pd.DataFrame({
+                    "local": pd.Categorical.from_codes(npz["local"], categories=equipos),
+                    "visitante": pd.Categorical.from_codes(npz["visitante"], categories=equipos),
+                    **{col: npz[col] for col in COLUMNAS_NUMERICAS},
+                })
+            logger.info(f"📦 Dataset simulado cargado desde caché: {ruta}")
+            return df
+        except Exception as e:
+            logger.warning(f"⚠️ Artefacto de dataset inválido ({ruta}), se regenera: {e}")
+
+    df = generar_dataset_simulado(n_partidos, semilla)
+    DATASETS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = ruta.with_name(ruta.stem + ".tmp.npz")
+    np.savez_compressed(
+        tmp,
+        equipos=np.array(EQUIPOS),
+        local=df["local"].cat.codes.to_numpy(),
+        visitante=df["visitante"].cat.codes.to_numpy(),
+        **{col: df[col].to_numpy() for col in COLUMNAS_NUMERICAS},
+    )
+    os.replace(tmp, ruta)
+    logger.info(f"💾 Dataset simulado guardado en {ruta}")
+    return df
+
+
 # === FUNCIÓN PRINCIPAL === #
 def entrenamiento_autonomo_previo():
     """Entrena el modelo IA automáticamente usando datos simulados y reales."""
     try:
         logger.info("🧠 Iniciando entrenamiento autónomo previo...")
 
-        # 1️⃣ Generar dataset simulado (10,000 partidos ficticios)
-        equipos = ["Barcelona", "Real Madrid", "Bayern", "PSG", "Arsenal", "Juventus", "Inter", "Liverpool"]
-        data = []
-
-        for _ in range(10000):
-            local = random.choice(equipos)
-            visitante = random.choice([e for e in equipos if e != local])
-            goles_local = random.randint(0, 5)
-            goles_visitante = random.randint(0, 5)
-            tiros_local = random.randint(1, 15)
-            tiros_visitante = random.randint(1, 15)
-            posesion_local = random.randint(40, 70)
-            posesion_visitante = 100 - posesion_local
-
-            ganador = 1 if goles_local > goles_visitante else (0 if goles_local == goles_visitante else -1)
-
-            data.append({
-                "local": local,
-                "visitante": visitante,
-                "goles_local": goles_local,
-                "goles_visitante": goles_visitante,
-                "tiros_local": tiros_local,
-                "tiros_visitante": tiros_visitante,
-                "posesion_local": posesion_local,
-                "posesion_visitante": posesion_visitante,
-                "resultado": ganador
-            })
-
-        df = pd.DataFrame(data)
-        logger.info(f"📊 Dataset simulado generado: {len(df)} registros")
+        # 1️⃣ Generar (o cargar de caché) dataset simulado (10,000 partidos ficticios)
+        df = cargar_dataset_simulado(10000, semilla=42)
+        logger.info(f"📊 Dataset simulado listo: {len(df)} registros")
 
         # 2️⃣ Preparar variables de entrenamiento
-        X = df[["goles_local", "goles_visitante", "tiros_local", "tiros_visitante", "posesion_local", "posesion_visitante"]]
+        X = df[FEATURES]
         y = df["resultado"]
 
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
         # 3️⃣ Entrenar modelo ML
-        modelo = RandomForestClassifier(n_estimators=150, max_depth=8, random_state=42)
+        modelo = RandomForestClassifier(n_estimators=150, max_depth=8, random_state=42, n_jobs=-1)
         modelo.fit(X_train, y_train)
+        modelo.set_params(n_jobs=1)  # en producción se predice fila a fila: un hilo
 
         # 4️⃣ Evaluar rendimiento
         y_pred = modelo.predict(X_test)
         precision = round(accuracy_score(y_test, y_pred) * 100, 2)
         logger.info(f"✅ Entrenamiento completo. Precisión simulada: {precision}%")
 
-        # 5️⃣ Guardar modelo entrenado
-        dump(modelo, MODEL_PATH)
-        logger.info(f"💾 Modelo guardado en {MODEL_PATH}")
+        # 5️⃣ Publicar modelo entrenado en el registro (nueva versión activa)
+        version = publicar_modelo(
+            modelo,
+            NOMBRE_MODELO,
+            metricas={"accuracy_test": precision},
+            features=FEATURES,
+            datos_hash=hash_datos(X.to_numpy(), y.to_numpy()),
+        )
 
         # 6️⃣ Guardar log de entrenamiento
         with open(BOOTSTRAP_LOG, "w", encoding="utf-8") as f:
@@ -81,6 +143,7 @@ def entrenamiento_autonomo_previo():
                 "precision": precision,
                 "total_partidos": len(df),
                 "modelo": "RandomForestClassifier",
+                "version": version,
                 "fecha": pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
             }, f, indent=4, ensure_ascii=False)
 
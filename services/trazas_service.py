@@ -0,0 +1,181 @@
+"""
+Trazas ligeras (spans) para seguir un update por el pipeline de predicción.
+
+    with trazas.span("ia.predecir_partido", local=a, visitante=b) as s:
+        ...
+        s.atributo("modo", modo)
+
+o, para una función entera, @trazas.trazado("ia.cargar_modelo").
+
+El span actual vive en un ContextVar: los spans anidados (también los que
+corren en asyncio.to_thread, que copia el contexto) quedan como hijos.
+trazas.atributo(clave, valor) anota el span actual desde código que no tiene
+el objeto a mano (p. ej. un acierto de caché).
+
+Al cerrar un span raíz, su árbol se exporta como JSONL (un span por línea)
+a data/trazas/spans.jsonl desde un hilo escritor, fuera del camino del
+update; el archivo rota a spans.jsonl.1 al pasar TRAZAS_MAX_BYTES. Si la
+raíz tardó más de TRAZAS_LENTO_MS, el árbol completo va al log.
+TRAZAS=0 las desactiva (span() devuelve un span nulo).
+"""
+
+import os
+import json
+import time
+import queue
+import random
+import logging
+import threading
+import functools
+from contextvars import ContextVar
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+TRAZAS_DIR = os.path.join("data", "trazas")
+SPANS_PATH = os.path.join(TRAZAS_DIR, "spans.jsonl")
+ACTIVAS = os.getenv("TRAZAS", "1") != "0"
+LENTO_MS = float(os.getenv("TRAZAS_LENTO_MS", 2000))
+MAX_BYTES = int(os.getenv("TRAZAS_MAX_BYTES", 10 * 1024 * 1024))
+
+_actual = ContextVar("span_actual", default=None)
+_cola = queue.SimpleQueue()
+_escritor = None
+_lock_escritor = threading.Lock()
+
+
+class Span:
+    __slots__ = ("nombre", "traza", "id", "padre", "inicio", "ms", "atributos", "hijos", "error")
+
+    def __init__(self, nombre, padre=None, atributos=None):
+        self.nombre = nombre
+        self.padre = padre
+        self.traza = padre.traza if padre else f"{random.getrandbits(64):016x}"
+        self.id = f"{random.getrandbits(32):08x}"
+        self.inicio = time.time()
+        self.ms = None
+        self.atributos = dict(atributos or {})
+        self.hijos = []
+        self.error = None
+
+    def atributo(self, clave, valor):
+        self.atributos[clave] = valor
+
+    def como_dict(self):
+        return {
+            "traza": self.traza,
+            "span": self.id,
+            "padre": self.padre.id if self.padre else None,
+            "nombre": self.nombre,
+            "inicio": round(self.inicio, 6),
+            "ms": self.ms,
+            "atributos": self.atributos,
+            "error": self.error,
+        }
+
+
+class _SpanNulo:
+    def atributo(self, clave, valor):
+        pass
+
+
+_NULO = _SpanNulo()
+
+
+@contextmanager
+def span(nombre, **atributos):
+    """Abre un span hijo del actual (o raíz) durante el bloque."""
+    if not ACTIVAS:
+        yield _NULO
+        return
+    padre = _actual.get()
+    s = Span(nombre, padre, atributos)
+    if padre is not None:
+        padre.hijos.append(s)
+    token = _actual.set(s)
+    t0 = time.perf_counter()
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        s.ms = round((time.perf_counter() - t0) * 1000, 2)
+        _actual.reset(token)
+        if padre is None:
+            _exportar(s)
+
+
+def trazado(nombre):
+    """Decorador: la función entera corre dentro de un span."""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envuelta(*args, **kwargs):
+            with span(nombre):
+                return funcion(*args, **kwargs)
+        return envuelta
+    return decorador
+
+
+def atributo(clave, valor):
+    """Anota el span actual, si lo hay."""
+    s = _actual.get()
+    if s is not None:
+        s.atributo(clave, valor)
+
+
+# === EXPORTACIÓN === #
+def _aplanar(raiz):
+    pendientes, spans = [raiz], []
+    while pendientes:
+        s = pendientes.pop()
+        spans.append(s)
+        pendientes.extend(reversed(s.hijos))
+    return spans
+
+
+def arbol(raiz, nivel=0) -> str:
+    """Árbol de spans en texto, indentado, para el log."""
+    attrs = " ".join(f"{k}={v}" for k, v in raiz.atributos.items())
+    linea = f"{'  ' * nivel}{raiz.nombre} {raiz.ms} ms" + (f" [{attrs}]" if attrs else "")
+    if raiz.error:
+        linea += f" ❌ {raiz.error}"
+    return "\n".join([linea] + [arbol(h, nivel + 1) for h in raiz.hijos])
+
+
+def _exportar(raiz):
+    global _escritor
+    if raiz.ms is not None and raiz.ms >= LENTO_MS:
+        logger.warning(f"🐢 Traza lenta ({raiz.ms} ms, traza {raiz.traza}):\n{arbol(raiz)}")
+    _cola.put(raiz)
+    if _escritor is None:
+        with _lock_escritor:
+            if _escritor is None:
+                _escritor = threading.Thread(target=_escribir, name="trazas", daemon=True)
+                _escritor.start()
+
+
+def _escribir():
+    while True:
+        raices = [_cola.get()]
+        while True:
+            try:
+                raices.append(_cola.get_nowait())
+            except queue.Empty:
+                break
+        lineas = "".join(
+            json.dumps(s.como_dict(), ensure_ascii=False, default=str) + "\n"
+            for raiz in raices for s in _aplanar(raiz)
+        )
+        try:
+            os.makedirs(TRAZAS_DIR, exist_ok=True)
+            if os.path.exists(SPANS_PATH) and os.path.getsize(SPANS_PATH) > MAX_BYTES:
+                os.replace(SPANS_PATH, SPANS_PATH + ".1")
+            # O_APPEND + una sola escritura: las líneas de varios workers no se mezclan
+            fd = os.open(SPANS_PATH, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, lineas.encode("utf-8"))
+            finally:
+                os.close(fd)
+        except OSError as e:
+            logger.error(f"❌ No se pudieron exportar trazas: {e}")
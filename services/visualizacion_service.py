@@ -1,53 +1,219 @@
 import os
 import json
-import matplotlib.pyplot as plt
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from io import BytesIO
 from datetime import datetime
 
+import numpy as np
+
+from services.almacen_json import leer_json
+from services.cambios_service import firma_archivo
+
+logger = logging.getLogger(__name__)
+
 # === RUTAS === #
-LOG_PATH = "data/autoaprendizaje_log.json"
+# Serie de precisión: autoaprendizaje_service.evaluar_predicciones la añade a
+# "historial_precision" en cada ciclo
+MODELO_IA_PATH = "data/modelo_ia.json"
 GRAFICO_PATH = "data/precision_evolutiva.png"
 
+# === CONFIGURACIÓN DE RENDER === #
+# Máximo de puntos que se dibujan; series más largas se reducen con LTTB
+MAX_PUNTOS = int(os.getenv("GRAFICO_MAX_PUNTOS", 500))
+
+# Un solo render a la vez: el scheduler y los hilos web comparten este módulo
+_render_lock = threading.Lock()
+_ultimo_render = {"hash": None, "ms": None, "bytes": None, "puntos": None, "omitidos": 0}
+
+# === CACHÉ EN MEMORIA DE GRÁFICOS === #
+# nombre público → ruta en disco (el disco solo se lee si la caché está vacía,
+# p. ej. justo después de reiniciar el proceso)
+GRAFICOS = {"precision_evolutiva": GRAFICO_PATH}
+_cache_graficos = {}
+
+
+def obtener_estadisticas_render():
+    """Devuelve hash, tiempo (ms) y tamaño (bytes) del último render."""
+    return dict(_ultimo_render)
+
+
+# === UTILIDADES === #
+def _hash_serie(fechas, precisiones):
+    """Hash estable de la serie de entrada (incluye el presupuesto de puntos)."""
+    h = hashlib.sha256()
+    h.update(str(MAX_PUNTOS).encode())
+    for f, p in zip(fechas, precisiones):
+        h.update(f"{f}|{p};".encode())
+    return h.hexdigest()
+
+
+def _parsear_fecha(valor):
+    return datetime.fromisoformat(str(valor).replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def lttb(x, y, n_salida):
+    """
+    Largest-Triangle-Three-Buckets: devuelve los índices de los puntos
+    a conservar para que la forma de la serie se mantenga con n_salida puntos.
+    """
+    n = len(x)
+    if n_salida >= n or n_salida < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    indices = np.empty(n_salida, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    # Los extremos se conservan; el resto se reparte en n_salida - 2 cubetas
+    limites = np.linspace(1, n - 1, n_salida - 1).astype(np.int64)
+    a = 0
+    for i in range(n_salida - 2):
+        inicio, fin = limites[i], limites[i + 1]
+        sig_inicio, sig_fin = limites[i + 1], (limites[i + 2] if i + 2 < len(limites) else n)
+        prom_x = x[sig_inicio:sig_fin].mean()
+        prom_y = y[sig_inicio:sig_fin].mean()
+
+        bx = x[inicio:fin]
+        by = y[inicio:fin]
+        areas = np.abs((x[a] - prom_x) * (by - y[a]) - (x[a] - bx) * (prom_y - y[a]))
+        a = inicio + int(np.argmax(areas))
+        indices[i + 1] = a
+    return indices
 
+
+def _renderizar_png(fechas, precisiones):
+    """Dibuja la serie con la API orientada a objetos (sin estado global de pyplot)."""
+    # matplotlib se importa al primer render: no retrasa el arranque del servidor
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import matplotlib.dates as mdates
+
+    fig = Figure(figsize=(8, 4))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    ax.plot(fechas, precisiones, marker="o" if len(fechas) <= 60 else None,
+            linestyle="-", color="dodgerblue")
+    ax.set_title("Evolución del Aprendizaje - Neurobet IA")
+    ax.set_xlabel("Fecha")
+    ax.set_ylabel("Precisión (%)")
+    ax.grid(True)
+    locator = mdates.AutoDateLocator()
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+    fig.tight_layout()
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+def _publicar_en_cache(nombre, png: bytes):
+    """Reemplaza la entrada de caché de un gráfico con bytes ya codificados."""
+    path = GRAFICOS.get(nombre)
+    _cache_graficos[nombre] = {
+        "bytes": png,
+        "etag": hashlib.sha256(png).hexdigest()[:32],
+        "actualizado": datetime.utcnow(),
+        # Si otro worker regenera el PNG en disco, la firma cambia y se relee
+        "firma": firma_archivo(path) if path else None,
+    }
+
+
+def obtener_grafico(nombre):
+    """
+    Devuelve {"bytes", "etag", "actualizado"} del gráfico, o None si no existe.
+    Los bytes son el PNG tal cual, listos para servir por HTTP o enviar a Telegram.
+    """
+    path = GRAFICOS.get(nombre)
+    firma = firma_archivo(path) if path else None
+    entrada = _cache_graficos.get(nombre)
+    if entrada is not None and (firma is None or entrada["firma"] == firma):
+        return entrada
+
+    if firma is None:
+        return None
+    with _render_lock:
+        entrada = _cache_graficos.get(nombre)
+        if entrada is None or entrada["firma"] != firma:
+            try:
+                with open(path, "rb") as f:
+                    _publicar_en_cache(nombre, f.read())
+            except FileNotFoundError:
+                # Reemplazado o borrado entre el stat y el open: se trata como ausente
+                return _cache_graficos.get(nombre)
+    return _cache_graficos[nombre]
+
+
+def _escribir_atomico(path, contenido: bytes):
+    directorio = os.path.dirname(path)
+    os.makedirs(directorio, exist_ok=True)
+    # Temporal único por escritura: dos workers renderizando a la vez no se pisan
+    fd, tmp = tempfile.mkstemp(dir=directorio, prefix=".tmp-", suffix=".png")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(contenido)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+# === FUNCIÓN PRINCIPAL === #
 def generar_grafico_precision():
     """
     Genera un gráfico de la evolución del aprendizaje de la IA
-    a partir del archivo autoaprendizaje_log.json
+    a partir de historial_precision en modelo_ia.json.
+    Si la serie no cambió desde el último render, reutiliza el PNG existente.
     """
-    if not os.path.exists(LOG_PATH):
-        print("⚠️ No existe el archivo de log de aprendizaje.")
+    if not os.path.exists(MODELO_IA_PATH):
+        logger.warning("⚠️ No existe el estado del modelo (modelo_ia.json).")
         return None
 
     try:
-        with open(LOG_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = leer_json(MODELO_IA_PATH, dict).get("historial_precision", [])
     except Exception as e:
-        print(f"❌ Error al leer el archivo de log: {e}")
+        logger.error(f"❌ Error al leer el historial de precisión: {e}")
         return None
 
     if not data:
-        print("⚠️ No hay datos en el log de aprendizaje.")
+        logger.warning("⚠️ No hay datos en el historial de precisión.")
         return None
 
     # Extraer fechas y precisiones
-    fechas = [d["fecha"] for d in data]
+    fechas_raw = [d["fecha"] for d in data]
     precisiones = [d["precision"] for d in data]
 
-    # === Crear gráfico === #
-    plt.figure(figsize=(8, 4))
-    plt.plot(fechas, precisiones, marker="o", linestyle="-", color="dodgerblue")
-    plt.title("Evolución del Aprendizaje - Neurobet IA")
-    plt.xlabel("Fecha")
-    plt.ylabel("Precisión (%)")
-    plt.grid(True)
-    plt.xticks(rotation=45, ha="right")
-    plt.tight_layout()
+    with _render_lock:
+        firma = _hash_serie(fechas_raw, precisiones)
+        if firma == _ultimo_render["hash"] and os.path.exists(GRAFICO_PATH):
+            _ultimo_render["omitidos"] += 1
+            logger.info("⏭️ Serie de precisión sin cambios, se reutiliza el gráfico.")
+            return GRAFICO_PATH
+
+        inicio = time.perf_counter()
+        try:
+            fechas = [_parsear_fecha(f) for f in fechas_raw]
+        except ValueError as e:
+            logger.error(f"❌ Fecha inválida en el historial de precisión: {e}")
+            return None
 
-    # Crear carpeta data si no existe
-    os.makedirs(os.path.dirname(GRAFICO_PATH), exist_ok=True)
+        x = np.array([f.timestamp() for f in fechas], dtype=np.float64)
+        idx = lttb(x, precisiones, MAX_PUNTOS)
+        png = _renderizar_png([fechas[i] for i in idx], [precisiones[i] for i in idx])
+        _escribir_atomico(GRAFICO_PATH, png)
+        _publicar_en_cache("precision_evolutiva", png)
+        ms = round((time.perf_counter() - inicio) * 1000, 2)
 
-    # Guardar imagen
-    plt.savefig(GRAFICO_PATH)
-    plt.close()
+        _ultimo_render.update({"hash": firma, "ms": ms, "bytes": len(png), "puntos": len(idx)})
 
-    print(f"✅ Gráfico generado correctamente: {GRAFICO_PATH}")
+    logger.info(
+        f"✅ Gráfico generado correctamente: {GRAFICO_PATH} "
+        f"({len(idx)}/{len(precisiones)} puntos, {ms} ms, {len(png)} bytes)"
+    )
     return GRAFICO_PATH
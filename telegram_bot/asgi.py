@@ -0,0 +1,172 @@
+# telegram_bot/asgi.py
+"""
+Modo de servicio ASGI nativo (uvicorn) para el webhook y el dashboard.
+
+A diferencia del modo Flask/gthread, aquí el servidor ya corre un event loop:
+el ProcesadorUpdates arranca PTB y sus procesadores en ese loop con los
+eventos lifespan de ASGI. El webhook encola en la misma cola acotada (con
+su política de sobrecarga) y responde 200 sin esperar al handler.
+
+Se expone como telegram_bot.main_bot:asgi_app.
+"""
+
+import json
+import asyncio
+import logging
+from urllib.parse import parse_qs
+
+from services.visualizacion_service import obtener_grafico
+from services.metricas_service import exponer as exponer_metricas
+from services.perfilador_service import agregado as perfiles_agregados
+from telegram_bot import perfil_arranque
+from telegram_bot.procesador_updates import RECHAZADO
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {
+    "text": b"text/plain; charset=utf-8",
+    "html": b"text/html; charset=utf-8",
+    "json": b"application/json",
+    "png": b"image/png",
+    "prometheus": b"text/plain; version=0.0.4; charset=utf-8",
+}
+
+
+async def _leer_cuerpo(receive) -> bytes:
+    cuerpo = b""
+    while True:
+        mensaje = await receive()
+        cuerpo += mensaje.get("body", b"")
+        if not mensaje.get("more_body"):
+            return cuerpo
+
+
+async def _responder(send, status, cuerpo=b"", tipo="text", headers=None):
+    if isinstance(cuerpo, str):
+        cuerpo = cuerpo.encode("utf-8")
+    cabeceras = [(b"content-type", CONTENT_TYPES[tipo]), (b"content-length", str(len(cuerpo)).encode())]
+    for k, v in (headers or {}).items():
+        cabeceras.append((k.lower().encode(), v.encode()))
+    await send({"type": "http.response.start", "status": status, "headers": cabeceras})
+    await send({"type": "http.response.body", "body": cuerpo})
+    perfil_arranque.registrar_respuesta(status)
+
+
+class AppASGI:
+    """
+    App ASGI mínima (sin framework) con las mismas rutas que la app Flask.
+    procesador: ProcesadorUpdates (cola del webhook; dueño de la Application).
+    html_dashboard: función síncrona que devuelve el HTML del dashboard.
+    estado_webhook: función síncrona con el dict de /webhook/estado.
+    al_arrancar / al_detener: callables síncronos extra para el lifespan.
+    deduplicador: DeduplicadorUpdates para descartar reintentos de Telegram.
+    """
+
+    def __init__(self, procesador, html_dashboard, cache_control_graficos, al_arrancar=(), al_detener=(),
+                 deduplicador=None, estado_webhook=None):
+        self.procesador = procesador
+        self.estado_webhook = estado_webhook
+        self.deduplicador = deduplicador
+        self.html_dashboard = html_dashboard
+        self.cache_control_graficos = cache_control_graficos
+        self.al_arrancar = list(al_arrancar)
+        self.al_detener = list(al_detener)
+        # Loop del servidor (dueño de la Application); otros hilos le envían corrutinas
+        self.loop = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    # === CICLO DE VIDA (PTB) === #
+    async def _lifespan(self, receive, send):
+        while True:
+            mensaje = await receive()
+            if mensaje["type"] == "lifespan.startup":
+                try:
+                    self.loop = asyncio.get_running_loop()
+                    await self.procesador.iniciar_en_loop()
+                    for fn in self.al_arrancar:
+                        fn()
+                    logger.info("🚀 PTB iniciado en modo ASGI.")
+                    await send({"type": "lifespan.startup.complete"})
+                    perfil_arranque.marcar("lifespan_listo")
+                except Exception as e:
+                    logger.error(f"❌ Error al iniciar PTB en modo ASGI: {e}")
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+            elif mensaje["type"] == "lifespan.shutdown":
+                for fn in self.al_detener:
+                    fn()
+                await self.procesador.detener_en_loop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # === RUTAS === #
+    async def _http(self, scope, receive, send):
+        metodo, ruta = scope["method"], scope["path"]
+
+        if ruta == "/" and metodo == "GET":
+            return await _responder(send, 200, "🤖 Neurobet IA v8.0 webhook OK")
+
+        if ruta == "/webhook" and metodo == "POST":
+            return await self._webhook(receive, send)
+
+        if ruta == "/webhook/estado" and metodo == "GET" and self.estado_webhook:
+            estado = await asyncio.to_thread(self.estado_webhook)
+            return await _responder(send, 200, json.dumps(estado), "json")
+
+        if ruta == "/dashboard" and metodo == "GET":
+            html = await asyncio.to_thread(self.html_dashboard)
+            return await _responder(send, 200, html, "html")
+
+        if ruta == "/metrics" and metodo == "GET":
+            texto = await asyncio.to_thread(exponer_metricas)
+            return await _responder(send, 200, texto, "prometheus")
+
+        if ruta == "/profiles/collapsed" and metodo == "GET":
+            filtro = (parse_qs(scope.get("query_string", b"").decode()).get("filtro") or [None])[0]
+            texto = await asyncio.to_thread(perfiles_agregados, filtro)
+            return await _responder(send, 200, texto)
+
+        if ruta.startswith("/charts/") and ruta.endswith(".png") and metodo == "GET":
+            return await self._grafico(scope, send, ruta[len("/charts/"):-len(".png")])
+
+        return await _responder(send, 404, "Not found")
+
+    async def _webhook(self, receive, send):
+        update_id = None
+        try:
+            update_data = json.loads(await _leer_cuerpo(receive))
+            update_id = update_data.get("update_id")
+            if self.deduplicador and self.deduplicador.es_duplicado(update_id):
+                return await _responder(send, 200, "DUP")
+            if self.procesador.encolar(update_data) == RECHAZADO:
+                if self.deduplicador:
+                    self.deduplicador.olvidar(update_id)
+                logger.warning("⚠️ Cola de updates llena, se responde 429.")
+                return await _responder(send, 429, "BUSY")
+            return await _responder(send, 200, "OK")
+        except Exception as e:
+            # Telegram reintentará tras el 500: el reintento no debe tomarse por duplicado
+            if self.deduplicador:
+                self.deduplicador.olvidar(update_id)
+            logger.error(f"❌ Error procesando webhook (ASGI): {e}")
+            return await _responder(send, 500, "ERROR")
+
+    async def _grafico(self, scope, send, nombre):
+        grafico = obtener_grafico(nombre)
+        if grafico is None:
+            return await _responder(send, 404, "Not found")
+        etag = f'"{grafico["etag"]}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": self.cache_control_graficos,
+            "Last-Modified": grafico["actualizado"].strftime("%a, %d %b %Y %H:%M:%S GMT"),
+        }
+        if_none_match = dict(scope["headers"]).get(b"if-none-match", b"").decode()
+        etiquetas = [e.strip().removeprefix("W/") for e in if_none_match.split(",")]
+        if etag in etiquetas or "*" in etiquetas:
+            return await _responder(send, 304, b"", "png", headers)
+        return await _responder(send, 200, grafico["bytes"], "png", headers)
@@ -0,0 +1,120 @@
+# telegram_bot/deduplicador.py
+"""
+Deduplicación de updates de Telegram por update_id.
+
+Si el webhook tarda, Telegram reintenta la entrega y el mismo update llega
+dos veces. Los update_id vistos se guardan en una tabla de tamaño fijo
+mapeada en memoria (data/updates_vistos.bin):
+
+    slot = update_id % SLOTS  →  (update_id, instante en que se vio)
+
+Los update_id de un bot son crecientes, así que un slot solo se reutiliza
+tras SLOTS updates nuevos: la tabla es un conjunto acotado de los últimos
+SLOTS ids, y además se ignoran las entradas más viejas que VENTANA segundos.
+La consulta es O(1); el archivo persiste entre reinicios y, al estar
+mapeado con MAP_SHARED, lo comparten todos los workers.
+"""
+
+import os
+import time
+import mmap
+import fcntl
+import struct
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEDUP_PATH = os.path.join("data", "updates_vistos.bin")
+SLOTS = int(os.getenv("DEDUP_SLOTS", 65536))
+VENTANA = float(os.getenv("DEDUP_VENTANA_SEGUNDOS", 24 * 3600))
+
+# Cabecera: número de slots y duplicados descartados (compartido entre workers)
+_CABECERA = struct.Struct("<qq")
+_ENTRADA = struct.Struct("<qd")  # update_id, timestamp
+
+
+class DeduplicadorUpdates:
+    def __init__(self, ruta=DEDUP_PATH, slots=SLOTS, ventana=VENTANA):
+        self.ruta = ruta
+        self.slots = slots
+        self.ventana = ventana
+        self.duplicados_proceso = 0
+        self._lock = threading.Lock()
+        self._mm = None
+        self._fd = None
+
+    def _abrir(self):
+        if self._mm is not None:
+            return
+        os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+        tamano = _CABECERA.size + self.slots * _ENTRADA.size
+        fd = os.open(self.ruta, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            actual = os.fstat(fd).st_size
+            if actual != tamano:
+                # Nuevo, o creado con otro número de slots: se empieza de cero
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, tamano)
+                os.pwrite(fd, _CABECERA.pack(self.slots, 0), 0)
+                if actual:
+                    logger.warning(f"⚠️ Tabla de updates vistos reiniciada ({actual} → {tamano} bytes).")
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._mm = mmap.mmap(fd, tamano, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        self._fd = fd
+
+    def es_duplicado(self, update_id) -> bool:
+        """
+        True si el update_id ya se vio dentro de la ventana; si no, lo registra.
+        Si después no se puede encolar/procesar (429/500), hay que olvidarlo
+        para que el reintento de Telegram no se tome por duplicado.
+        """
+        if update_id is None:
+            return False
+        update_id = int(update_id)
+        with self._lock:
+            self._abrir()
+            posicion = _CABECERA.size + (update_id % self.slots) * _ENTRADA.size
+            ahora = time.time()
+            # flock: la comprobación y el registro son atómicos entre workers
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                visto, instante = _ENTRADA.unpack_from(self._mm, posicion)
+                if visto == update_id and ahora - instante <= self.ventana:
+                    slots, duplicados = _CABECERA.unpack_from(self._mm, 0)
+                    _CABECERA.pack_into(self._mm, 0, slots, duplicados + 1)
+                    self.duplicados_proceso += 1
+                    return True
+                _ENTRADA.pack_into(self._mm, posicion, update_id, ahora)
+                return False
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def olvidar(self, update_id):
+        """Borra un update_id registrado que no llegó a procesarse."""
+        if update_id is None:
+            return
+        update_id = int(update_id)
+        with self._lock:
+            self._abrir()
+            posicion = _CABECERA.size + (update_id % self.slots) * _ENTRADA.size
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                visto, _ = _ENTRADA.unpack_from(self._mm, posicion)
+                if visto == update_id:
+                    _ENTRADA.pack_into(self._mm, posicion, 0, 0.0)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            self._abrir()
+            _, duplicados = _CABECERA.unpack_from(self._mm, 0)
+        return {
+            "duplicados": duplicados,
+            "duplicados_proceso": self.duplicados_proceso,
+            "slots": self.slots,
+            "ventana_s": self.ventana,
+        }
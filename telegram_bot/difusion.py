@@ -0,0 +1,258 @@
+# telegram_bot/difusion.py
+"""
+Difusión (push) de los picks del día a los suscriptores.
+
+Un pool de corrutinas envía los mensajes respetando los límites de Telegram:
+  - global: una cubeta de tokens a DIFUSION_TASA_GLOBAL mensajes/s
+  - por chat: al menos DIFUSION_INTERVALO_CHAT segundos entre mensajes al mismo chat
+Un RetryAfter pausa la cubeta global el tiempo indicado y el mensaje se
+reintenta; los errores de red se reintentan con backoff exponencial; los
+chats que bloquearon al bot se dan de baja.
+
+Cada difusión tiene un checkpoint en data/difusiones/<id>.json con los chats
+ya enviados: si el proceso se reinicia a mitad, se reanuda saltándolos. Ante
+una caída abrupta solo pueden repetirse los envíos de los últimos
+CHECKPOINT_CADA segundos.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from datetime import date, datetime
+from pathlib import Path
+
+from telegram.error import RetryAfter, Forbidden, BadRequest, TimedOut, NetworkError
+
+from services.almacen_json import leer_json, escribir_json
+from services.suscriptores_service import obtener_suscriptores, desuscribir_varios
+from services.picks_service import obtener_mensaje, asegurar_picks_de_hoy
+
+logger = logging.getLogger(__name__)
+
+# === CONFIGURACIÓN === #
+DIFUSIONES_DIR = Path("data") / "difusiones"
+TASA_GLOBAL = float(os.getenv("DIFUSION_TASA_GLOBAL", 25))       # Telegram admite ~30/s
+INTERVALO_CHAT = float(os.getenv("DIFUSION_INTERVALO_CHAT", 1.0))
+N_ENVIADORES = int(os.getenv("DIFUSION_ENVIADORES", 16))
+MAX_INTENTOS = int(os.getenv("DIFUSION_MAX_INTENTOS", 5))
+BACKOFF_BASE = 0.5
+CHECKPOINT_CADA = 2.0  # segundos entre checkpoints
+HORA_DIFUSION = int(os.getenv("DIFUSION_HORA_UTC", 14))
+
+# Mensaje que recibe cada nivel
+MENSAJE_POR_NIVEL = {"free": "free", "premium": "todos"}
+
+# Difusiones de este proceso (id → estado en memoria), para consultar el progreso
+_activas = {}
+# Difusiones a las que se pidió parar (los envíos en vuelo terminan y se guarda el checkpoint)
+_paradas = set()
+
+
+class CubetaTokens:
+    """
+    Limitador global: `tasa` tokens/s con ráfaga de `capacidad`. Pausable (RetryAfter).
+    Con capacidad 1 nunca se superan tasa + 1 envíos en una ventana de un segundo.
+    """
+
+    def __init__(self, tasa, capacidad=1.0):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self.tokens = self.capacidad
+        self.ultimo = time.monotonic()
+        self.pausa_hasta = 0.0
+
+    def pausar(self, segundos):
+        self.pausa_hasta = max(self.pausa_hasta, time.monotonic() + segundos)
+        self.tokens = 0.0
+
+    async def tomar(self):
+        while True:
+            ahora = time.monotonic()
+            if ahora < self.pausa_hasta:
+                await asyncio.sleep(self.pausa_hasta - ahora)
+                continue
+            self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa)
+            self.ultimo = ahora
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.tasa)
+
+
+def _segundos(retry_after):
+    """RetryAfter.retry_after puede ser int o timedelta según la versión de PTB."""
+    return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+
+
+# === CHECKPOINT === #
+def _ruta_checkpoint(difusion_id):
+    return DIFUSIONES_DIR / f"{difusion_id}.json"
+
+
+def leer_checkpoint(difusion_id):
+    return leer_json(_ruta_checkpoint(difusion_id))
+
+
+async def _guardar_checkpoint(estado):
+    # La instantánea se toma en el loop; solo la escritura va a otro hilo
+    datos = dict(estado, enviados=sorted(estado["enviados"]), fallidos=dict(estado["fallidos"]))
+    await asyncio.to_thread(escribir_json, _ruta_checkpoint(estado["id"]), datos, None)
+
+
+def progreso(estado) -> dict:
+    """Resumen de progreso, throughput y fallos de una difusión."""
+    transcurrido = (estado.get("fin_ts") or time.time()) - estado["inicio_ts"]
+    enviados_sesion = len(estado["enviados"]) - estado["enviados_al_reanudar"]
+    return {
+        "id": estado["id"],
+        "estado": estado["estado"],
+        "total": estado["total"],
+        "enviados": len(estado["enviados"]),
+        "fallidos": len(estado["fallidos"]),
+        "pendientes": estado["total"] - len(estado["enviados"]) - len(estado["fallidos"]),
+        "reintentos": estado["reintentos"],
+        "retry_after": estado["retry_after"],
+        "segundos": round(transcurrido, 2),
+        "mensajes_por_segundo": round(enviados_sesion / transcurrido, 2) if transcurrido > 0 else None,
+    }
+
+
+def detener_difusion(difusion_id):
+    """Parada ordenada: no se toman más chats; se reanuda con otra llamada a difundir()."""
+    if difusion_id in _activas:
+        _paradas.add(difusion_id)
+
+
+def obtener_progreso(difusion_id=None):
+    """Progreso de una difusión en curso en este proceso (o de la última), o su checkpoint."""
+    if difusion_id is None and _activas:
+        difusion_id = list(_activas)[-1]
+    if difusion_id in _activas:
+        return progreso(_activas[difusion_id])
+    return leer_checkpoint(difusion_id) if difusion_id else None
+
+
+# === MOTOR === #
+async def difundir(bot, difusion_id, destinatarios, tasa_global=TASA_GLOBAL,
+                   intervalo_chat=INTERVALO_CHAT, n_enviadores=N_ENVIADORES):
+    """
+    Envía destinatarios {chat_id: texto} y devuelve el progreso final.
+    Si existe un checkpoint de difusion_id, se saltan los chats ya enviados
+    o fallidos; si ya estaba completada no se envía nada.
+    """
+    previo = leer_checkpoint(difusion_id) or {}
+    if previo.get("estado") == "completada":
+        logger.info(f"📭 Difusión {difusion_id} ya completada, no se reenvía.")
+        return previo
+
+    ya_enviados = set(previo.get("enviados", []))
+    fallidos = dict(previo.get("fallidos", {}))
+    estado = {
+        "id": difusion_id,
+        "estado": "en_curso",
+        "creada": previo.get("creada") or datetime.utcnow().isoformat(),
+        # Los chats ya resueltos cuentan aunque hoy ya no estén en la lista (p. ej. bajas)
+        "total": len(set(destinatarios) | ya_enviados | {int(c) for c in fallidos}),
+        "enviados": ya_enviados,
+        "enviados_al_reanudar": len(ya_enviados),
+        "fallidos": fallidos,
+        "reintentos": previo.get("reintentos", 0),
+        "retry_after": previo.get("retry_after", 0),
+        "inicio_ts": time.time(),
+        "fin_ts": None,
+    }
+    _activas[difusion_id] = estado
+    if ya_enviados or fallidos:
+        logger.info(f"⏯️ Reanudando difusión {difusion_id}: {len(ya_enviados)} ya enviados.")
+
+    cola = asyncio.Queue()
+    for chat_id, texto in destinatarios.items():
+        if chat_id not in ya_enviados and str(chat_id) not in fallidos:
+            cola.put_nowait((chat_id, texto))
+
+    cubeta = CubetaTokens(tasa_global)
+    ultimo_por_chat = {}
+    bloqueados = []
+
+    async def enviar(chat_id, texto):
+        for intento in range(MAX_INTENTOS):
+            espera = ultimo_por_chat.get(chat_id, 0) + intervalo_chat - time.monotonic()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            await cubeta.tomar()
+            ultimo_por_chat[chat_id] = time.monotonic()
+            try:
+                await bot.send_message(chat_id=chat_id, text=texto, parse_mode="Markdown")
+                return None
+            except RetryAfter as e:
+                estado["retry_after"] += 1
+                cubeta.pausar(_segundos(e.retry_after))
+            except Forbidden as e:
+                bloqueados.append(chat_id)
+                return f"forbidden: {e.message}"
+            except BadRequest as e:
+                return f"bad_request: {e.message}"
+            except (TimedOut, NetworkError):
+                await asyncio.sleep(BACKOFF_BASE * 2 ** intento)
+            estado["reintentos"] += 1
+        return "max_intentos"
+
+    async def enviador():
+        while difusion_id not in _paradas:
+            try:
+                chat_id, texto = cola.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            error = await enviar(chat_id, texto)
+            if error is None:
+                estado["enviados"].add(chat_id)
+            else:
+                estado["fallidos"][str(chat_id)] = error
+
+    async def checkpoints():
+        while True:
+            await asyncio.sleep(CHECKPOINT_CADA)
+            await _guardar_checkpoint(estado)
+            p = progreso(estado)
+            logger.info(
+                f"📤 Difusión {difusion_id}: {p['enviados']}/{p['total']} enviados, "
+                f"{p['fallidos']} fallidos, {p['mensajes_por_segundo']} msg/s"
+            )
+
+    await _guardar_checkpoint(estado)
+    tarea_checkpoint = asyncio.create_task(checkpoints())
+    try:
+        await asyncio.gather(*(enviador() for _ in range(n_enviadores)))
+        estado["estado"] = "pausada" if difusion_id in _paradas else "completada"
+    finally:
+        _paradas.discard(difusion_id)
+        tarea_checkpoint.cancel()
+        estado["fin_ts"] = time.time()
+        if bloqueados:
+            await asyncio.to_thread(desuscribir_varios, bloqueados, "bloqueo")
+        await _guardar_checkpoint(estado)
+
+    final = progreso(estado)
+    logger.info(f"✅ Difusión {difusion_id} terminada: {final}")
+    return final
+
+
+async def difundir_picks(bot, fecha=None):
+    """Difunde los picks del día: 'free' a los free, el listado completo a los premium."""
+    fecha = fecha or date.today().isoformat()
+    # Se difunden los de hoy: si aún no están, se generan fuera del loop
+    await asyncio.to_thread(asegurar_picks_de_hoy)
+    mensajes = {nivel: obtener_mensaje(tipo) for nivel, tipo in MENSAJE_POR_NIVEL.items()}
+    destinatarios = {chat_id: mensajes[nivel] for chat_id, nivel in obtener_suscriptores().items()}
+    return await difundir(bot, f"picks-{fecha}", destinatarios)
+
+
+# === PROGRAMACIÓN DIARIA === #
+def debe_difundir_hoy(ahora=None) -> bool:
+    """Tras HORA_DIFUSION (UTC), si la difusión de hoy no está completada (o quedó a medias)."""
+    ahora = ahora or datetime.utcnow()
+    if ahora.hour < HORA_DIFUSION:
+        return False
+    previo = leer_checkpoint(f"picks-{ahora.date().isoformat()}")
+    return not previo or previo.get("estado") != "completada"
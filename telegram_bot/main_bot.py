@@ -1,13 +1,20 @@
 # telegram_bot/main_bot.py
 
 import os
-import json
+import time
+import asyncio
 import logging
+import functools
 import threading
-from datetime import datetime, date
+from datetime import datetime
 from pathlib import Path
 
-from flask import Flask, request
+# Primero: mide cuánto tarda cada import propio (perfil de cold start)
+from telegram_bot import perfil_arranque
+
+perfil_arranque.medir_imports()
+
+from flask import Flask, Response, request
 from telegram import Update
 from telegram.ext import (
     Application,
@@ -18,14 +25,34 @@ from telegram.ext import (
 )
 
 # ====== IMPORTS DE SERVICIOS EXISTENTES ====== #
-from services.ia_service import predecir_partido
+from services.ia_service import predecir_partido, cargar_modelo
 from services.autoaprendizaje_service import (
     inicializar_modelo,
 )
 from services.evaluacion_service import (
     iniciar_autoevaluacion_automatica,
+    transaccion_historial,
 )
-from services.scheduler_service import iniciar_hilo_autoaprendizaje
+from services.scheduler_service import (
+    iniciar_hilo_autoaprendizaje,
+    obtener_estadisticas_ciclo,
+)
+from services.almacen_json import leer_json, ejecutar_como_lider
+from services import metricas_service as metricas
+from services import perfilador_service as perfilador
+from services import trazas_service as trazas
+from services.picks_service import obtener_mensaje, hay_picks_hoy, iniciar_hilo_picks, asegurar_picks_de_hoy
+from services.suscriptores_service import suscribir, desuscribir, contar_suscriptores, NIVELES
+from services.visualizacion_service import obtener_grafico
+from services.aprendizaje_incremental_service import obtener_metricas_incrementales
+from services.feature_store_service import precargar as precargar_feature_store
+from services.elo_service import asegurar_ratings
+from telegram_bot.procesador_updates import ProcesadorUpdates, RECHAZADO
+from telegram_bot.asgi import AppASGI
+from telegram_bot.deduplicador import DeduplicadorUpdates
+from telegram_bot.difusion import difundir_picks, debe_difundir_hoy, obtener_progreso, detener_difusion
+
+perfil_arranque.marcar("imports_listos")
 
 # ====== LOGGING ====== #
 logging.basicConfig(
@@ -40,106 +67,38 @@ TELEGRAM_TOKEN = os.getenv(
     "8238035123:AAHaX2iFZjNWFMLwm8QUmjYc09qA_y9IDa8"  # ← tu token
 )
 PORT = int(os.environ.get("PORT", 10000))
+# Permite apuntar a un Bot API local (pruebas de carga / servidor propio)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
 WEBHOOK_URL = os.getenv(
     "WEBHOOK_URL",
     "https://bot-neurobet-ia-render.onrender.com/webhook"
 )
+# IDs de usuario de Telegram que pueden cambiar niveles (/nivel), separados por comas
+ADMIN_IDS = {int(x) for x in os.getenv("ADMIN_IDS", "").split(",") if x.strip()}
 
 DATA_DIR = Path("data")
 DATA_DIR.mkdir(exist_ok=True)
 PRED_HIST_PATH = DATA_DIR / "historial_predicciones.json"
-PICKS_PATH = DATA_DIR / "picks_diarios.json"
+
+# Los gráficos cambian como mucho una vez por ciclo de autoaprendizaje:
+# el cliente puede reutilizarlos un minuto y luego revalida con ETag.
+CHART_CACHE_CONTROL = "public, max-age=60, must-revalidate"
 
 # ====== FLASK APP ====== #
 app = Flask(__name__)
 
-# ====== TELEGRAM APP (sin loops raros) ====== #
-application = Application.builder().token(TELEGRAM_TOKEN).build()
-
-# =========================================================
-#  UTILIDADES TIPSTER
-# =========================================================
-
-def _cargar_picks():
-    if PICKS_PATH.exists():
-        try:
-            with open(PICKS_PATH, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    return {}
-
-
-def _guardar_picks(data: dict):
-    PICKS_PATH.parent.mkdir(exist_ok=True, parents=True)
-    with open(PICKS_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-
-def _generar_picks_del_dia():
-    """Genera una lista dummy de picks del día (free + premium)."""
-    hoy = date.today().isoformat()
-    return {
-        "fecha": hoy,
-        "picks": [
-            {
-                "tipo": "free",
-                "partido": "América vs Chivas",
-                "mercado": "Handicap -1 América",
-                "odd": 1.65,
-                "confianza": 82,
-                "analisis": (
-                    "América llega con racha goleadora y Chivas flojo de visita. "
-                    "En los últimos 5 enfrentamientos América ha dominado."
-                ),
-            },
-            {
-                "tipo": "premium",
-                "partido": "Dodgers vs Yankees",
-                "mercado": "Gana Yankees",
-                "odd": 1.70,
-                "confianza": 78,
-                "analisis": (
-                    "Yankees con mejor bullpen para hoy y Dodgers rotación secundaria. "
-                    "Valor aceptable por arriba de 1.65."
-                ),
-            },
-            {
-                "tipo": "premium",
-                "partido": "Barcelona vs Sevilla",
-                "mercado": "Más de 2.5 goles",
-                "odd": 1.68,
-                "confianza": 75,
-                "analisis": (
-                    "Ambos con promedio alto de tiros y Barcelona concede ocasiones. "
-                    "Buen pick para combinadas."
-                ),
-            },
-        ],
-    }
-
-
-def _asegurar_picks_de_hoy():
-    """Se asegura de que exista entrada para el día de hoy en el JSON."""
-    hoy = date.today().isoformat()
-    data = _cargar_picks()
-    if data.get("fecha") != hoy:
-        data = _generar_picks_del_dia()
-        _guardar_picks(data)
-        logger.info("🧠 Picks del día generados automáticamente.")
-    return data
-
-
-def _hilo_picks_daemon():
-    """Hilo muy ligero que cada hora se asegura de que existan picks del día."""
-    while True:
-        try:
-            _asegurar_picks_de_hoy()
-        except Exception as e:
-            logger.error(f"❌ Error auto-picks: {e}")
-        # 3600 segundos = 1 hora
-        import time
-        time.sleep(3600)
+# ====== TELEGRAM APP ====== #
+application = (
+    Application.builder()
+    .token(TELEGRAM_TOKEN)
+    .base_url(f"{TELEGRAM_API_URL}/bot")
+    .base_file_url(f"{TELEGRAM_API_URL}/file/bot")
+    .build()
+)
+# Hilo con loop asyncio propio que es dueño de la Application y consume la cola del webhook
+procesador = ProcesadorUpdates(application)
+# update_id ya vistos: Telegram reintenta si el webhook tarda (compartido entre workers)
+deduplicador = DeduplicadorUpdates()
 
 # =========================================================
 #  HANDLERS TELEGRAM
@@ -156,6 +115,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"/picks_free - Picks gratis\n"
         f"/picks_premium - Picks premium\n"
         f"/dashboard - Ver panel web\n"
+        f"/suscribir - Recibir los picks cada día\n"
+        f"/baja - Dejar de recibirlos\n"
         f"/debug - Estado del bot\n"
     )
     # Respondemos directo (esto sí está dentro del loop de telegram)
@@ -165,13 +126,24 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def debug_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Muestra un pequeño estado del bot."""
-    hoy = date.today().isoformat()
-    picks = _cargar_picks()
-    tiene_picks = picks.get("fecha") == hoy
+    tiene_picks = hay_picks_hoy()
+    ciclos = obtener_estadisticas_ciclo()
+    inc = obtener_metricas_incrementales()
+    cola = procesador.estadisticas()
+    subs = contar_suscriptores()
+    dif = obtener_progreso(f"picks-{datetime.utcnow().date().isoformat()}")
+    dedup = deduplicador.estadisticas()
     texto = (
         "🛠 *Debug Neurobet IA*\n"
         f"📡 Webhook OK\n"
         f"📅 Picks hoy: {'sí' if tiene_picks else 'no'}\n"
+        f"🧠 Ciclos IA: {ciclos['ejecutados']} ejecutados / {ciclos['omitidos']} omitidos\n"
+        f"🧬 Incremental: {inc['n_vistos']} vistos | precisión {inc['precision_prequencial']}% "
+        f"| deriva {inc['deriva_precision']} | último lote {inc['ms_ultimo_lote']} ms\n"
+        f"📥 Cola: {cola['profundidad']}/{cola['max_cola']} | p95 {cola['latencia_p95_ms']} ms "
+        f"| descartados {cola['descartados']} | 429 {cola['rechazados']} | duplicados {dedup['duplicados']}\n"
+        f"📣 Suscriptores: {subs['free']} free / {subs['premium']} premium | difusión hoy: "
+        f"{(dif or {}).get('estado', 'pendiente')}\n"
         f"🕒 Fecha servidor: {datetime.utcnow().isoformat()}Z\n"
     )
     await update.message.reply_text(texto, parse_mode="Markdown")
@@ -186,8 +158,11 @@ async def predecir(update: Update, context: ContextTypes.DEFAULT_TYPE):
     equipo_local, equipo_visitante = texto.split("vs")
     equipo_local = equipo_local.strip()
     equipo_visitante = equipo_visitante.strip()
+    trazas.atributo("local", equipo_local)
+    trazas.atributo("visitante", equipo_visitante)
 
-    pred = predecir_partido(equipo_local, equipo_visitante)
+    # La predicción hace I/O bloqueante (API, disco): se ejecuta fuera del loop
+    pred = await asyncio.to_thread(predecir_partido, equipo_local, equipo_visitante)
 
     msg = (
         f"🔮 *Predicción IA:*\n"
@@ -195,75 +170,74 @@ async def predecir(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"🎯 Precisión estimada: {pred['probabilidad']}%\n"
         f"🤖 Modo: {pred['modo']}"
     )
+    mercados = pred.get("mercados")
+    if mercados:
+        msg += (
+            f"\n📊 Más de 2.5 goles: {mercados['mas_2_5']}% | Ambos anotan: {mercados['ambos_anotan']}%"
+            f"\n🔢 Marcador más probable: {mercados['marcador']}"
+        )
     await update.message.reply_text(msg, parse_mode="Markdown")
     # Guardamos al historial de predicciones (simple)
-    _guardar_prediccion_historial(
+    await asyncio.to_thread(
+        _guardar_prediccion_historial,
         partido=f"{equipo_local} vs {equipo_visitante}",
         pred=pred["resultado"],
     )
 
 
+@trazas.trazado("historial.guardar_prediccion")
 def _guardar_prediccion_historial(partido: str, pred: str):
-    PRED_HIST_PATH.parent.mkdir(exist_ok=True, parents=True)
-    if PRED_HIST_PATH.exists():
-        with open(PRED_HIST_PATH, "r", encoding="utf-8") as f:
-            historial = json.load(f)
-    else:
-        historial = []
-    historial.append(
-        {
-            "partido": partido,
-            "prediccion": pred,
-            "fecha": datetime.utcnow().isoformat() + "Z",
-            "acierto": None,
-            "resultado_real": None,
-        }
-    )
-    with open(PRED_HIST_PATH, "w", encoding="utf-8") as f:
-        json.dump(historial, f, ensure_ascii=False, indent=2)
+    with transaccion_historial() as historial:
+        historial.append(
+            {
+                "partido": partido,
+                "prediccion": pred,
+                "fecha": datetime.utcnow().isoformat() + "Z",
+                "acierto": None,
+                "resultado_real": None,
+            }
+        )
 
 
 async def picks(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    data = _asegurar_picks_de_hoy()
-    texto = "🎯 *Picks del día*\n\n"
-    for p in data["picks"]:
-        texto += (
-            f"• [{p['tipo'].upper()}] {p['partido']} → {p['mercado']} "
-            f"(odd {p['odd']})\n"
-            f"  Confianza: {p['confianza']}%\n"
-            f"  {p['analisis']}\n\n"
-        )
-    await update.message.reply_text(texto, parse_mode="Markdown")
+    await update.message.reply_text(obtener_mensaje("todos"), parse_mode="Markdown")
 
 
 async def picks_free(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    data = _asegurar_picks_de_hoy()
-    free = [p for p in data["picks"] if p["tipo"] == "free"]
-    if not free:
-        await update.message.reply_text("📭 Hoy no hay picks free.")
-        return
-    texto = "🆓 *Picks FREE de hoy*\n\n"
-    for p in free:
-        texto += (
-            f"• {p['partido']} → {p['mercado']} (odd {p['odd']})\n"
-            f"{p['analisis']}\n\n"
-        )
-    await update.message.reply_text(texto, parse_mode="Markdown")
+    await update.message.reply_text(obtener_mensaje("free"), parse_mode="Markdown")
 
 
 async def picks_premium(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    data = _asegurar_picks_de_hoy()
-    premium = [p for p in data["picks"] if p["tipo"] == "premium"]
-    if not premium:
-        await update.message.reply_text("📭 Hoy no hay picks premium.")
+    await update.message.reply_text(obtener_mensaje("premium"), parse_mode="Markdown")
+
+
+async def suscribir_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Alta en la difusión diaria de picks (free si es nuevo; conserva el nivel si ya lo tenía)."""
+    registro = await asyncio.to_thread(suscribir, update.effective_chat.id)
+    await update.message.reply_text(
+        f"📬 Listo: recibirás los picks del día en este chat (nivel {registro['nivel']}). /baja para dejarlo."
+    )
+
+
+async def nivel_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Solo administradores: /nivel <chat_id> [free|premium] (por defecto premium)."""
+    if update.effective_user.id not in ADMIN_IDS:
+        await update.message.reply_text("⛔ Comando solo para administradores.")
         return
-    texto = "💎 *Picks PREMIUM de hoy*\n\n"
-    for p in premium:
-        texto += (
-            f"• {p['partido']} → {p['mercado']} (odd {p['odd']})\n"
-            f"{p['analisis']}\n\n"
-        )
-    await update.message.reply_text(texto, parse_mode="Markdown")
+    args = context.args or []
+    nivel = args[1].lower() if len(args) > 1 else "premium"
+    if not args or not args[0].lstrip("-").isdigit() or nivel not in NIVELES:
+        await update.message.reply_text("⚠️ Uso: /nivel <chat_id> [free|premium]")
+        return
+    registro = await asyncio.to_thread(suscribir, int(args[0]), nivel)
+    await update.message.reply_text(f"✅ Chat {args[0]} ahora es {registro['nivel']}.")
+
+
+async def baja_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if await asyncio.to_thread(desuscribir, update.effective_chat.id):
+        await update.message.reply_text("👋 Ya no recibirás los picks diarios.")
+    else:
+        await update.message.reply_text("ℹ️ Este chat no estaba suscrito.")
 
 
 async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -275,62 +249,212 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+async def dashboard_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Envía el resumen del historial y el gráfico de precisión cacheado."""
+    r = _resumen_historial()
+    texto = (
+        "📊 *Neurobet IA - Dashboard*\n"
+        f"Total predicciones: {r['total']}\n"
+        f"Evaluadas: {r['evaluados']} | Aciertos: {r['aciertos']} | Precisión: {r['precision']}%"
+    )
+    grafico = obtener_grafico("precision_evolutiva")
+    if grafico:
+        # Se envían los bytes PNG tal cual están en caché, sin volver a codificar
+        await update.message.reply_photo(photo=grafico["bytes"], caption=texto, parse_mode="Markdown")
+    else:
+        await update.message.reply_text(texto, parse_mode="Markdown")
+
+
 # ====== REGISTRO DE HANDLERS ====== #
-application.add_handler(CommandHandler("start", start))
-application.add_handler(CommandHandler("debug", debug_cmd))
-application.add_handler(CommandHandler("predecir", predecir))
-application.add_handler(CommandHandler("picks", picks))
-application.add_handler(CommandHandler("picks_free", picks_free))
-application.add_handler(CommandHandler("picks_premium", picks_premium))
-application.add_handler(MessageHandler(filters.VOICE, handle_voice))
+def _medido(comando, handler):
+    """
+    Envuelve un handler: histograma de latencia, contador de excepciones y
+    span raíz de la traza por comando; con el perfilador activo, además puede
+    perfilar el update.
+    """
+    if perfilador.ACTIVO:
+        handler = perfilador.envolver_handler(comando, handler)
+
+    @functools.wraps(handler)
+    async def envuelto(update, context):
+        chat_id = update.effective_chat.id if update.effective_chat else None
+        with metricas.HANDLER_SEGUNDOS.tiempo(comando=comando), \
+                trazas.span(f"telegram.{comando}", chat=chat_id, update_id=update.update_id):
+            try:
+                return await handler(update, context)
+            except Exception:
+                metricas.HANDLER_ERRORES.inc(comando=comando)
+                raise
+    return envuelto
+
+
+application.add_handler(CommandHandler("start", _medido("start", start)))
+application.add_handler(CommandHandler("debug", _medido("debug", debug_cmd)))
+application.add_handler(CommandHandler("predecir", _medido("predecir", predecir)))
+application.add_handler(CommandHandler("picks", _medido("picks", picks)))
+application.add_handler(CommandHandler("picks_free", _medido("picks_free", picks_free)))
+application.add_handler(CommandHandler("picks_premium", _medido("picks_premium", picks_premium)))
+application.add_handler(CommandHandler("dashboard", _medido("dashboard", dashboard_cmd)))
+application.add_handler(CommandHandler("suscribir", _medido("suscribir", suscribir_cmd)))
+application.add_handler(CommandHandler("baja", _medido("baja", baja_cmd)))
+application.add_handler(CommandHandler("nivel", _medido("nivel", nivel_cmd)))
+application.add_handler(MessageHandler(filters.VOICE, _medido("voz", handle_voice)))
 
 # =========================================================
 #  FLASK ROUTES
 # =========================================================
 
+@app.before_request
+def _calentar_en_wsgi():
+    # En modo WSGI no hay lifespan: el calentamiento arranca con la primera petición
+    iniciar_calentamiento()
+    metricas.iniciar_exportador()
+
+
+@app.after_request
+def _registrar_respuesta(response):
+    perfil_arranque.registrar_respuesta(response.status_code)
+    return response
+
+
 @app.route("/", methods=["GET"])
 def home():
     return "🤖 Neurobet IA v8.0 webhook OK", 200
 
 
-@app.route("/dashboard", methods=["GET"])
-def dashboard():
-    if PRED_HIST_PATH.exists():
-        with open(PRED_HIST_PATH, "r", encoding="utf-8") as f:
-            historial = json.load(f)
-    else:
-        historial = []
+def _resumen_historial():
+    historial = leer_json(PRED_HIST_PATH, list)
 
     total = len(historial)
     evaluados = sum(1 for h in historial if h.get("acierto") is not None)
     aciertos = sum(1 for h in historial if h.get("acierto") is True)
     precision = round(aciertos / evaluados * 100, 2) if evaluados else 0
+    return {
+        "historial": historial,
+        "total": total,
+        "evaluados": evaluados,
+        "aciertos": aciertos,
+        "precision": precision,
+    }
+
+
+def _html_dashboard() -> str:
+    """HTML del panel web (compartido por la app Flask y la ASGI)."""
+    r = _resumen_historial()
 
     html = "<h1>📊 Neurobet IA - Dashboard</h1>"
-    html += f"<p>Total predicciones: {total}</p>"
-    html += f"<p>Evaluadas: {evaluados} | Aciertos: {aciertos} | Precisión: {precision}%</p>"
+    html += f"<p>Total predicciones: {r['total']}</p>"
+    html += f"<p>Evaluadas: {r['evaluados']} | Aciertos: {r['aciertos']} | Precisión: {r['precision']}%</p>"
+    if obtener_grafico("precision_evolutiva"):
+        html += '<img src="/charts/precision_evolutiva.png" alt="Precisión evolutiva">'
     html += "<h2>Últimas 10</h2><ul>"
-    for item in historial[-10:][::-1]:
+    for item in r["historial"][-10:][::-1]:
         html += f"<li>{item['fecha']} → {item['partido']} → {item['prediccion']}</li>"
     html += "</ul>"
-    return html, 200
+    return html
+
+
+@app.route("/dashboard", methods=["GET"])
+def dashboard():
+    return _html_dashboard(), 200
+
+
+@app.route("/charts/<nombre>.png", methods=["GET"])
+def chart(nombre):
+    """Sirve un gráfico desde la caché en memoria con ETag y 304."""
+    grafico = obtener_grafico(nombre)
+    if grafico is None:
+        return "Not found", 404
+
+    headers = {
+        "ETag": f'"{grafico["etag"]}"',
+        "Cache-Control": CHART_CACHE_CONTROL,
+        "Last-Modified": grafico["actualizado"].strftime("%a, %d %b %Y %H:%M:%S GMT"),
+    }
+    if request.if_none_match.contains(grafico["etag"]):
+        return Response(status=304, headers=headers)
+    return Response(grafico["bytes"], mimetype="image/png", headers=headers)
 
 
 @app.route("/webhook", methods=["POST"])
 def webhook():
-    """Recibe el update de Telegram y lo procesa directamente."""
+    """Recibe el update de Telegram, lo encola y responde de inmediato."""
+    update_id = None
     try:
         update_data = request.get_json(force=True)
-        update = Update.de_json(update_data, application.bot)
-        logger.info("✅ Update recibido y procesando...")
-        # procesamos directo (esto sí está dentro del loop que maneja PTB internamente)
-        application.create_task(application.process_update(update))
+        update_id = update_data.get("update_id")
+        # Reintento de Telegram: se confirma con 200 sin volver a procesarlo
+        if deduplicador.es_duplicado(update_id):
+            return "DUP", 200
+        estado = procesador.encolar(update_data)
+        if estado == RECHAZADO:
+            # Telegram lo reintentará: no debe contar como visto
+            deduplicador.olvidar(update_id)
+            logger.warning("⚠️ Cola de updates llena, se responde 429.")
+            return "BUSY", 429
         return "OK", 200
     except Exception as e:
+        deduplicador.olvidar(update_id)
         logger.error(f"❌ Error procesando webhook: {e}")
         return "ERROR", 500
 
 
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Métricas en formato Prometheus (todos los workers vivos)."""
+    return Response(metricas.exponer(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/profiles/collapsed", methods=["GET"])
+def profiles_collapsed():
+    """Perfiles de data/profiles/ sumados (formato collapsed); ?filtro=predecir para acotar."""
+    return Response(perfilador.agregado(request.args.get("filtro")), mimetype="text/plain")
+
+
+@app.route("/webhook/estado", methods=["GET"])
+def webhook_estado():
+    """Profundidad de la cola, latencia de procesamiento, updates duplicados y arranque."""
+    return _estado_webhook(), 200
+
+
+def _estado_webhook() -> dict:
+    """Estado del webhook (compartido por la app Flask y la ASGI)."""
+    return {
+        **procesador.estadisticas(),
+        "deduplicacion": deduplicador.estadisticas(),
+        "arranque_ms": perfil_arranque.obtener_perfil()["hitos_ms"],
+    }
+
+
+# =========================================================
+#  APP ASGI (uvicorn)
+# =========================================================
+
+# Mismas rutas que Flask; el procesador (cola acotada + PTB) corre en el loop
+# del servidor y arranca/para con los eventos lifespan.
+# Render: gunicorn -k uvicorn.workers.UvicornWorker telegram_bot.main_bot:asgi_app
+asgi_app = AppASGI(
+    procesador,
+    _html_dashboard,
+    CHART_CACHE_CONTROL,
+    al_arrancar=[
+        lambda: arrancar_servicios_background(),
+        lambda: iniciar_calentamiento(),
+        metricas.iniciar_exportador,
+    ],
+    al_detener=[lambda: detener_difusion(f"picks-{datetime.utcnow().date().isoformat()}")],
+    deduplicador=deduplicador,
+    estado_webhook=_estado_webhook,
+)
+
+
+def ejecutar_en_loop_ptb(corrutina):
+    """Ejecuta una corrutina en el loop dueño de la Application (ASGI o procesador)."""
+    if asgi_app.loop is not None:
+        return asyncio.run_coroutine_threadsafe(corrutina, asgi_app.loop).result()
+    return procesador.ejecutar(corrutina)
+
+
 # =========================================================
 #  ARRANQUE
 # =========================================================
@@ -342,21 +466,86 @@ def iniciar_servicios_background():
     iniciar_autoevaluacion_automatica()
 
     # hilo de picks
-    t = threading.Thread(target=_hilo_picks_daemon, daemon=True)
-    t.start()
-    logger.info("🟣 Hilo de picks diarios iniciado.")
+    iniciar_hilo_picks()
+
+    # difusión diaria de picks a suscriptores
+    threading.Thread(target=_hilo_difusion_diaria, name="difusion-picks", daemon=True).start()
+    logger.info("📣 Hilo de difusión diaria iniciado.")
+
+
+def _hilo_difusion_diaria():
+    """Cada 10 minutos: si toca (o quedó a medias), difunde los picks de hoy."""
+    while True:
+        try:
+            if debe_difundir_hoy():
+                with metricas.medir_job("difusion_diaria"):
+                    ejecutar_en_loop_ptb(difundir_picks(application.bot))
+        except Exception as e:
+            logger.error(f"❌ Error en la difusión diaria: {e}")
+        time.sleep(600)
+
+
+# === CALENTAMIENTO (cold start) === #
+# Los imports pesados (sklearn, matplotlib, joblib) se difieren al primer uso;
+# este hilo los adelanta en cada worker una vez que el servidor ya responde.
+CALENTAMIENTO_ESPERA = float(os.getenv("CALENTAMIENTO_ESPERA", 3))
+_calentamiento_lock = threading.Lock()
+_calentamiento_iniciado = False
+
+ETAPAS_CALENTAMIENTO = [
+    ("modelo", cargar_modelo),
+    ("modelo_incremental", obtener_metricas_incrementales),
+    ("indice_equipos", precargar_feature_store),
+    ("ratings_elo", asegurar_ratings),
+    ("picks", asegurar_picks_de_hoy),
+]
+
+
+def _calentar():
+    # No compite por el GIL con el primer request: espera a que se sirva uno (o un máximo)
+    perfil_arranque.esperar_primera_respuesta(CALENTAMIENTO_ESPERA)
+    for nombre, etapa in ETAPAS_CALENTAMIENTO:
+        try:
+            etapa()
+        except Exception as e:
+            logger.error(f"❌ Calentamiento '{nombre}' falló: {e}")
+        perfil_arranque.marcar(f"calentamiento_{nombre}")
+    perfil_arranque.marcar("calentamiento_completo")
+    logger.info("🔥 Calentamiento completo.")
+    perfil_arranque.emitir()
+
 
+def iniciar_calentamiento():
+    """Idempotente: lanza el hilo de calentamiento de este worker una sola vez."""
+    global _calentamiento_iniciado
+    if _calentamiento_iniciado:
+        return
+    with _calentamiento_lock:
+        if _calentamiento_iniciado:
+            return
+        _calentamiento_iniciado = True
+    threading.Thread(target=_calentar, name="calentamiento", daemon=True).start()
 
-# Render entra por aquí con gunicorn: telegram_bot.main_bot:app
+
+def arrancar_servicios_background():
+    """
+    Con varios workers, solo uno (el líder) corre los servicios de fondo;
+    si ese proceso muere, otro toma el relevo.
+    """
+    ejecutar_como_lider("servicios_background", iniciar_servicios_background)
+
+
+perfil_arranque.marcar("app_lista")
+
+
+# Modo WSGI (Flask + loop propio): gunicorn -k gthread telegram_bot.main_bot:app
 # Pero si lo corres local, entra en este if
 if __name__ == "__main__":
     logger.info("🚀 Iniciando Neurobet IA (local/debug)")
+    procesador.iniciar()
     # set webhook por si lo corres local con túnel
-    application.run_webhook(
-        listen="0.0.0.0",
-        port=PORT,
-        url_path="webhook",
-        webhook_url=WEBHOOK_URL,
-    )
-    iniciar_servicios_background()
+    procesador.ejecutar(application.bot.set_webhook(WEBHOOK_URL))
+    arrancar_servicios_background()
+    iniciar_calentamiento()
+    metricas.iniciar_exportador()
     app.run(host="0.0.0.0", port=PORT)
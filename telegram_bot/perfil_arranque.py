@@ -0,0 +1,150 @@
+# telegram_bot/perfil_arranque.py
+"""
+Perfil de arranque del proceso web (cold start en Render).
+
+  - tiempo de import de cada módulo propio (services.*, telegram_bot.*):
+    inclusivo (con todo lo que arrastra) y propio (sin sus hijos medidos)
+  - hitos desde el inicio del proceso: imports listos, servidor escuchando,
+    primer 200, etapas del calentamiento
+
+Se guarda en data/perfil_arranque.json (una entrada por worker, por pid;
+solo los últimos MAX_PERFILES) y se resume en el log al servir el primer
+200 y al terminar el calentamiento.
+Para el detalle de librerías de terceros: python -X importtime.
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from importlib.machinery import PathFinder, SourceFileLoader
+
+from services.almacen_json import transaccion_json
+
+logger = logging.getLogger(__name__)
+
+PERFIL_PATH = os.path.join("data", "perfil_arranque.json")
+MAX_PERFILES = 8
+UMBRAL_IMPORT_MS = 5.0  # en el resumen del log solo los imports más lentos que esto
+
+_T0 = time.perf_counter()
+_lock = threading.Lock()
+_imports = {}  # módulo → {"inclusivo_ms", "propio_ms"}
+_hilo = threading.local()  # pila de imports propios en curso, por hilo
+_hitos = {}    # hito → ms desde el inicio del proceso
+_primera_respuesta = threading.Event()
+
+
+def _inicio_proceso_epoch():
+    """Instante de arranque del proceso (Linux, /proc); None si no se puede leer."""
+    try:
+        with open("/proc/self/stat") as f:
+            # El nombre del comando va entre paréntesis y puede tener espacios
+            campos = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        arranque = int(campos[19]) / os.sysconf("SC_CLK_TCK")
+        return time.time() - uptime + arranque
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+_INICIO_EPOCH = _inicio_proceso_epoch()
+# Lo que tardó el intérprete hasta importar este módulo (si no, se cuenta desde aquí)
+_DESFASE = max(0.0, time.time() - _INICIO_EPOCH) if _INICIO_EPOCH else 0.0
+_hitos["interprete_listo"] = round(_DESFASE * 1000, 1)
+
+
+def ms_desde_inicio() -> float:
+    return round((_DESFASE + time.perf_counter() - _T0) * 1000, 1)
+
+
+# === IMPORTS === #
+class _CargadorMedido(SourceFileLoader):
+    def exec_module(self, module):
+        pila = _hilo.__dict__.setdefault("pila", [])  # ms de los hijos de cada import abierto
+        t0 = time.perf_counter()
+        pila.append(0.0)
+        try:
+            super().exec_module(module)
+        finally:
+            hijos = pila.pop()
+            total = (time.perf_counter() - t0) * 1000
+            if pila:
+                pila[-1] += total
+            _imports[self.name] = {"inclusivo_ms": round(total, 1), "propio_ms": round(total - hijos, 1)}
+
+
+class _BuscadorMedido:
+    """Meta path finder: solo envuelve los módulos propios, que son .py normales."""
+
+    def __init__(self, prefijos):
+        self.prefijos = tuple(prefijos)
+
+    def find_spec(self, nombre, path=None, target=None):
+        if not nombre.startswith(self.prefijos):
+            return None
+        spec = PathFinder.find_spec(nombre, path, target)
+        if spec is not None and type(spec.loader) is SourceFileLoader:
+            spec.loader = _CargadorMedido(spec.loader.name, spec.loader.path)
+        return spec
+
+
+def medir_imports(prefijos=("services.", "telegram_bot.")):
+    """Mide los imports de los módulos propios que aún no estén cargados."""
+    if not any(isinstance(b, _BuscadorMedido) for b in sys.meta_path):
+        sys.meta_path.insert(0, _BuscadorMedido(prefijos))
+
+
+# === HITOS === #
+def marcar(hito):
+    """Registra un hito (solo la primera vez) en ms desde el inicio del proceso."""
+    with _lock:
+        if hito in _hitos:
+            return False
+        _hitos[hito] = ms_desde_inicio()
+    return True
+
+
+def registrar_respuesta(status):
+    """Llamado por cada respuesta HTTP; el primer 200 cierra el perfil de arranque."""
+    _primera_respuesta.set()
+    if status == 200 and "primer_200" not in _hitos and marcar("primer_200"):
+        # Fuera del camino de la respuesta (en ASGI estamos en el loop del servidor)
+        threading.Thread(target=emitir, name="perfil-arranque", daemon=True).start()
+
+
+def esperar_primera_respuesta(timeout):
+    return _primera_respuesta.wait(timeout)
+
+
+def obtener_perfil() -> dict:
+    with _lock:
+        hitos = dict(_hitos)
+    return {
+        "pid": os.getpid(),
+        "inicio_proceso": _INICIO_EPOCH,
+        "hitos_ms": hitos,
+        "imports_ms": dict(sorted(_imports.items(), key=lambda kv: -kv[1]["inclusivo_ms"])),
+    }
+
+
+def emitir():
+    """Resume el perfil en el log y lo guarda en data/perfil_arranque.json."""
+    perfil = obtener_perfil()
+    lentos = ", ".join(
+        f"{m} {t['inclusivo_ms']:.0f}" for m, t in perfil["imports_ms"].items()
+        if t["inclusivo_ms"] >= UMBRAL_IMPORT_MS
+    )
+    hitos = ", ".join(f"{h} {ms:.0f}" for h, ms in perfil["hitos_ms"].items())
+    logger.info(f"⏱️ Arranque (ms desde inicio del proceso): {hitos}")
+    logger.info(f"⏱️ Imports (ms): {lentos}")
+    try:
+        with transaccion_json(PERFIL_PATH, dict) as perfiles:
+            perfiles[str(perfil["pid"])] = perfil
+            viejos = sorted(perfiles, key=lambda pid: perfiles[pid].get("inicio_proceso") or 0)
+            for pid in viejos[:-MAX_PERFILES]:
+                del perfiles[pid]
+    except Exception as e:
+        logger.error(f"❌ No se pudo guardar el perfil de arranque: {e}")
@@ -0,0 +1,209 @@
+# telegram_bot/procesador_updates.py
+"""
+Procesador de updates de Telegram con su propio event loop.
+
+Un hilo dedicado es dueño del loop asyncio y de la Application de PTB
+(initialize/start/stop/shutdown ocurren ahí). El webhook de Flask solo
+encola el JSON recibido y responde de inmediato; N corrutinas consumen la
+cola y llaman a application.process_update.
+
+En modo ASGI (telegram_bot/asgi.py) el servidor ya tiene su loop: con
+iniciar_en_loop() la Application y los procesadores corren en él, y el
+webhook encola igual que en Flask (misma cola, misma política).
+
+La cola está acotada y tiene política de sobrecarga:
+  - "drop":  si está llena, el update se descarta y se responde 200
+  - "429":   si está llena, se responde 429 para que Telegram reintente
+  - "shed":  por encima del UMBRAL_SHED se descartan los comandos no críticos;
+             los críticos entran hasta llenar la cola y luego reciben 429
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+
+from telegram import Update
+
+logger = logging.getLogger(__name__)
+
+# === CONFIGURACIÓN === #
+MAX_COLA = int(os.getenv("WEBHOOK_COLA_MAX", 1000))
+N_PROCESADORES = int(os.getenv("WEBHOOK_PROCESADORES", 8))
+POLITICA = os.getenv("WEBHOOK_POLITICA", "shed")
+UMBRAL_SHED = float(os.getenv("WEBHOOK_UMBRAL_SHED", 0.8))
+COMANDOS_CRITICOS = {"start", "predecir", "picks", "picks_free", "picks_premium"}
+
+# Resultado de encolar()
+ENCOLADO = "encolado"
+DESCARTADO = "descartado"
+RECHAZADO = "rechazado"
+
+
+def comando_de(update_data: dict):
+    """Nombre del comando (/predecir → "predecir") o None si no es un comando."""
+    mensaje = update_data.get("message") or update_data.get("edited_message") or {}
+    texto = mensaje.get("text") or ""
+    if not texto.startswith("/"):
+        return None
+    return texto[1:].split(maxsplit=1)[0].split("@")[0].lower() if len(texto) > 1 else None
+
+
+def es_critico(update_data: dict) -> bool:
+    return comando_de(update_data) in COMANDOS_CRITICOS
+
+
+class ProcesadorUpdates:
+    def __init__(self, application, max_cola=MAX_COLA, n_procesadores=N_PROCESADORES, politica=POLITICA):
+        self.application = application
+        self.max_cola = max_cola
+        self.n_procesadores = n_procesadores
+        self.politica = politica
+
+        self.loop = None
+        self._cola = None
+        self._hilo = None
+        self._listo = threading.Event()
+        self._externo = False  # True si el loop es el del servidor ASGI
+        self._error_arranque = None
+        self._lock = threading.Lock()
+        self._pendientes = 0   # encolados y aún no tomados por un procesador
+        self._en_curso = 0
+        self._latencias = deque(maxlen=2000)  # segundos, desde encolar hasta terminar
+        self._contadores = {"encolados": 0, "procesados": 0, "errores": 0, "descartados": 0, "rechazados": 0}
+
+    # === CICLO DE VIDA === #
+    def iniciar(self, timeout=30):
+        """Arranca el hilo del loop (idempotente) y espera a que PTB esté inicializado."""
+        if self._externo:
+            return
+        with self._lock:
+            if self._hilo is None:
+                self._listo.clear()
+                self._error_arranque = None
+                self._hilo = threading.Thread(target=self._ejecutar_loop, name="ptb-loop", daemon=True)
+                self._hilo.start()
+        if not self._listo.wait(timeout):
+            raise RuntimeError("El loop de Telegram no arrancó a tiempo.")
+        if self._error_arranque is not None:
+            raise RuntimeError(f"El loop de Telegram no pudo arrancar: {self._error_arranque}")
+
+    def _ejecutar_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._arrancar())
+        except Exception as e:
+            # Se permite reintentar en la próxima llamada a iniciar()
+            logger.error(f"❌ No se pudo inicializar PTB: {e}")
+            self._error_arranque = e
+            with self._lock:
+                self._hilo = None
+            self._listo.set()
+            self.loop.close()
+            return
+        self._listo.set()
+        logger.info(f"🔁 Loop de Telegram listo ({self.n_procesadores} procesadores, cola {self.max_cola}, política {self.politica}).")
+        self.loop.run_forever()
+
+    async def _arrancar(self):
+        self._cola = asyncio.Queue()
+        await self.application.initialize()
+        await self.application.start()
+        for i in range(self.n_procesadores):
+            self.loop.create_task(self._procesador(i))
+
+    async def iniciar_en_loop(self):
+        """Modo ASGI: PTB y los procesadores corren en el loop del servidor (lifespan)."""
+        self.loop = asyncio.get_running_loop()
+        self._externo = True
+        await self._arrancar()
+        self._listo.set()
+        logger.info(f"🔁 Procesadores de updates en el loop ASGI ({self.n_procesadores}, cola {self.max_cola}, política {self.politica}).")
+
+    async def detener_en_loop(self):
+        await self._apagar()
+
+    def detener(self, timeout=10):
+        """Detiene PTB y el loop (el del servidor ASGI lo cierra su lifespan)."""
+        if self.loop is None or self._externo:
+            return
+        futuro = asyncio.run_coroutine_threadsafe(self._apagar(), self.loop)
+        futuro.result(timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    async def _apagar(self):
+        if self.application.running:
+            await self.application.stop()
+        await self.application.shutdown()
+
+    def ejecutar(self, corrutina, timeout=None):
+        """Ejecuta una corrutina en el loop de PTB desde otro hilo y espera su resultado."""
+        self.iniciar()
+        return asyncio.run_coroutine_threadsafe(corrutina, self.loop).result(timeout)
+
+    # === ENCOLADO === #
+    def encolar(self, update_data: dict) -> str:
+        """
+        Intenta encolar un update (JSON ya parseado). No bloquea.
+        Devuelve ENCOLADO, DESCARTADO (responder 200) o RECHAZADO (responder 429).
+        """
+        self.iniciar()
+        with self._lock:
+            ocupacion = self._pendientes / self.max_cola
+            if self._pendientes >= self.max_cola:
+                if self.politica == "drop":
+                    self._contadores["descartados"] += 1
+                    return DESCARTADO
+                self._contadores["rechazados"] += 1
+                return RECHAZADO
+            if self.politica == "shed" and ocupacion >= UMBRAL_SHED and not es_critico(update_data):
+                self._contadores["descartados"] += 1
+                return DESCARTADO
+            self._pendientes += 1
+            self._contadores["encolados"] += 1
+
+        self.loop.call_soon_threadsafe(self._cola.put_nowait, (time.monotonic(), update_data))
+        return ENCOLADO
+
+    async def _procesador(self, numero):
+        while True:
+            encolado_en, update_data = await self._cola.get()
+            with self._lock:
+                self._pendientes -= 1
+                self._en_curso += 1
+            try:
+                update = Update.de_json(update_data, self.application.bot)
+                await self.application.process_update(update)
+                self._contadores["procesados"] += 1
+            except Exception as e:
+                self._contadores["errores"] += 1
+                logger.error(f"❌ Error procesando update en procesador {numero}: {e}")
+            finally:
+                self._latencias.append(time.monotonic() - encolado_en)
+                with self._lock:
+                    self._en_curso -= 1
+
+    # === MÉTRICAS === #
+    def estadisticas(self) -> dict:
+        """Profundidad de la cola, contadores y latencia de procesamiento (ms)."""
+        latencias = sorted(self._latencias)
+
+        def percentil(p):
+            if not latencias:
+                return None
+            return round(latencias[min(len(latencias) - 1, int(p * len(latencias)))] * 1000, 1)
+
+        return {
+            "profundidad": self._pendientes,
+            "en_curso": self._en_curso,
+            "max_cola": self.max_cola,
+            "procesadores": self.n_procesadores,
+            "politica": self.politica,
+            **self._contadores,
+            "latencia_p50_ms": percentil(0.50),
+            "latencia_p95_ms": percentil(0.95),
+            "latencia_p99_ms": percentil(0.99),
+        }
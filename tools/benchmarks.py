@@ -0,0 +1,509 @@
+# tools/benchmarks.py
+"""
+Benchmarks de los caminos calientes de Neurobet IA, sin red.
+
+Todo corre en un directorio temporal con datos de prueba generados aquí:
+modelo RandomForest publicado en el registro, feature store con los partidos
+deterministas de tools/fake_football.py, historial, apuestas, memoria y log
+de aprendizaje del tamaño pedido. La consulta de resultados reales a
+football-data.org se sustituye por un stub determinista.
+
+Casos:
+  prediccion_individual           ia_service.predecir_partido, un partido
+  prediccion_lote/<n>             n partidos seguidos (como los picks del día)
+  registrar_prediccion/<n>        con n predicciones ya en el historial
+  registrar_apuesta/<n>           con n apuestas ya en el archivo del usuario
+  evaluar_predicciones/<n>        evaluar_predicciones_recientes con n pendientes
+  memoria_evento_global/<n>       guardar_evento_global con n eventos previos
+  dashboard_html/<n>              HTML del panel con n predicciones
+  grafico_precision/<n>           render del gráfico con n puntos de log
+  goles_ajuste/<n>                ajuste Dixon-Coles con n resultados
+  goles_jornada/<n>               matriz de marcadores y mercados de n partidos
+  parley/<n>[_correlacionado]     Monte Carlo de 1M ensayos de un parley de n selecciones
+  elo_reproducir/<n>              reconstrucción de ratings Elo con n partidos
+  elo_resultado                   actualización O(1) de un resultado
+
+Cada caso reporta min/mediana/p95/media en ms; algunos agregan extras
+(bytes del archivo, ms por partido). El resultado se guarda como JSON con la
+máquina y el commit en benchmarks/<fecha>-<commit>.json (o --salida).
+
+--comparar base.json [nuevo.json] marca como regresión todo caso cuya
+mediana empeore más de --umbral por ciento (y más de --minimo-ms): sin
+nuevo.json, corre la suite y compara. Sale con código 1 si hay regresiones.
+
+Uso:  python -m tools.benchmarks
+      python -m tools.benchmarks --rapido --solo registrar_prediccion,registrar_apuesta
+      python -m tools.benchmarks --comparar benchmarks/base.json --umbral 15
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime, timedelta
+
+from tools.fake_football import EQUIPOS, _partidos
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTADOS_DIR = os.path.join(RAIZ, "benchmarks")
+
+TAMANOS = (1_000, 100_000, 1_000_000)
+TAMANOS_RAPIDO = (1_000, 10_000)
+TAMANOS_MEMORIA = (1_000, 10_000, 100_000)
+
+_BENCHMARKS = {}
+
+
+def benchmark(nombre):
+    """Registra una función de la suite: recibe los args y devuelve {caso: resultado}."""
+    def decorador(funcion):
+        _BENCHMARKS[nombre] = funcion
+        return funcion
+    return decorador
+
+
+# === MEDICIÓN === #
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(p * len(valores)))]
+
+
+def medir(funcion, repeticiones, preparar=None, calentamiento=1):
+    """
+    Ejecuta funcion() `repeticiones` veces (más `calentamiento` descartadas).
+    preparar(), si se da, corre antes de cada ejecución y no se mide.
+    """
+    tiempos = []
+    for i in range(calentamiento + repeticiones):
+        if preparar:
+            preparar()
+        t0 = time.perf_counter()
+        funcion()
+        ms = (time.perf_counter() - t0) * 1000
+        if i >= calentamiento:
+            tiempos.append(ms)
+    return {
+        "min_ms": round(min(tiempos), 3),
+        "mediana_ms": round(statistics.median(tiempos), 3),
+        "p95_ms": round(_percentil(tiempos, 0.95), 3),
+        "media_ms": round(statistics.fmean(tiempos), 3),
+        "repeticiones": repeticiones,
+    }
+
+
+def _repeticiones(n, base):
+    """Menos repeticiones cuanto más grande el archivo (1M registros tarda segundos)."""
+    return max(3, base // max(1, n // 10_000)) if n >= 100_000 else base
+
+
+# === DATOS DE PRUEBA === #
+def _pares(cantidad, azar):
+    return [tuple(azar.sample(EQUIPOS, 2)) for _ in range(cantidad)]
+
+
+def _historial(n, pendientes=0, semilla=1):
+    """Historial de predicciones con el formato de registrar_prediccion; las últimas `pendientes` sin resolver."""
+    azar = random.Random(semilla)
+    inicio = datetime(2025, 1, 1)
+    historial = []
+    for i in range(n):
+        local, visitante = azar.sample(EQUIPOS, 2)
+        resuelta = i < n - pendientes
+        acierto = azar.random() < 0.5 if resuelta else None
+        historial.append({
+            "partido": f"{local} vs {visitante}",
+            "prediccion": f"🏆 {local} gana",
+            "probabilidad": round(azar.uniform(35, 80), 2),
+            "fecha": (inicio + timedelta(seconds=i * 37)).isoformat(),
+            "resultado_real": (f"{local} gana" if acierto else "Empate") if resuelta else None,
+            "acierto": acierto,
+            "features": [round(azar.uniform(0.5, 2.5), 2), round(azar.uniform(0.5, 2.5), 2),
+                         12.0, 10.0, 50.0, 50.0],
+        })
+    return historial
+
+
+def _apuestas(n, semilla=2):
+    azar = random.Random(semilla)
+    inicio = datetime(2025, 1, 1)
+    apuestas = [{
+        "tipo": "config", "casa_apuestas": "Generica", "moneda": "MXN",
+        "formato_odds": "decimal", "bank_actual": 1000.0, "timestamp": inicio.isoformat(),
+    }]
+    for i in range(n):
+        local, visitante = azar.sample(EQUIPOS, 2)
+        odd = round(azar.uniform(1.3, 3.5), 2)
+        apuestas.append({
+            "tipo": "simple", "partido": f"{local} vs {visitante}", "tipo_apuesta": "1X2",
+            "odd_usuario": str(odd), "odd_decimal": odd, "formato_odd": "decimal", "moneda": "MXN",
+            "bank_inicial": 1000.0, "apuesta": 10.0, "bank_final": 1000.0, "resultado": "pendiente",
+            "ganancia": 0.0, "timestamp": (inicio + timedelta(minutes=i)).isoformat(),
+        })
+    return apuestas
+
+
+def _eventos(n):
+    inicio = datetime(2025, 1, 1)
+    return {"eventos": [
+        {"usuario": str(1000 + i % 500), "accion": "prediccion",
+         "datos": {"partido": f"{EQUIPOS[i % 20]} vs {EQUIPOS[(i + 7) % 20]}"},
+         "timestamp": (inicio + timedelta(seconds=i)).isoformat()}
+        for i in range(n)
+    ]}
+
+
+def _log_aprendizaje(n, semilla=3):
+    azar = random.Random(semilla)
+    inicio = datetime(2024, 1, 1)
+    return [{"fecha": (inicio + timedelta(hours=i)).isoformat(), "precision": round(azar.uniform(45, 75), 2)}
+            for i in range(n)]
+
+
+def _preparar_modelo_y_store():
+    """Publica un RandomForest chico y llena el feature store con partidos deterministas."""
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+    from services.registro_modelos import publicar_modelo
+    from services import feature_store_service
+
+    azar = np.random.default_rng(42)
+    X = np.column_stack([
+        azar.poisson(1.5, 2000), azar.poisson(1.2, 2000),
+        azar.integers(5, 15, 2000), azar.integers(3, 12, 2000),
+        azar.integers(40, 60, 2000),
+    ]).astype(float)
+    X = np.column_stack([X, 100 - X[:, 4]])
+    y = np.sign(X[:, 0] - X[:, 1]).astype(int)
+    modelo = RandomForestClassifier(n_estimators=150, max_depth=8, random_state=42, n_jobs=1).fit(X, y)
+    publicar_modelo(modelo, "partido_1x2", {"benchmark": True}, feature_store_service.FEATURES_MODELO)
+    feature_store_service.ingestar_partidos_api(_partidos(0)[1])
+
+
+def _resultado_stub(equipo_local, equipo_visitante):
+    """Sustituto offline de obtener_resultado_real: la mitad de los partidos tiene resultado."""
+    h = sum(map(ord, equipo_local + equipo_visitante))
+    if h % 2:
+        return None
+    return {"id": 500_000 + h, "local": h % 3, "visitante": (h // 3) % 3}
+
+
+# === CASOS === #
+@benchmark("prediccion")
+def bench_prediccion(args):
+    from services.ia_service import predecir_partido
+
+    azar = random.Random(7)
+    resultados = {"prediccion_individual": medir(
+        lambda: predecir_partido(*_pares(1, azar)[0]), args.repeticiones * 6)}
+    lote = _pares(args.lote, azar)
+    r = medir(lambda: [predecir_partido(a, b) for a, b in lote], max(3, args.repeticiones))
+    r["ms_por_partido"] = round(r["mediana_ms"] / args.lote, 3)
+    resultados[f"prediccion_lote/{args.lote}"] = r
+    return resultados
+
+
+@benchmark("registrar_prediccion")
+def bench_registrar_prediccion(args):
+    from services.almacen_json import escribir_json
+    from services.evaluacion_service import HISTORIAL_PATH, registrar_prediccion
+
+    resultados = {}
+    for n in args.tamanos:
+        escribir_json(HISTORIAL_PATH, _historial(n))
+        r = medir(lambda: registrar_prediccion("Barcelona", "Sevilla", "🤝 Empate", 41.2, [1.5, 1.1, 12.0, 10.0, 52.0, 48.0]),
+                  _repeticiones(n, args.repeticiones))
+        r["bytes"] = os.path.getsize(HISTORIAL_PATH)
+        resultados[f"registrar_prediccion/{n}"] = r
+        os.remove(HISTORIAL_PATH)
+    return resultados
+
+
+@benchmark("registrar_apuesta")
+def bench_registrar_apuesta(args):
+    from services.almacen_json import escribir_json
+    from services import apuestas_service
+
+    usuario = 4242
+    resultados = {}
+    for n in args.tamanos:
+        ruta = apuestas_service._get_user_file(usuario)
+        escribir_json(ruta, _apuestas(n))
+        r = medir(lambda: apuestas_service.registrar_apuesta(usuario, "Barcelona vs Sevilla", "1X2", "-120", 10.0),
+                  _repeticiones(n, args.repeticiones))
+        r["bytes"] = os.path.getsize(ruta)
+        resultados[f"registrar_apuesta/{n}"] = r
+        os.remove(ruta)
+    return resultados
+
+
+@benchmark("evaluar_predicciones")
+def bench_evaluar(args):
+    from services.almacen_json import escribir_json
+    from services import evaluacion_service
+
+    original = evaluacion_service.obtener_resultado_real
+    evaluacion_service.obtener_resultado_real = _resultado_stub
+    try:
+        historial = _historial(args.pendientes * 5, pendientes=args.pendientes)
+        r = medir(evaluacion_service.evaluar_predicciones_recientes, max(3, args.repeticiones),
+                  preparar=lambda: escribir_json(evaluacion_service.HISTORIAL_PATH, historial))
+    finally:
+        evaluacion_service.obtener_resultado_real = original
+    return {f"evaluar_predicciones/{args.pendientes}": r}
+
+
+@benchmark("memoria_eventos")
+def bench_memoria(args):
+    from services.almacen_json import escribir_json
+    from services import memoria_service
+
+    resultados = {}
+    for n in args.tamanos_memoria:
+        escribir_json(memoria_service.GLOBAL_FILE, _eventos(n), indent=4)
+        r = medir(lambda: memoria_service.guardar_evento_global("4242", "prediccion", {"partido": "Barcelona vs Sevilla"}),
+                  _repeticiones(n, args.repeticiones))
+        r["bytes"] = os.path.getsize(memoria_service.GLOBAL_FILE)
+        r["bytes_por_evento"] = round(r["bytes"] / n, 1)
+        resultados[f"memoria_evento_global/{n}"] = r
+    return resultados
+
+
+@benchmark("dashboard")
+def bench_dashboard(args):
+    from services.almacen_json import escribir_json
+    from services import visualizacion_service
+    from services.evaluacion_service import HISTORIAL_PATH
+
+    resultados = {}
+    for puntos in (1_000, 10_000):
+        escribir_json(visualizacion_service.MODELO_IA_PATH, {"historial_precision": _log_aprendizaje(puntos)})
+        # Sin el hash previo se fuerza el render completo (si no, se reutiliza el PNG)
+        r = medir(visualizacion_service.generar_grafico_precision, max(3, args.repeticiones),
+                  preparar=lambda: visualizacion_service._ultimo_render.update(hash=None))
+        r["bytes_png"] = visualizacion_service.obtener_estadisticas_render()["bytes"]
+        resultados[f"grafico_precision/{puntos}"] = r
+
+    # main_bot construye la app completa al importarse; no toca la red hasta arrancar
+    from telegram_bot.main_bot import _html_dashboard
+
+    for n in args.tamanos[:2]:
+        escribir_json(HISTORIAL_PATH, _historial(n))
+        resultados[f"dashboard_html/{n}"] = medir(_html_dashboard, _repeticiones(n, args.repeticiones))
+    return resultados
+
+
+@benchmark("goles")
+def bench_goles(args):
+    import numpy as np
+    from services import goles_service
+
+    azar = np.random.default_rng(5)
+    resultados = {}
+    for n in (1_000, 20_000):
+        local = azar.integers(0, 100, n)
+        partidos = np.column_stack([local, (local + azar.integers(1, 100, n)) % 100,
+                                    azar.poisson(1.5, n), azar.poisson(1.1, n)])
+        resultados[f"goles_ajuste/{n}"] = medir(lambda: goles_service.ajustar(partidos, 100), args.repeticiones)
+    modelo = goles_service.modelo_actual()
+    for n in (10, 380):
+        pares = [(EQUIPOS[i % 20], EQUIPOS[(i + 1 + i // 20) % 20]) for i in range(n)]
+        resultados[f"goles_jornada/{n}"] = medir(lambda: goles_service.valorar_partidos(pares, modelo), args.repeticiones * 3)
+    return resultados
+
+
+@benchmark("parley")
+def bench_parley(args):
+    import numpy as np
+    from services import parley_service
+
+    resultados = {}
+    for n in (3, 10):
+        probas, cuotas = [0.6] * n, [1.8] * n
+        correlacion = np.full((n, n), 0.3)
+        np.fill_diagonal(correlacion, 1.0)
+        resultados[f"parley/{n}"] = medir(
+            lambda: parley_service.simular(probas, cuotas, 10, semilla=1), max(3, args.repeticiones // 2))
+        resultados[f"parley/{n}_correlacionado"] = medir(
+            lambda: parley_service.simular(probas, cuotas, 10, correlacion=correlacion, semilla=1),
+            max(3, args.repeticiones // 2))
+    return resultados
+
+
+@benchmark("elo")
+def bench_elo(args):
+    from services import elo_service
+
+    azar = random.Random(11)
+    n = 100_000
+    equipos = [f"Equipo {i}" for i in range(200)]
+    partidos = [(*azar.sample(equipos, 2), azar.randint(0, 4), azar.randint(0, 3)) for _ in range(n)]
+    resultados = {f"elo_reproducir/{n}": medir(lambda: elo_service.reproducir(partidos), max(3, args.repeticiones // 3))}
+    r = medir(lambda: [elo_service.registrar_resultado("Equipo 1", "Equipo 2", 2, 1) for _ in range(1000)],
+              args.repeticiones)
+    resultados["elo_resultado"] = {k: (round(v / 1000, 5) if k.endswith("_ms") else v) for k, v in r.items()}
+    return resultados
+
+
+# === METADATOS === #
+def _git(*comando):
+    try:
+        return subprocess.run(["git", *comando], cwd=RAIZ, capture_output=True, text=True, timeout=60).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def _maquina():
+    modelo_cpu = platform.processor()
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            modelo_cpu = next((l.split(":", 1)[1].strip() for l in f if l.startswith("model name")), modelo_cpu)
+    except OSError:
+        pass
+    try:
+        memoria_mb = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2**20
+    except (ValueError, OSError, AttributeError):
+        memoria_mb = None
+    import numpy
+    import sklearn
+    return {
+        "host": platform.node(),
+        "plataforma": platform.platform(),
+        "cpu": modelo_cpu,
+        "cpus": os.cpu_count(),
+        "memoria_mb": memoria_mb,
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def _commit():
+    commit = _git("rev-parse", "--short", "HEAD") or "desconocido"
+    if _git("status", "--porcelain", "--untracked-files=no"):
+        commit += "-sucio"
+    return commit
+
+
+# === EJECUCIÓN === #
+def ejecutar(args):
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+    seleccion = [n for n in _BENCHMARKS if not args.solo or n in args.solo]
+    resultados = {}
+    origen = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="neurobet-bench-") as tmp:
+        os.chdir(tmp)
+        try:
+            from services import memoria_service
+
+            memoria_service.GLOBAL_FILE = os.path.join("data", "memoria_global.json")
+            memoria_service.USERS_FILE = os.path.join("data", "memoria_usuarios.json")
+            t0 = time.perf_counter()
+            _preparar_modelo_y_store()
+            print(f"🧪 Datos de prueba listos ({time.perf_counter() - t0:.1f} s)", file=sys.stderr)
+            for nombre in seleccion:
+                t0 = time.perf_counter()
+                resultados.update(_BENCHMARKS[nombre](args))
+                print(f"⏱️ {nombre} ({time.perf_counter() - t0:.1f} s)", file=sys.stderr)
+        finally:
+            os.chdir(origen)
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "maquina": _maquina(),
+        "parametros": {
+            "tamanos": list(args.tamanos), "tamanos_memoria": list(args.tamanos_memoria),
+            "pendientes": args.pendientes, "lote": args.lote, "repeticiones": args.repeticiones,
+        },
+        "resultados": resultados,
+    }
+
+
+def imprimir(reporte):
+    print(f"\n📏 Benchmarks @ {reporte['commit']} en {reporte['maquina']['cpu']} ({reporte['maquina']['cpus']} CPU)")
+    print(f"{'caso':<34}{'mediana ms':>12}{'p95 ms':>12}{'min ms':>12}  extra")
+    for caso, r in reporte["resultados"].items():
+        extra = " ".join(f"{k}={v}" for k, v in r.items() if not k.endswith("_ms") and k != "repeticiones")
+        print(f"{caso:<34}{r['mediana_ms']:>12.2f}{r['p95_ms']:>12.2f}{r['min_ms']:>12.2f}  {extra}")
+
+
+def comparar(base, nuevo, umbral=10.0, minimo_ms=0.1):
+    """Imprime la comparación caso a caso; devuelve la lista de regresiones."""
+    if base["maquina"].get("cpu") != nuevo["maquina"].get("cpu") or base["maquina"].get("cpus") != nuevo["maquina"].get("cpus"):
+        print("⚠️ Las corridas son de máquinas distintas: la comparación es orientativa.")
+    print(f"\n🔎 {base['commit']} → {nuevo['commit']} (umbral {umbral}%, mínimo {minimo_ms} ms)")
+    print(f"{'caso':<34}{'base ms':>12}{'nuevo ms':>12}{'cambio':>10}")
+    regresiones = []
+    for caso, r in nuevo["resultados"].items():
+        previo = base["resultados"].get(caso)
+        if previo is None:
+            print(f"{caso:<34}{'-':>12}{r['mediana_ms']:>12.2f}{'nuevo':>10}")
+            continue
+        antes, ahora = previo["mediana_ms"], r["mediana_ms"]
+        cambio = (ahora - antes) / antes * 100 if antes else 0.0
+        marca = ""
+        if cambio > umbral and ahora - antes > minimo_ms:
+            marca = "  ❌ regresión"
+            regresiones.append(caso)
+        elif cambio < -umbral and antes - ahora > minimo_ms:
+            marca = "  ✅ mejora"
+        print(f"{caso:<34}{antes:>12.2f}{ahora:>12.2f}{cambio:>+9.1f}%{marca}")
+    for caso in base["resultados"]:
+        if caso not in nuevo["resultados"]:
+            print(f"{caso:<34}{base['resultados'][caso]['mediana_ms']:>12.2f}{'-':>12}{'ausente':>10}")
+    print(f"\n{'❌' if regresiones else '✅'} {len(regresiones)} regresiones")
+    return regresiones
+
+
+def _cargar(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _enteros(texto):
+    return tuple(int(float(t)) for t in texto.split(",") if t.strip())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks offline de Neurobet IA")
+    parser.add_argument("--solo", type=lambda t: set(t.split(",")), default=None,
+                        help=f"subconjunto separado por comas: {','.join(_BENCHMARKS)}")
+    parser.add_argument("--tamanos", type=_enteros, default=TAMANOS, help="registros previos (historial/apuestas)")
+    parser.add_argument("--tamanos-memoria", type=_enteros, default=TAMANOS_MEMORIA)
+    parser.add_argument("--pendientes", type=int, default=2000, help="predicciones pendientes a evaluar")
+    parser.add_argument("--lote", type=int, default=50, help="partidos por lote de predicción")
+    parser.add_argument("--repeticiones", type=int, default=10)
+    parser.add_argument("--rapido", action="store_true", help="tamaños chicos (1k/10k) y menos repeticiones")
+    parser.add_argument("--salida", default=None, help="JSON de resultados (por defecto benchmarks/<fecha>-<commit>.json)")
+    parser.add_argument("--comparar", nargs="+", metavar="JSON", help="base.json [nuevo.json]")
+    parser.add_argument("--umbral", type=float, default=10.0, help="%% de empeoramiento de la mediana que cuenta como regresión")
+    parser.add_argument("--minimo-ms", type=float, default=0.1, help="ignora diferencias absolutas menores")
+    args = parser.parse_args()
+
+    if args.rapido:
+        args.tamanos, args.tamanos_memoria = TAMANOS_RAPIDO, TAMANOS_RAPIDO
+        args.pendientes, args.repeticiones = min(args.pendientes, 500), min(args.repeticiones, 5)
+
+    if args.comparar and len(args.comparar) >= 2:
+        regresiones = comparar(_cargar(args.comparar[0]), _cargar(args.comparar[1]), args.umbral, args.minimo_ms)
+        sys.exit(1 if regresiones else 0)
+
+    reporte = ejecutar(args)
+    imprimir(reporte)
+    salida = args.salida or os.path.join(
+        RESULTADOS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{reporte['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, indent=2, ensure_ascii=False)
+    print(f"💾 Resultados en {salida}")
+
+    if args.comparar:
+        regresiones = comparar(_cargar(args.comparar[0]), reporte, args.umbral, args.minimo_ms)
+        sys.exit(1 if regresiones else 0)
@@ -0,0 +1,339 @@
+# tools/carga_bot.py
+"""
+Prueba de carga del bot completo: ráfagas de usuarios contra /webhook.
+
+Genera updates de Telegram realistas (/predecir Equipo vs Equipo, /picks,
+/picks_free, /picks_premium y mensajes de voz), o reproduce updates grabados
+(--grabados archivo.jsonl, un update por línea), y los dispara a una tasa
+configurable (llegadas Poisson o uniformes) contra el servidor levantado con
+gunicorn en un directorio temporal. Telegram y football-data.org son
+servidores falsos locales (tools/fake_telegram.py, tools/fake_football.py)
+con latencia e inyección de errores configurables.
+
+Cada update va a un chat distinto, así que la primera respuesta que recibe
+el Bot API falso para ese chat marca el fin del update. La latencia extremo
+a extremo se mide desde el instante programado del envío (no desde que el
+cliente consiguió enviarlo), para no esconder la espera si el cliente se
+atrasa.
+
+Reporte: throughput, p50/p95/p99 por comando y errores (HTTP del webhook,
+updates sin respuesta, errores inyectados en las APIs falsas).
+
+Uso:  python -m tools.carga_bot --tasa 50 --duracion 20 --modo asgi --salida base.json
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import queue
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from collections import Counter, defaultdict
+
+from tools.fake_telegram import FakeTelegram
+from tools.fake_football import FakeFootballData, EQUIPOS
+from tools.carga_webhook import MODOS, RAIZ, _puerto_libre, _esperar_servidor, _percentil
+
+MEZCLA_DEFECTO = {"predecir": 0.5, "picks": 0.3, "voz": 0.2}
+EQUIPOS_DESCONOCIDOS = ["Deportivo Inventado", "Atletico Ficticio"]  # fuerzan el modo simulado
+CHAT_BASE = 100_000
+
+
+# === GENERACIÓN DE UPDATES === #
+def _mensaje(update_id, chat_id):
+    usuario = {"id": chat_id, "is_bot": False, "first_name": f"Carga{chat_id}"}
+    return {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private", "first_name": usuario["first_name"]},
+        "from": usuario,
+    }
+
+
+def generar_update(update_id, chat_id, comando, azar):
+    """Devuelve (etiqueta, update) para el comando dado ('predecir', 'picks' o 'voz')."""
+    mensaje = _mensaje(update_id, chat_id)
+    if comando == "voz":
+        mensaje["voice"] = {"file_id": f"voz{update_id}", "file_unique_id": f"v{update_id}",
+                            "duration": azar.randint(1, 30), "mime_type": "audio/ogg"}
+        return "voz", {"update_id": update_id, "message": mensaje}
+
+    if comando == "predecir":
+        candidatos = EQUIPOS + EQUIPOS_DESCONOCIDOS if azar.random() < 0.1 else EQUIPOS
+        local, visitante = azar.sample(candidatos, 2)
+        texto = f"/predecir {local} vs {visitante}"
+    else:
+        texto = azar.choice(["/picks", "/picks_free", "/picks_premium"])
+    mensaje["text"] = texto
+    mensaje["entities"] = [{"type": "bot_command", "offset": 0, "length": len(texto.split()[0])}]
+    return comando, {"update_id": update_id, "message": mensaje}
+
+
+def cargar_grabados(ruta):
+    """Updates grabados (JSONL). La etiqueta es el comando, o 'voz' / 'texto'."""
+    grabados = []
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            if not linea.strip():
+                continue
+            update = json.loads(linea)
+            mensaje = update.get("message") or {}
+            if mensaje.get("voice"):
+                etiqueta = "voz"
+            elif (mensaje.get("text") or "").startswith("/"):
+                etiqueta = mensaje["text"].split()[0][1:].split("@")[0]
+            else:
+                etiqueta = "texto"
+            grabados.append((etiqueta, update))
+    return grabados
+
+
+def _reasignar(update, update_id, chat_id):
+    """Copia de un update grabado con ids nuevos (un chat por update)."""
+    update = copy.deepcopy(update)
+    update["update_id"] = update_id
+    mensaje = update.setdefault("message", {})
+    mensaje["message_id"] = update_id
+    mensaje["date"] = int(time.time())
+    mensaje.setdefault("chat", {"type": "private"})["id"] = chat_id
+    mensaje.setdefault("from", {"is_bot": False, "first_name": "Carga"})["id"] = chat_id
+    return update
+
+
+def programar(tasa, duracion, mezcla, grabados=None, llegadas="poisson", semilla=0):
+    """Lista de (t_relativo, update_id, chat_id, etiqueta, update) ordenada por tiempo."""
+    azar = random.Random(semilla)
+    comandos, pesos = zip(*mezcla.items())
+    plan, t, update_id = [], 0.0, 0
+    while True:
+        t += azar.expovariate(tasa) if llegadas == "poisson" else 1 / tasa
+        if t >= duracion:
+            return plan
+        update_id += 1
+        chat_id = CHAT_BASE + update_id
+        if grabados:
+            etiqueta, base = grabados[(update_id - 1) % len(grabados)]
+            update = _reasignar(base, update_id, chat_id)
+        else:
+            etiqueta, update = generar_update(update_id, chat_id, azar.choices(comandos, pesos)[0], azar)
+        plan.append((t, update_id, chat_id, etiqueta, update))
+
+
+# === MEDICIÓN === #
+class Medidor:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pendientes = {}                 # chat_id → (etiqueta, t_programado)
+        self.enviados = Counter()            # etiqueta → updates enviados
+        self.latencias = defaultdict(list)   # etiqueta → segundos extremo a extremo
+        self.errores = Counter()
+        self.ultima_respuesta = None
+
+    def programado(self, chat_id, etiqueta, t_programado):
+        with self.lock:
+            self.pendientes[chat_id] = (etiqueta, t_programado)
+            self.enviados[etiqueta] += 1
+
+    def respuesta(self, chat_id, metodo):
+        """Hook del Bot API falso: primera respuesta del bot a ese chat."""
+        ahora = time.perf_counter()
+        with self.lock:
+            pendiente = self.pendientes.pop(chat_id, None)
+            if pendiente is not None:
+                self.latencias[pendiente[0]].append(ahora - pendiente[1])
+                self.ultima_respuesta = ahora
+
+    def error(self, chat_id, tipo):
+        with self.lock:
+            self.errores[tipo] += 1
+            self.pendientes.pop(chat_id, None)
+
+
+def _enviar(conn, update):
+    conn.request("POST", "/webhook", body=json.dumps(update),
+                 headers={"Content-Type": "application/json"})
+    respuesta = conn.getresponse()
+    respuesta.read()
+    return respuesta.status
+
+
+def _enviador(puerto, cola, t0, medidor):
+    conn = None
+    while True:
+        item = cola.get()
+        if item is None:
+            break
+        t_rel, _, chat_id, etiqueta, update = item
+        espera = t0 + t_rel - time.perf_counter()
+        if espera > 0:
+            time.sleep(espera)
+        medidor.programado(chat_id, etiqueta, t0 + t_rel)
+        reutilizada = conn is not None
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection("127.0.0.1", puerto, timeout=60)
+            try:
+                estado = _enviar(conn, update)
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                if not reutilizada:
+                    raise
+                # El servidor cerró la conexión ociosa (keep-alive de gunicorn: 2 s):
+                # se reabre y se reenvía una vez, como haría cualquier cliente HTTP
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", puerto, timeout=60)
+                estado = _enviar(conn, update)
+            if estado != 200:
+                medidor.error(chat_id, f"webhook_{estado}")
+        except (OSError, http.client.HTTPException):
+            medidor.error(chat_id, "webhook_conexion")
+            if conn is not None:
+                conn.close()
+            conn = None
+    if conn is not None:
+        conn.close()
+
+
+def ejecutar(args, mezcla, grabados=None):
+    medidor = Medidor()
+    telegram = FakeTelegram(latencia_ms=args.latencia_telegram_ms, tasa_429=args.telegram_429,
+                            tasa_500=args.telegram_500, al_enviar=medidor.respuesta).iniciar()
+    futbol = FakeFootballData(latencia_ms=args.latencia_futbol_ms, tasa_500=args.futbol_500,
+                              tasa_429=args.futbol_429).iniciar()
+    plan = programar(args.tasa, args.duracion, mezcla, grabados, args.llegadas, args.semilla)
+    puerto = _puerto_libre()
+    entorno = dict(
+        os.environ,
+        PYTHONPATH=str(RAIZ),
+        TELEGRAM_API_URL=telegram.url,
+        TELEGRAM_TOKEN="123456:CARGA",
+        FOOTBALL_DATA_URL=futbol.url,
+        WEBHOOK_COLA_MAX=str(max(1000, len(plan))),
+    )
+    try:
+        with tempfile.TemporaryDirectory(prefix="carga_bot_") as tmp:
+            comando = [sys.executable, "-m", "gunicorn", "-w", str(args.workers), "-b", f"127.0.0.1:{puerto}",
+                       "--log-level", "warning", *MODOS[args.modo]]
+            proceso = subprocess.Popen(comando, cwd=tmp, env=entorno,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                _esperar_servidor(puerto, proceso)
+                time.sleep(args.calentamiento)  # deja terminar el calentamiento de cada worker
+
+                cola = queue.Queue()
+                for item in plan:
+                    cola.put(item)
+                for _ in range(args.conexiones):
+                    cola.put(None)
+                t0 = time.perf_counter() + 0.2
+                hilos = [threading.Thread(target=_enviador, args=(puerto, cola, t0, medidor), daemon=True)
+                         for _ in range(args.conexiones)]
+                for h in hilos:
+                    h.start()
+                for h in hilos:
+                    h.join()
+
+                limite = time.monotonic() + args.timeout
+                while medidor.pendientes and time.monotonic() < limite:
+                    time.sleep(0.05)
+            finally:
+                proceso.terminate()
+                proceso.wait(15)
+    finally:
+        telegram.detener()
+        futbol.detener()
+
+    with medidor.lock:
+        sin_respuesta = len(medidor.pendientes)
+        if sin_respuesta:
+            medidor.errores["sin_respuesta"] += sin_respuesta
+        fin = medidor.ultima_respuesta or time.perf_counter()
+    respondidos = sum(len(v) for v in medidor.latencias.values())
+    todas = [x for v in medidor.latencias.values() for x in v]
+    return {
+        "modo": args.modo,
+        "workers": args.workers,
+        "tasa_objetivo": args.tasa,
+        "duracion_s": args.duracion,
+        "enviados": len(plan),
+        "respondidos": respondidos,
+        "throughput_rps": round(respondidos / (fin - t0), 1) if fin > t0 else None,
+        "latencia_ms": {"p50": _percentil(todas, 0.50), "p95": _percentil(todas, 0.95), "p99": _percentil(todas, 0.99)},
+        "por_comando": {
+            etiqueta: {
+                "enviados": medidor.enviados[etiqueta],
+                "respondidos": len(medidor.latencias[etiqueta]),
+                "p50_ms": _percentil(medidor.latencias[etiqueta], 0.50),
+                "p95_ms": _percentil(medidor.latencias[etiqueta], 0.95),
+                "p99_ms": _percentil(medidor.latencias[etiqueta], 0.99),
+            }
+            for etiqueta in sorted(medidor.enviados)
+        },
+        "errores": dict(medidor.errores),
+        "telegram_falso": {"429": telegram.respuestas_429, "500": telegram.respuestas_500},
+        "futbol_falso": {"peticiones": dict(futbol.peticiones), "errores": dict(futbol.errores)},
+    }
+
+
+def imprimir(r):
+    print(f"📊 {r['modo']}×{r['workers']} | {r['enviados']} updates a {r['tasa_objetivo']}/s durante "
+          f"{r['duracion_s']} s → {r['respondidos']} respondidos, {r['throughput_rps']} resp/s")
+    lat = r["latencia_ms"]
+    print(f"   global       p50 {lat['p50']} ms | p95 {lat['p95']} ms | p99 {lat['p99']} ms")
+    for etiqueta, c in r["por_comando"].items():
+        print(f"   {etiqueta:<12} p50 {c['p50_ms']} ms | p95 {c['p95_ms']} ms | p99 {c['p99_ms']} ms "
+              f"({c['respondidos']}/{c['enviados']})")
+    print(f"   {'✅' if not r['errores'] else '⚠️'} errores: {r['errores'] or 'ninguno'} | "
+          f"Telegram falso {r['telegram_falso']} | football-data falso {r['futbol_falso']['errores'] or {}}")
+
+
+def _mezcla(texto):
+    """'predecir=5,picks=3,voz=2' → pesos."""
+    pesos = {}
+    for parte in texto.split(","):
+        comando, _, peso = parte.partition("=")
+        if comando.strip() not in MEZCLA_DEFECTO:
+            raise argparse.ArgumentTypeError(f"Comando desconocido: {comando}")
+        pesos[comando.strip()] = float(peso or 1)
+    return pesos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga del bot completo contra APIs falsas")
+    parser.add_argument("--modo", choices=list(MODOS), default="asgi")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--tasa", type=float, default=20, help="Updates por segundo")
+    parser.add_argument("--duracion", type=float, default=15, help="Segundos de carga")
+    parser.add_argument("--llegadas", choices=["poisson", "uniforme"], default="poisson")
+    parser.add_argument("--mezcla", type=_mezcla, default=MEZCLA_DEFECTO, help="p. ej. predecir=5,picks=3,voz=2")
+    parser.add_argument("--grabados", default=None, help="JSONL de updates grabados a reproducir")
+    parser.add_argument("--conexiones", type=int, default=32, help="Conexiones HTTP concurrentes del cliente")
+    parser.add_argument("--latencia-telegram-ms", type=float, default=30.0)
+    parser.add_argument("--latencia-futbol-ms", type=float, default=80.0)
+    parser.add_argument("--telegram-429", type=float, default=0.0)
+    parser.add_argument("--telegram-500", type=float, default=0.0)
+    parser.add_argument("--futbol-500", type=float, default=0.0)
+    parser.add_argument("--futbol-429", type=float, default=0.0)
+    parser.add_argument("--calentamiento", type=float, default=4.0, help="Segundos de espera antes de cargar")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Espera máxima de respuestas pendientes")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", default=None, help="Ruta JSON para guardar el reporte")
+    args = parser.parse_args()
+
+    grabados = cargar_grabados(args.grabados) if args.grabados else None
+    r = ejecutar(args, args.mezcla, grabados)
+    imprimir(r)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(r, f, indent=2, ensure_ascii=False)
+        print(f"💾 Reporte guardado en {args.salida}")
+    return r
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# tools/carga_difusion.py
+"""
+Prueba de la difusión de picks contra el Bot API falso.
+
+En un directorio temporal registra N suscriptores (free y premium, algunos
+con el bot bloqueado), levanta tools/fake_telegram.py con límite global y
+429 aleatorios, corta la difusión a mitad (como un reinicio), la reanuda
+desde el checkpoint y verifica:
+  - cada chat activo recibió exactamente un mensaje
+  - los chats bloqueados quedaron dados de baja
+  - nunca se superó el límite global del Bot API
+
+Uso:  python -m tools.carga_difusion --suscriptores 2000 --tasa 25 --limite-global 30
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+import tempfile
+
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+from tools.fake_telegram import FakeTelegram
+
+
+async def _ejecutar(args, fake):
+    from telegram_bot import difusion
+    from services.suscriptores_service import suscribir, obtener_suscriptores
+
+    for chat_id in range(1, args.suscriptores + 1):
+        suscribir(chat_id, "premium" if chat_id % 5 == 0 else "free")
+
+    bot = Bot("123456:DIFUSION", base_url=f"{fake.url}/bot",
+              request=HTTPXRequest(connection_pool_size=difusion.N_ENVIADORES + 4))
+    async with bot:
+        # Primera pasada: se para a mitad, como en un reinicio ordenado
+        tarea = asyncio.create_task(difusion.difundir_picks(bot))
+        while fake.envios < args.suscriptores // 2:
+            await asyncio.sleep(0.05)
+        difusion.detener_difusion(list(difusion._activas)[-1])
+        parcial = await tarea
+        corte = fake.envios
+        print(f"⏸️ {parcial}")
+        print(f"✂️ Difusión cortada tras {corte} envíos")
+
+        difusion._activas.clear()
+        final = await difusion.difundir_picks(bot)
+
+    activos = set(obtener_suscriptores())
+    return corte, final, activos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Difusión de picks contra un Bot API falso")
+    parser.add_argument("--suscriptores", type=int, default=2000)
+    parser.add_argument("--tasa", type=float, default=25, help="Mensajes/s del limitador global")
+    parser.add_argument("--limite-global", type=int, default=30, help="Límite del Bot API falso (msg/s)")
+    parser.add_argument("--tasa-429", type=float, default=0.005)
+    parser.add_argument("--bloqueados", type=int, default=20)
+    args = parser.parse_args()
+
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, raiz)
+    os.environ["DIFUSION_TASA_GLOBAL"] = str(args.tasa)
+
+    bloqueados = set(range(7, 7 * args.bloqueados + 1, 7))
+    fake = FakeTelegram(limite_global=args.limite_global, limite_por_chat=1.0,
+                        chats_bloqueados=bloqueados, tasa_429=args.tasa_429).iniciar()
+    with tempfile.TemporaryDirectory(prefix="difusion_") as tmp:
+        os.chdir(tmp)
+        try:
+            corte, final, activos = asyncio.run(_ejecutar(args, fake))
+        finally:
+            fake.detener()
+
+    esperados = set(range(1, args.suscriptores + 1)) - bloqueados
+    duplicados = {c: n for c, n in fake.por_chat.items() if n > 1}
+    faltantes = esperados - set(fake.por_chat)
+    ok = not duplicados and not faltantes and not (activos & bloqueados) and not fake.excesos_limite
+
+    print(f"📊 {final}")
+    print(f"   429 recibidos: {fake.respuestas_429} | 403 recibidos: {fake.respuestas_403}")
+    print(f"   {'✅' if not fake.excesos_limite else '❌'} envíos por encima del límite del Bot API: {fake.excesos_limite}")
+    print(f"   {'✅' if not faltantes else '❌'} faltantes: {len(faltantes)}")
+    print(f"   {'✅' if not duplicados else '❌'} duplicados: {len(duplicados)}")
+    print(f"   {'✅' if not (activos & bloqueados) else '❌'} bloqueados dados de baja: "
+          f"{len(bloqueados - activos)}/{len(bloqueados)}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+# tools/carga_webhook.py
+"""
+Prueba de carga del webhook: compara los dos modos de servicio.
+
+  wsgi → gunicorn -k gthread  telegram_bot.main_bot:app       (Flask + cola + loop propio)
+  asgi → gunicorn -k uvicorn.workers.UvicornWorker telegram_bot.main_bot:asgi_app
+
+Para cada modo levanta el servidor en un directorio temporal (su propio data/),
+lo apunta a un Bot API falso (tools/fake_telegram.py), envía updates /start
+con C conexiones concurrentes y mide:
+  - req/s y latencia p50/p99 de la respuesta HTTP del webhook
+  - req/s extremo a extremo (hasta que el Bot API falso recibió todas las respuestas)
+
+En los dos modos el webhook responde al encolar (la cola acotada procesa
+después), por eso se reportan ambas cifras.
+
+Con --workers 1 2 4 se repite cada modo con ese número de workers de
+gunicorn, para ver cómo escala el throughput.
+
+Con --reintentos F una fracción F de los updates se reenvía (como hace
+Telegram si el webhook tarda): cada update debe entregarse una sola vez.
+
+Uso:  python -m tools.carga_webhook --updates 2000 --concurrencia 32 --latencia-ms 20 --workers 1 2
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from pathlib import Path
+
+from tools.fake_telegram import FakeTelegram
+
+RAIZ = Path(__file__).resolve().parent.parent
+_lock_estados = threading.Lock()
+
+MODOS = {
+    "wsgi": ["-k", "gthread", "--threads", "8", "telegram_bot.main_bot:app"],
+    "asgi": ["-k", "uvicorn.workers.UvicornWorker", "telegram_bot.main_bot:asgi_app"],
+}
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _update(update_id):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": 1000 + update_id % 50, "type": "private"},
+            "from": {"id": 1000 + update_id % 50, "is_bot": False, "first_name": "Carga"},
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    }
+
+
+def _esperar_servidor(puerto, proceso, timeout=60):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError("El servidor terminó antes de arrancar.")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", puerto, timeout=2)
+            conn.request("GET", "/")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("El servidor no respondió a tiempo.")
+
+
+def _cliente(puerto, ids, latencias, estados):
+    conn = http.client.HTTPConnection("127.0.0.1", puerto, timeout=30)
+    for update_id in ids:
+        cuerpo = json.dumps(_update(update_id))
+        t0 = time.perf_counter()
+        conn.request("POST", "/webhook", body=cuerpo, headers={"Content-Type": "application/json"})
+        respuesta = conn.getresponse()
+        respuesta.read()
+        latencias.append(time.perf_counter() - t0)
+        with _lock_estados:
+            estados[respuesta.status] = estados.get(respuesta.status, 0) + 1
+    conn.close()
+
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    valores = sorted(valores)
+    return round(valores[min(len(valores) - 1, int(p * len(valores)))] * 1000, 1)
+
+
+def medir_modo(modo, n_updates, concurrencia, fake, workers=1, reintentos=0.0, timeout_entrega=120):
+    puerto = _puerto_libre()
+    entorno = dict(
+        os.environ,
+        PYTHONPATH=str(RAIZ),
+        TELEGRAM_API_URL=fake.url,
+        TELEGRAM_TOKEN="123456:CARGA",
+        WEBHOOK_COLA_MAX=str(max(1000, n_updates)),
+    )
+    with tempfile.TemporaryDirectory(prefix=f"carga_{modo}_") as tmp:
+        comando = [sys.executable, "-m", "gunicorn", "-w", str(workers), "-b", f"127.0.0.1:{puerto}",
+                   "--log-level", "warning", *MODOS[modo]]
+        proceso = subprocess.Popen(comando, cwd=tmp, env=entorno,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            _esperar_servidor(puerto, proceso)
+            # Calentamiento: arranca el loop de PTB (en wsgi, uno por worker)
+            # (ids negativos distintos: un id repetido lo descartaría el deduplicador)
+            _cliente(puerto, list(range(-2 * workers, 0)), [], {})
+            time.sleep(0.5)
+
+            envios_inicio = fake.envios
+            latencias, estados = [], {}
+            bloques = [list(range(1 + i, n_updates + 1, concurrencia)) for i in range(concurrencia)]
+            # Reintentos simulados de Telegram: una fracción de ids se reenvía por otra conexión
+            cada = int(1 / reintentos) if reintentos else 0
+            for i, bloque in enumerate(bloques):
+                if cada:
+                    bloques[(i + 1) % concurrencia].extend(bloque[::cada])
+            n_peticiones = sum(len(b) for b in bloques)
+            hilos = [threading.Thread(target=_cliente, args=(puerto, b, latencias, estados)) for b in bloques]
+            t0 = time.perf_counter()
+            for h in hilos:
+                h.start()
+            for h in hilos:
+                h.join()
+            t_http = time.perf_counter() - t0
+
+            aceptados = estados.get(200, 0) - (n_peticiones - n_updates)
+            limite = time.monotonic() + timeout_entrega
+            while fake.envios - envios_inicio < aceptados and time.monotonic() < limite:
+                time.sleep(0.01)
+            t_total = time.perf_counter() - t0
+            if cada:
+                time.sleep(1.0)  # margen para que aparezca cualquier entrega duplicada
+            entregados = fake.envios - envios_inicio
+        finally:
+            proceso.terminate()
+            proceso.wait(15)
+
+    return {
+        "modo": modo,
+        "workers": workers,
+        "updates": n_updates,
+        "concurrencia": concurrencia,
+        "estados": estados,
+        "peticiones": n_peticiones,
+        "rps_http": round(n_peticiones / t_http, 1),
+        "p50_ms": _percentil(latencias, 0.50),
+        "p99_ms": _percentil(latencias, 0.99),
+        "entregados": entregados,
+        "entregas_duplicadas": max(0, entregados - n_updates),
+        "rps_extremo_a_extremo": round(entregados / t_total, 1) if t_total else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga del webhook: wsgi vs asgi")
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--concurrencia", type=int, default=32)
+    parser.add_argument("--latencia-ms", type=float, default=20.0, help="Latencia simulada del Bot API")
+    parser.add_argument("--modos", nargs="+", default=list(MODOS), choices=list(MODOS))
+    parser.add_argument("--workers", nargs="+", type=int, default=[1])
+    parser.add_argument("--reintentos", type=float, default=0.0,
+                        help="Fracción de updates reenviados (reintentos de Telegram)")
+    parser.add_argument("--salida", default=None, help="Ruta JSON para guardar los resultados")
+    args = parser.parse_args()
+
+    fake = FakeTelegram(latencia_ms=args.latencia_ms).iniciar()
+    resultados = []
+    try:
+        for modo, workers in [(m, w) for m in args.modos for w in args.workers]:
+            print(f"🚦 Midiendo modo {modo} con {workers} worker(s)...")
+            r = medir_modo(modo, args.updates, args.concurrencia, fake, workers, args.reintentos)
+            resultados.append(r)
+            print(
+                f"   {modo}×{workers}: {r['rps_http']} req/s | p50 {r['p50_ms']} ms | p99 {r['p99_ms']} ms "
+                f"| e2e {r['rps_extremo_a_extremo']} req/s ({r['entregados']} entregados, "
+                f"{r['entregas_duplicadas']} duplicados) | {r['estados']}"
+            )
+    finally:
+        fake.detener()
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"💾 Resultados guardados en {args.salida}")
+    return resultados
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+# tools/fake_api_sports.py
+"""
+api-sports (v3.football.api-sports.io) falso que sirve páginas JSON grabadas.
+
+Las grabaciones son archivos <directorio>/fixtures_<liga>_<temporada>_<pagina>.json
+con la respuesta completa de /fixtures (get, parameters, errors, results,
+paging, response). Se pueden generar sintéticas y deterministas
+(grabar_sinteticas, con los equipos de tools/fake_football.py) o grabar de
+la API real con --grabar (consume cuota: una petición por página).
+
+Imita lo que importa a services/ingesta_service.py:
+  - ?league=&season=&page= (sin page es la 1); sin grabación, respuesta vacía
+  - cabeceras x-ratelimit-requests-limit/remaining (cuota diaria) y
+    X-RateLimit-Limit/Remaining (por minuto)
+  - cuota diaria agotada: 200 con errors.requests; sin clave: errors.token
+  - inyección de errores: fracción de 500 (tasa_500) y de 429 (tasa_429)
+El bot se apunta aquí con API_SPORTS_URL=http://127.0.0.1:<puerto>.
+
+Uso suelto:
+    python -m tools.fake_api_sports --sinteticas /tmp/grabaciones --ligas 39 140 --temporadas 2023 2024
+    python -m tools.fake_api_sports --directorio /tmp/grabaciones --puerto 18083 --cuota-dia 100
+    python -m tools.fake_api_sports --grabar /tmp/grabaciones --ligas 39 --temporadas 2023
+"""
+
+import os
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from tools.fake_football import EQUIPOS
+
+
+def _archivo(directorio, liga, temporada, pagina):
+    return os.path.join(directorio, f"fixtures_{liga}_{temporada}_{pagina}.json")
+
+
+# === GRABACIONES === #
+def grabar_sinteticas(directorio, ligas, temporadas, por_pagina=50, pendientes=0, semilla=0) -> int:
+    """
+    Temporadas de ida y vuelta entre los 20 equipos (380 partidos), en
+    páginas de `por_pagina`. En la última temporada los `pendientes`
+    partidos finales quedan sin jugar (NS). Devuelve cuántas páginas escribió.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    escritas = 0
+    for liga in ligas:
+        for temporada in temporadas:
+            azar = random.Random(f"{semilla}-{liga}-{temporada}")
+            ids = list(range(1, len(EQUIPOS) + 1))
+            cruces = [(l, v) for l in ids for v in ids if l != v]
+            azar.shuffle(cruces)
+            inicio = datetime(temporada, 8, 1, 19)
+            sin_jugar = pendientes if temporada == max(temporadas) else 0
+            fixtures = []
+            for n, (local, visitante) in enumerate(cruces):
+                jugado = n < len(cruces) - sin_jugar
+                goles = (azar.randint(0, 4), azar.randint(0, 3)) if jugado else (None, None)
+                fixtures.append({
+                    "fixture": {
+                        "id": liga * 10_000_000 + temporada * 1000 + n,
+                        "date": (inicio + timedelta(hours=n * 12)).isoformat() + "+00:00",
+                        "status": {"short": "FT" if jugado else "NS", "long": "Match Finished" if jugado else "Not Started"},
+                    },
+                    "league": {"id": liga, "name": f"Liga {liga}", "season": temporada, "round": f"Regular Season - {n // 10 + 1}"},
+                    "teams": {
+                        "home": {"id": local, "name": EQUIPOS[local - 1]},
+                        "away": {"id": visitante, "name": EQUIPOS[visitante - 1]},
+                    },
+                    "goals": {"home": goles[0], "away": goles[1]},
+                })
+            total = max((len(fixtures) + por_pagina - 1) // por_pagina, 1)
+            for pagina in range(1, total + 1):
+                trozo = fixtures[(pagina - 1) * por_pagina:pagina * por_pagina]
+                _escribir(directorio, liga, temporada, pagina, {
+                    "get": "fixtures",
+                    "parameters": {"league": str(liga), "season": str(temporada), "page": str(pagina)},
+                    "errors": [],
+                    "results": len(trozo),
+                    "paging": {"current": pagina, "total": total},
+                    "response": trozo,
+                })
+                escritas += 1
+    return escritas
+
+
+def grabar_de_api(directorio, ligas, temporadas, url=None, clave=None) -> int:
+    """Graba las páginas reales de /fixtures (consume cuota). Devuelve cuántas escribió."""
+    import requests
+
+    url = url or os.getenv("API_SPORTS_URL", "https://v3.football.api-sports.io")
+    headers = {"x-apisports-key": clave or os.getenv("API_SPORTS_KEY", os.getenv("API_KEY", ""))}
+    os.makedirs(directorio, exist_ok=True)
+    escritas = 0
+    for liga in ligas:
+        for temporada in temporadas:
+            pagina, total = 1, 1
+            while pagina <= total:
+                params = {"league": liga, "season": temporada}
+                if pagina > 1:
+                    params["page"] = pagina
+                datos = requests.get(f"{url}/fixtures", params=params, headers=headers, timeout=30).json()
+                if datos.get("errors"):
+                    raise RuntimeError(f"api-sports: {datos['errors']}")
+                _escribir(directorio, liga, temporada, pagina, datos)
+                escritas += 1
+                total = max(int((datos.get("paging") or {}).get("total") or 1), 1)
+                pagina += 1
+    return escritas
+
+
+def _escribir(directorio, liga, temporada, pagina, datos):
+    with open(_archivo(directorio, liga, temporada, pagina), "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False)
+
+
+# === SERVIDOR === #
+class FakeApiSports:
+    def __init__(self, directorio, puerto=0, latencia_ms=0.0, cuota_dia=100, por_minuto=0,
+                 tasa_500=0.0, tasa_429=0.0, semilla=0):
+        self.directorio = directorio
+        self.latencia = latencia_ms / 1000
+        self.cuota_dia = cuota_dia
+        self.por_minuto = por_minuto  # 0 = sin límite por minuto
+        self.tasa_500 = tasa_500
+        self.tasa_429 = tasa_429
+        self.usadas = 0
+        self.peticiones = Counter()  # (liga, temporada, página) → peticiones recibidas
+        self.servidas = Counter()    # (liga, temporada, página) → respuestas 200 con datos
+        self.errores = Counter()     # 500 / 429 / "requests" / "rateLimit" / "token" → veces
+        self._minuto = []
+        self._azar = random.Random(semilla)
+        self._lock = threading.Lock()
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+                ruta, _, consulta = self.path.partition("?")
+                status, cabeceras, respuesta = servidor._responder(
+                    ruta, parse_qs(consulta), self.headers.get("x-apisports-key"))
+                cuerpo = json.dumps(respuesta).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                for clave, valor in cabeceras.items():
+                    self.send_header(clave, str(valor))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", puerto), Handler)
+        self._http.daemon_threads = True
+        self._http.handle_error = lambda request, client_address: None
+        self.puerto = self._http.server_address[1]
+        self.url = f"http://127.0.0.1:{self.puerto}"
+
+    def reiniciar_cuota(self, cuota_dia=None):
+        """Simula el cambio de día."""
+        with self._lock:
+            self.usadas = 0
+            if cuota_dia is not None:
+                self.cuota_dia = cuota_dia
+
+    def _responder(self, ruta, consulta, clave):
+        parametros = {k: v[0] for k, v in consulta.items()}
+        base = {"get": ruta.strip("/"), "parameters": parametros, "results": 0,
+                "paging": {"current": 1, "total": 1}, "response": []}
+        with self._lock:
+            if not clave:
+                self.errores["token"] += 1
+                return 200, {}, dict(base, errors={"token": "Error/Missing application key."})
+            ahora = time.monotonic()
+            self._minuto = [t for t in self._minuto if ahora - t < 60]
+            if self.por_minuto and len(self._minuto) >= self.por_minuto:
+                self.errores["rateLimit"] += 1
+                return 200, self._cabeceras(), dict(base, errors={"rateLimit": "Too many requests. Your rate limit is "
+                                                                               f"{self.por_minuto} requests per minute."})
+            if self.usadas >= self.cuota_dia:
+                self.errores["requests"] += 1
+                return 200, self._cabeceras(), dict(base, errors={
+                    "requests": "You have reached the request limit for the day, Go to "
+                                "https://dashboard.api-football.com to upgrade your plan."})
+            self.usadas += 1
+            self._minuto.append(ahora)
+            cabeceras = self._cabeceras()
+            sorteo = self._azar.random()
+            if sorteo < self.tasa_500:
+                self.errores[500] += 1
+                return 500, cabeceras, {"message": "Internal error (inyectado)"}
+            if sorteo < self.tasa_500 + self.tasa_429:
+                self.errores[429] += 1
+                return 429, dict(cabeceras, **{"Retry-After": 0}), {"message": "Too Many Requests"}
+
+        if ruta.rstrip("/") != "/fixtures":
+            return 404, cabeceras, dict(base, errors={"endpoint": "This endpoint do not exist."})
+        try:
+            llave = (int(parametros["league"]), int(parametros["season"]), int(parametros.get("page", 1)))
+        except (KeyError, ValueError):
+            return 200, cabeceras, dict(base, errors={"required": "At least one parameter is required."})
+        with self._lock:
+            self.peticiones[llave] += 1
+        try:
+            with open(_archivo(self.directorio, *llave), encoding="utf-8") as f:
+                datos = json.load(f)
+        except FileNotFoundError:
+            return 200, cabeceras, dict(base, errors=[])
+        with self._lock:
+            self.servidas[llave] += 1
+        return 200, cabeceras, datos
+
+    def _cabeceras(self):
+        return {
+            "x-ratelimit-requests-limit": self.cuota_dia,
+            "x-ratelimit-requests-remaining": max(self.cuota_dia - self.usadas, 0),
+            "X-RateLimit-Limit": self.por_minuto or 300,
+            "X-RateLimit-Remaining": (self.por_minuto - len(self._minuto)) if self.por_minuto else 300,
+        }
+
+    def iniciar(self):
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+        return self
+
+    def detener(self):
+        self._http.shutdown()
+        self._http.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="api-sports falso con páginas grabadas")
+    parser.add_argument("--directorio", help="Directorio de grabaciones a servir")
+    parser.add_argument("--sinteticas", metavar="DIR", help="Genera grabaciones sintéticas en DIR y sale")
+    parser.add_argument("--grabar", metavar="DIR", help="Graba páginas de la API real en DIR y sale")
+    parser.add_argument("--ligas", type=int, nargs="+", default=[39])
+    parser.add_argument("--temporadas", type=int, nargs="+", default=[2024])
+    parser.add_argument("--por-pagina", type=int, default=50)
+    parser.add_argument("--pendientes", type=int, default=0)
+    parser.add_argument("--puerto", type=int, default=18083)
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    parser.add_argument("--cuota-dia", type=int, default=100)
+    parser.add_argument("--por-minuto", type=int, default=0)
+    parser.add_argument("--tasa-500", type=float, default=0.0)
+    parser.add_argument("--tasa-429", type=float, default=0.0)
+    args = parser.parse_args()
+    if args.sinteticas:
+        n = grabar_sinteticas(args.sinteticas, args.ligas, args.temporadas, args.por_pagina, args.pendientes)
+        print(f"💾 {n} páginas sintéticas en {args.sinteticas}")
+    elif args.grabar:
+        n = grabar_de_api(args.grabar, args.ligas, args.temporadas)
+        print(f"💾 {n} páginas grabadas de la API en {args.grabar}")
+    elif args.directorio:
+        fake = FakeApiSports(args.directorio, args.puerto, args.latencia_ms, args.cuota_dia, args.por_minuto,
+                             args.tasa_500, args.tasa_429).iniciar()
+        print(f"⚽ api-sports falso en {fake.url} sirviendo {args.directorio} (cuota {args.cuota_dia}/día)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            fake.detener()
+    else:
+        parser.error("indica --directorio, --sinteticas o --grabar")
@@ -0,0 +1,167 @@
+# tools/fake_football.py
+"""
+football-data.org falso para pruebas de carga locales.
+
+Sirve las rutas que usa el bot (/v4/teams, /v4/teams/<id>/matches,
+/v4/matches) con equipos y partidos terminados deterministas (o, con
+status=SCHEDULED, una jornada programada para hoy), tras una
+latencia configurable. Inyección de errores: una fracción de respuestas 500
+(tasa_500) y de 429 (tasa_429, como la cuota del plan gratuito).
+El bot se apunta aquí con FOOTBALL_DATA_URL=http://127.0.0.1:<puerto>/v4.
+
+Uso suelto:  python -m tools.fake_football --puerto 18082 --latencia-ms 80
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+EQUIPOS = [
+    "Real Madrid", "Barcelona", "Atletico Madrid", "Sevilla", "Valencia",
+    "Villarreal", "Real Sociedad", "Athletic Club", "Real Betis", "Girona",
+    "Manchester City", "Arsenal", "Liverpool", "Chelsea", "Tottenham",
+    "Bayern Munich", "Borussia Dortmund", "Juventus", "Inter", "Milan",
+]
+PARTIDOS_POR_EQUIPO = 10
+
+
+def _partidos(semilla=0):
+    """Partidos terminados de cada equipo (id de equipo → lista), deterministas."""
+    azar = random.Random(semilla)
+    inicio = datetime(2025, 8, 1)
+    por_equipo = {i: [] for i in range(1, len(EQUIPOS) + 1)}
+    todos = []
+    partido_id = 1000
+    for local in por_equipo:
+        for _ in range(PARTIDOS_POR_EQUIPO):
+            visitante = azar.choice([e for e in por_equipo if e != local])
+            goles_l, goles_v = azar.randint(0, 4), azar.randint(0, 3)
+            partido_id += 1
+            partido = {
+                "id": partido_id,
+                "utcDate": (inicio + timedelta(days=partido_id - 1000)).isoformat() + "Z",
+                "status": "FINISHED",
+                "homeTeam": {"id": local, "name": EQUIPOS[local - 1]},
+                "awayTeam": {"id": visitante, "name": EQUIPOS[visitante - 1]},
+                "score": {
+                    "winner": "HOME_TEAM" if goles_l > goles_v else "AWAY_TEAM" if goles_v > goles_l else "DRAW",
+                    "fullTime": {"home": goles_l, "away": goles_v},
+                },
+            }
+            por_equipo[local].append(partido)
+            por_equipo[visitante].append(partido)
+            todos.append(partido)
+    return por_equipo, todos
+
+
+def _jornada_de_hoy(semilla=0):
+    """Los 20 equipos emparejados en 10 partidos programados para hoy."""
+    ids = list(range(1, len(EQUIPOS) + 1))
+    random.Random(semilla).shuffle(ids)
+    hoy = datetime.utcnow().replace(hour=19, minute=0, second=0, microsecond=0)
+    return [
+        {
+            "id": 900000 + n,
+            "utcDate": hoy.isoformat() + "Z",
+            "status": "TIMED",
+            "competition": {"name": "Liga de prueba"},
+            "homeTeam": {"id": local, "name": EQUIPOS[local - 1]},
+            "awayTeam": {"id": visitante, "name": EQUIPOS[visitante - 1]},
+            "score": {"winner": None, "fullTime": {"home": None, "away": None}},
+        }
+        for n, (local, visitante) in enumerate(zip(ids[::2], ids[1::2]))
+    ]
+
+
+class FakeFootballData:
+    def __init__(self, puerto=0, latencia_ms=0.0, tasa_500=0.0, tasa_429=0.0, semilla=0):
+        self.latencia = latencia_ms / 1000
+        self.tasa_500 = tasa_500
+        self.tasa_429 = tasa_429
+        self.peticiones = Counter()  # ruta (sin ids) → peticiones
+        self.errores = Counter()     # código de error inyectado → veces
+        self._por_equipo, self._todos = _partidos(semilla)
+        self._jornada = _jornada_de_hoy(semilla)
+        self._azar = random.Random(semilla)
+        self._lock = threading.Lock()
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+                ruta, _, consulta = self.path.partition("?")
+                status, respuesta = servidor._responder(ruta, consulta)
+                cuerpo = json.dumps(respuesta).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", puerto), Handler)
+        self._http.daemon_threads = True
+        self._http.handle_error = lambda request, client_address: None
+        self.puerto = self._http.server_address[1]
+        self.url = f"http://127.0.0.1:{self.puerto}/v4"
+
+    def _responder(self, ruta, consulta=""):
+        partes = ruta.strip("/").split("/")  # ["v4", "teams", "<id>", "matches"]
+        clave = "/".join("<id>" if p.isdigit() else p for p in partes)
+        with self._lock:
+            self.peticiones[clave] += 1
+            sorteo = self._azar.random()
+            if sorteo < self.tasa_500:
+                self.errores[500] += 1
+                return 500, {"message": "Internal error (inyectado)"}
+            if sorteo < self.tasa_500 + self.tasa_429:
+                self.errores[429] += 1
+                return 429, {"message": "You reached your request limit.", "errorCode": 429}
+
+        if clave == "v4/teams":
+            equipos = [{"id": i, "name": n, "shortName": n} for i, n in enumerate(EQUIPOS, 1)]
+            return 200, {"count": len(equipos), "teams": equipos}
+        if clave == "v4/teams/<id>/matches":
+            partidos = self._por_equipo.get(int(partes[2]))
+            if partidos is None:
+                return 404, {"message": "The resource you are looking for does not exist."}
+            return 200, {"matches": partidos[-PARTIDOS_POR_EQUIPO:]}
+        if clave == "v4/matches":
+            if "SCHEDULED" in consulta:
+                return 200, {"matches": self._jornada}
+            return 200, {"matches": self._todos[-50:]}
+        return 404, {"message": "Not found"}
+
+    def iniciar(self):
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+        return self
+
+    def detener(self):
+        self._http.shutdown()
+        self._http.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="football-data.org falso")
+    parser.add_argument("--puerto", type=int, default=18082)
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    parser.add_argument("--tasa-500", type=float, default=0.0)
+    parser.add_argument("--tasa-429", type=float, default=0.0)
+    args = parser.parse_args()
+    fake = FakeFootballData(args.puerto, args.latencia_ms, args.tasa_500, args.tasa_429).iniciar()
+    print(f"⚽ football-data falso en {fake.url} (latencia {args.latencia_ms} ms)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.detener()
@@ -0,0 +1,172 @@
+# tools/fake_telegram.py
+"""
+Bot API de Telegram falso para pruebas de carga locales.
+
+Responde getMe / setWebhook y cualquier send* con un mensaje válido tras una
+latencia configurable, y cuenta los envíos recibidos (en total y por chat).
+El bot se apunta aquí con TELEGRAM_API_URL=http://127.0.0.1:<puerto>.
+
+Opcionalmente imita los límites de Telegram:
+  - limite_global: más de N send* por segundo → 429 con retry_after
+  - limite_por_chat: menos de S segundos entre mensajes al mismo chat → 429
+  - chats_bloqueados: 403 "bot was blocked by the user"
+  - tasa_429: fracción de envíos que reciben 429 al azar
+  - tasa_500: fracción de envíos que reciben 500 (error del servidor)
+
+al_enviar(chat_id, metodo), si se da, se llama con cada envío aceptado: las
+pruebas de carga lo usan para medir la latencia extremo a extremo.
+
+Uso suelto:  python -m tools.fake_telegram --puerto 18081 --latencia-ms 50
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter, deque
+from urllib.parse import parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+BOT_ME = {
+    "id": 1,
+    "is_bot": True,
+    "first_name": "Neurobet",
+    "username": "neurobet_test_bot",
+    "can_join_groups": True,
+    "can_read_all_group_messages": False,
+    "supports_inline_queries": False,
+}
+
+
+def _chat_id(crudo: bytes, content_type: str):
+    """chat_id de un send*: PTB lo manda como JSON o como formulario."""
+    try:
+        if "json" in content_type:
+            valor = json.loads(crudo or b"{}").get("chat_id")
+        else:
+            valor = (parse_qs(crudo.decode("utf-8", "ignore")).get("chat_id") or [None])[0]
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+class FakeTelegram:
+    def __init__(self, puerto=0, latencia_ms=0.0, limite_global=None, limite_por_chat=None,
+                 chats_bloqueados=(), tasa_429=0.0, retry_after=1, tasa_500=0.0, al_enviar=None, semilla=0):
+        self.latencia = latencia_ms / 1000
+        self.limite_global = limite_global
+        self.limite_por_chat = limite_por_chat
+        self.chats_bloqueados = set(chats_bloqueados)
+        self.tasa_429 = tasa_429
+        self.retry_after = retry_after
+        self.tasa_500 = tasa_500
+        self.al_enviar = al_enviar
+        self.envios = 0
+        self.por_chat = Counter()
+        self.respuestas_429 = 0
+        self.excesos_limite = 0     # 429 por superar límites (no los aleatorios)
+        self.respuestas_403 = 0
+        self.respuestas_500 = 0
+        self._recientes = deque()   # instantes de los envíos del último segundo
+        self._ultimo_por_chat = {}
+        self._azar = random.Random(semilla)
+        self._lock = threading.Lock()
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                crudo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                metodo = self.path.rsplit("/", 1)[-1].lower()
+                if metodo == "getme":
+                    respuesta = {"ok": True, "result": BOT_ME}
+                elif metodo.startswith("send"):
+                    if servidor.latencia:
+                        time.sleep(servidor.latencia)
+                    respuesta = servidor._enviar(_chat_id(crudo, self.headers.get("Content-Type", "")), metodo)
+                else:
+                    respuesta = {"ok": True, "result": True}
+                cuerpo = json.dumps(respuesta).encode()
+                self.send_response(200 if respuesta["ok"] else respuesta["error_code"])
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", puerto), Handler)
+        self._http.daemon_threads = True
+        # Los clientes cierran conexiones keep-alive al apagarse: no es un error
+        self._http.handle_error = lambda request, client_address: None
+        self.puerto = self._http.server_address[1]
+        self.url = f"http://127.0.0.1:{self.puerto}"
+
+    def _enviar(self, chat_id, metodo="sendmessage"):
+        """Aplica los límites simulados y registra el envío si pasa."""
+        ahora = time.monotonic()
+        with self._lock:
+            if chat_id in self.chats_bloqueados:
+                self.respuestas_403 += 1
+                return {"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"}
+            if self.tasa_500 and self._azar.random() < self.tasa_500:
+                self.respuestas_500 += 1
+                return {"ok": False, "error_code": 500, "description": "Internal Server Error"}
+            while self._recientes and ahora - self._recientes[0] > 1:
+                self._recientes.popleft()
+            excede_global = self.limite_global is not None and len(self._recientes) >= self.limite_global
+            excede_chat = (
+                self.limite_por_chat is not None
+                and ahora - self._ultimo_por_chat.get(chat_id, -1e9) < self.limite_por_chat
+            )
+            if excede_global or excede_chat:
+                self.excesos_limite += 1
+            if excede_global or excede_chat or (self.tasa_429 and self._azar.random() < self.tasa_429):
+                self.respuestas_429 += 1
+                return {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                }
+            self._recientes.append(ahora)
+            self._ultimo_por_chat[chat_id] = ahora
+            self.envios += 1
+            self.por_chat[chat_id] += 1
+            message_id = self.envios
+        if self.al_enviar:
+            self.al_enviar(chat_id, metodo)
+        return {
+            "ok": True,
+            "result": {"message_id": message_id, "date": int(time.time()),
+                       "chat": {"id": chat_id, "type": "private"}, "text": "ok"},
+        }
+
+    def iniciar(self):
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+        return self
+
+    def detener(self):
+        self._http.shutdown()
+        self._http.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bot API de Telegram falso")
+    parser.add_argument("--puerto", type=int, default=18081)
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    parser.add_argument("--limite-global", type=int, default=None, help="Máximo de send*/s antes de responder 429")
+    parser.add_argument("--tasa-429", type=float, default=0.0)
+    parser.add_argument("--tasa-500", type=float, default=0.0)
+    args = parser.parse_args()
+    fake = FakeTelegram(args.puerto, args.latencia_ms, limite_global=args.limite_global,
+                        tasa_429=args.tasa_429, tasa_500=args.tasa_500).iniciar()
+    print(f"🤖 Bot API falso en {fake.url} (latencia {args.latencia_ms} ms)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.detener()
@@ -0,0 +1,100 @@
+# tools/martillo_almacen.py
+"""
+Martilla los almacenes JSON desde varios procesos a la vez y verifica que
+no se pierde ninguna escritura (ver services/almacen_json.py).
+
+Cada proceso hace N operaciones de leer-modificar-escribir sobre:
+  - historial de predicciones  (evaluacion_service.registrar_prediccion)
+  - apuestas de un usuario común (apuestas_service.registrar_apuesta)
+  - memoria global             (memoria_service.guardar_evento_global)
+  - un contador JSON           (almacen_json.transaccion_json)
+y además compite por el liderazgo de un trabajo de fondo: debe ganar uno solo.
+
+Todo se ejecuta en un directorio temporal.
+
+Uso:  python -m tools.martillo_almacen --procesos 8 --operaciones 50
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing as mp
+
+USUARIO = 4242
+
+
+def _trabajador(numero, operaciones, barrera, cola):
+    from services import almacen_json, memoria_service
+    from services.evaluacion_service import registrar_prediccion
+    from services.apuestas_service import registrar_apuesta
+
+    memoria_service.GLOBAL_FILE = os.path.join("data", "memoria_global.json")
+    barrera.wait()
+
+    es_lider = almacen_json.adquirir_lider("martillo")
+    for i in range(operaciones):
+        registrar_prediccion(f"Local{numero}", f"Visita{i}", "Empate", 50.0)
+        registrar_apuesta(USUARIO, f"P{numero}-{i}", "1X2", "1.9", 10.0)
+        memoria_service.guardar_evento_global(f"proc{numero}", "martillo", {"i": i})
+        with almacen_json.transaccion_json(os.path.join("data", "contador.json")) as contador:
+            contador["n"] = contador.get("n", 0) + 1
+    cola.put(es_lider)
+    # Mantener el lock de líder hasta que todos hayan intentado adquirirlo
+    barrera.wait()
+
+
+def martillar(procesos, operaciones):
+    from services.almacen_json import leer_json
+
+    contexto = mp.get_context("fork")
+    barrera = contexto.Barrier(procesos)
+    cola = contexto.Queue()
+    hijos = [contexto.Process(target=_trabajador, args=(n, operaciones, barrera, cola)) for n in range(procesos)]
+    inicio = time.perf_counter()
+    for h in hijos:
+        h.start()
+    lideres = sum(1 for _ in hijos if cola.get())
+    for h in hijos:
+        h.join()
+    segundos = time.perf_counter() - inicio
+
+    esperado = procesos * operaciones
+    historial = leer_json(os.path.join("data", "historial_predicciones.json"), list)
+    apuestas = [a for a in leer_json(os.path.join("data", f"apuestas_usuario_{USUARIO}.json"), list)
+                if a.get("tipo") != "config"]
+    eventos = leer_json(os.path.join("data", "memoria_global.json"), dict).get("eventos", [])
+    contador = leer_json(os.path.join("data", "contador.json"), dict).get("n", 0)
+
+    resultado = {
+        "historial": len({h["partido"] for h in historial}),
+        "apuestas": len({a["partido"] for a in apuestas}),
+        "memoria_global": len(eventos),
+        "contador": contador,
+    }
+    ok = all(v == esperado for v in resultado.values()) and lideres == 1
+    print(f"🔨 {procesos} procesos × {operaciones} operaciones en {segundos:.2f}s")
+    for almacen, n in resultado.items():
+        print(f"   {'✅' if n == esperado else '❌'} {almacen}: {n}/{esperado}")
+    print(f"   {'✅' if lideres == 1 else '❌'} líderes: {lideres}/1")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escrituras concurrentes entre procesos sobre data/")
+    parser.add_argument("--procesos", type=int, default=8)
+    parser.add_argument("--operaciones", type=int, default=50)
+    args = parser.parse_args()
+
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, raiz)
+    with tempfile.TemporaryDirectory(prefix="martillo_") as tmp:
+        os.chdir(tmp)
+        os.makedirs("data", exist_ok=True)
+        ok = martillar(args.procesos, args.operaciones)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
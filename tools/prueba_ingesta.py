@@ -0,0 +1,161 @@
+# tools/prueba_ingesta.py
+"""
+Verifica services/ingesta_service.py contra tools/fake_api_sports.py con
+grabaciones sintéticas y bases SQLite temporales, sin tocar la API real.
+
+Escenario:
+  1. la cuota diaria del fake no alcanza: la ingesta se detiene sin error
+     y deja checkpoints a mitad de temporada
+  2. "al día siguiente" se reanuda: ninguna página se vuelve a descargar y
+     cada fixture queda una sola vez en `partidos`
+  3. la temporada en curso (con partidos sin jugar) se refresca entera; al
+     grabarse sus resultados, los upserts los actualizan y queda completa
+  4. con todo completo no se hace ninguna petición
+  5. el modo paralelo (un hilo por liga, 429 inyectados) deja la misma tabla
+
+Uso:  python -m tools.prueba_ingesta --latencia-ms 20
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import logging
+import argparse
+import tempfile
+
+LIGAS = [39, 140, 135]
+TEMPORADAS = [2023, 2024]
+POR_PAGINA = 40
+PENDIENTES = 25
+
+
+def _contenido(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("""
+            SELECT fixture_id, liga_id, temporada, equipo_local, equipo_visitante, fecha, estado,
+                   goles_local, goles_visitante
+            FROM partidos ORDER BY fixture_id
+        """).fetchall()
+    finally:
+        conn.close()
+
+
+def _jugar_pendientes(directorio):
+    """Graba los resultados de los partidos que estaban sin jugar (NS → FT)."""
+    for archivo in os.listdir(directorio):
+        ruta = os.path.join(directorio, archivo)
+        with open(ruta, encoding="utf-8") as f:
+            datos = json.load(f)
+        cambiados = 0
+        for item in datos["response"]:
+            if item["fixture"]["status"]["short"] == "NS":
+                item["fixture"]["status"]["short"] = "FT"
+                item["goals"] = {"home": 1, "away": 1}
+                cambiados += 1
+        if cambiados:
+            with open(ruta, "w", encoding="utf-8") as f:
+                json.dump(datos, f)
+
+
+def probar(latencia_ms):
+    from services import ingesta_service
+    from tools.fake_api_sports import FakeApiSports, grabar_sinteticas
+
+    directorio = tempfile.mkdtemp(prefix="neurobet-ingesta-")
+    grabaciones = os.path.join(directorio, "grabaciones")
+    paginas = grabar_sinteticas(grabaciones, LIGAS, TEMPORADAS, POR_PAGINA, PENDIENTES)
+    por_temporada = paginas // (len(LIGAS) * len(TEMPORADAS))
+    fixtures = len(LIGAS) * len(TEMPORADAS) * 380
+    ingesta_service.ESPERA_BASE = 0.01
+    comprobaciones = []
+
+    def comprobar(nombre, ok, detalle=""):
+        comprobaciones.append(ok)
+        print(f"{'✅' if ok else '❌'} {nombre}{f' ({detalle})' if detalle else ''}")
+
+    fake = FakeApiSports(grabaciones, latencia_ms=latencia_ms, cuota_dia=25).iniciar()
+    ingesta_service.API_SPORTS_URL = fake.url
+    ingesta_service.API_SPORTS_KEY = "clave-de-prueba"
+    db = os.path.join(directorio, "secuencial.db")
+    try:
+        # 1. Cuota insuficiente
+        r = ingesta_service.ingestar(LIGAS, TEMPORADAS, db_path=db, por_minuto=0, reserva=0)
+        cortada = [l for l in r["ligas"] if l["estado"] == "cuota_agotada"]
+        comprobar("se detiene al agotar la cuota", bool(cortada) and not r["completa"],
+                  f"{r['paginas']} páginas, {r['peticiones']} peticiones")
+        checkpoints = ingesta_service.progreso(db)
+        a_medias = [p for p in checkpoints if 0 < p["pagina"] < p["total_paginas"]]
+        comprobar("checkpoint a mitad de temporada", len(a_medias) == 1, str(a_medias[:1]))
+        # Las recorridas enteras con partidos sin jugar sí se vuelven a pedir (refresco)
+        refrescables = {(p["liga_id"], p["temporada"]) for p in checkpoints
+                        if p["pagina"] == p["total_paginas"] and not p["completado"]}
+
+        # 2. Reanudación
+        fake.reiniciar_cuota(1000)
+        r = ingesta_service.ingestar(LIGAS, TEMPORADAS, db_path=db, por_minuto=0, reserva=0)
+        repetidas = {k: n for k, n in fake.servidas.items() if n > 1 and k[:2] not in refrescables}
+        comprobar("reanuda sin repetir páginas", not repetidas and len(fake.servidas) == paginas,
+                  f"{len(fake.servidas)}/{paginas} páginas, repetidas {len(repetidas)}")
+        filas = _contenido(db)
+        comprobar("cada fixture una sola vez", len(filas) == fixtures == len({f[0] for f in filas}),
+                  f"{len(filas)} filas")
+        sin_jugar = sum(1 for f in filas if f[6] == "NS")
+        comprobar("temporada en curso no se da por completa",
+                  sin_jugar == PENDIENTES * len(LIGAS) and not r["completa"], f"{sin_jugar} sin jugar")
+
+        # 3. Refresco de la temporada en curso
+        fake.servidas.clear()
+        _jugar_pendientes(grabaciones)
+        r = ingesta_service.ingestar(LIGAS, TEMPORADAS, db_path=db, por_minuto=0, reserva=0)
+        refrescadas = {k[1] for k in fake.servidas}
+        comprobar("refresca solo la temporada en curso",
+                  refrescadas == {max(TEMPORADAS)} and r["paginas"] == por_temporada * len(LIGAS),
+                  f"{r['paginas']} páginas")
+        filas = _contenido(db)
+        comprobar("los upserts actualizan resultados",
+                  r["completa"] and len(filas) == fixtures and not any(f[6] == "NS" for f in filas))
+
+        # 4. Todo completo
+        r = ingesta_service.ingestar(LIGAS, TEMPORADAS, db_path=db, por_minuto=0, reserva=0)
+        comprobar("sin peticiones si todo está completo", r["peticiones"] == 0 and r["completa"])
+    finally:
+        fake.detener()
+
+    # 5. Paralelo con 429 inyectados contra el mismo estado final
+    fake = FakeApiSports(grabaciones, latencia_ms=latencia_ms, cuota_dia=10_000, tasa_429=0.1, semilla=1).iniciar()
+    ingesta_service.API_SPORTS_URL = fake.url
+    try:
+        tiempos = {}
+        for modo, hilos in (("secuencial", 1), ("paralelo", len(LIGAS))):
+            t0 = time.perf_counter()
+            r = ingesta_service.ingestar(LIGAS, TEMPORADAS, paralelo=hilos, db_path=os.path.join(directorio, f"{modo}-2.db"),
+                                         por_minuto=0, reserva=0)
+            tiempos[modo] = time.perf_counter() - t0
+            comprobar(f"{modo}: completa pese a {fake.errores[429]} respuestas 429", r["completa"],
+                      f"{r['peticiones']} peticiones en {tiempos[modo]:.2f}s")
+        iguales = (_contenido(os.path.join(directorio, "secuencial-2.db"))
+                   == _contenido(os.path.join(directorio, "paralelo-2.db")) == _contenido(db))
+        comprobar("paralelo y secuencial dejan la misma tabla", iguales,
+                  f"{tiempos['secuencial'] / tiempos['paralelo']:.1f}× más rápido en paralelo")
+    finally:
+        fake.detener()
+        shutil.rmtree(directorio, ignore_errors=True)
+    return all(comprobaciones)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de la ingesta de api-sports contra un fake")
+    parser.add_argument("--latencia-ms", type=float, default=20.0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR,
+                        format="%(asctime)s - %(levelname)s - %(message)s")
+    sys.exit(0 if probar(args.latencia_ms) else 1)
+
+
+if __name__ == "__main__":
+    main()